@@ -0,0 +1,123 @@
+"""
+Semantic answer cache.
+Serves a previous answer when a new question is a close paraphrase of an
+answered one and retrieval returns exactly the same sources, so the LLM
+round trip is skipped. Entries expire after a TTL and are dropped when a
+new index version is published.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """Thread-safe cache of answers keyed by question embedding and retrieved sources."""
+
+    def __init__(self, threshold: Optional[float] = None, ttl_seconds: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            threshold: Cosine similarity a question needs with a cached one
+                       (defaults to ANSWER_CACHE_THRESHOLD env var, 0.92)
+            ttl_seconds: Lifetime of an answer (defaults to ANSWER_CACHE_TTL env var, 3600)
+            max_entries: Answers kept before the least recently used are evicted
+                         (defaults to ANSWER_CACHE_MAX_ENTRIES env var, 1000)
+        """
+        self.threshold = threshold if threshold is not None else float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+        self.max_entries = max_entries or int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0, "invalidated": 0}
+        # Only answers built from the same sources are compared, so entries
+        # are bucketed by (source IDs, k, temperature, index version)
+        self._buckets: "OrderedDict[Tuple, List[Dict]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    @staticmethod
+    def _key(source_ids: Sequence[str], index_version: Optional[str], k=None, temperature=None) -> Tuple:
+        return (tuple(source_ids), index_version, k, temperature)
+
+    def get(self, question_vector: Sequence[float], source_ids: Sequence[str],
+            index_version: Optional[str] = None, k=None, temperature=None) -> Optional[Dict]:
+        """
+        Look up a cached answer.
+
+        Args:
+            question_vector: Embedding of the new question
+            source_ids: IDs of the sources retrieved for it, in context order
+            index_version: Published index version the sources came from
+            k: Number of documents retrieved
+            temperature: LLM temperature requested
+
+        Returns:
+            The cached result dict, or None
+        """
+        key = self._key(source_ids, index_version, k, temperature)
+        vector = self._normalize(question_vector)
+        now = time.time()
+        with self._lock:
+            bucket = self._buckets.get(key, [])
+            best, best_similarity = None, self.threshold
+            for entry in list(bucket):
+                if now - entry["created_at"] > self.ttl_seconds:
+                    bucket.remove(entry)
+                    self._size -= 1
+                    self.stats["expired"] += 1
+                    continue
+                similarity = float(vector @ entry["vector"])
+                if similarity >= best_similarity:
+                    best, best_similarity = entry, similarity
+            if not bucket:
+                self._buckets.pop(key, None)
+            if best is None:
+                self.stats["misses"] += 1
+                return None
+            self._buckets.move_to_end(key)
+            self.stats["hits"] += 1
+            return dict(best["result"], cache_similarity=best_similarity)
+
+    def put(self, question_vector: Sequence[float], source_ids: Sequence[str], result: Dict,
+            index_version: Optional[str] = None, k=None, temperature=None):
+        """Cache an answer (see get() for the arguments)."""
+        key = self._key(source_ids, index_version, k, temperature)
+        entry = {"vector": self._normalize(question_vector), "result": dict(result), "created_at": time.time()}
+        with self._lock:
+            self._buckets.setdefault(key, []).append(entry)
+            self._buckets.move_to_end(key)
+            self._size += 1
+            while self._size > self.max_entries:
+                _, bucket = next(iter(self._buckets.items()))
+                bucket.pop(0)
+                self._size -= 1
+                self.stats["evicted"] += 1
+                if not bucket:
+                    self._buckets.popitem(last=False)
+
+    def invalidate(self, index_version: Optional[str] = None):
+        """Drop answers from other index versions (all answers if index_version is None)."""
+        with self._lock:
+            for key in list(self._buckets):
+                if index_version is None or key[1] != index_version:
+                    dropped = len(self._buckets.pop(key))
+                    self._size -= dropped
+                    self.stats["invalidated"] += dropped
+
+    def __len__(self) -> int:
+        return self._size
+
+    def hit_rate(self) -> float:
+        """Share of lookups answered from the cache."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
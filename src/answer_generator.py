@@ -2,10 +2,18 @@
 Answer generator module that integrates retrieval and LLM.
 Provides end-to-end question answering with source citations.
 """
-from typing import Dict, List, Tuple, Optional
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Tuple, Optional
 from datetime import datetime
 from retrieval import Retriever
-from llm import LLM
+from llm import LLM, LLMUnavailableError, RetryableError, get_llm
+from answer_cache import SemanticAnswerCache
+from rate_limiter import TokenBucket
+from embedding_cache import normalize_text
+from single_flight import SingleFlight
 
 
 class AnswerGenerator:
@@ -18,33 +26,54 @@ class AnswerGenerator:
         self,
         retriever: Optional[Retriever] = None,
         llm: Optional[LLM] = None,
-        k: int = 3
+        k: int = 3,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        single_flight: Optional[SingleFlight] = None
     ):
         """
         Initialize answer generator.
         
         Args:
             retriever: Retriever instance (creates new if None)
-            llm: LLM instance (creates new if None)
+            llm: LLM or FailoverLLM instance (get_llm() if None)
             k: Number of documents to retrieve
+            answer_cache: Semantic cache of previous answers (no caching if None)
+            single_flight: Where identical questions asked at the same time are
+                           coalesced (defaults to one for this generator only)
         """
         self.retriever = retriever or Retriever(k=k)
-        self.llm = llm or LLM()
+        self.llm = llm or get_llm()
         self.k = k
+        self.answer_cache = answer_cache
+        self.single_flight = single_flight or SingleFlight()
+        if answer_cache is not None:
+            # Answers built from an older index must not outlive it
+            self.retriever.vector_store.add_reload_listener(
+                lambda old_version, new_version: answer_cache.invalidate(new_version)
+            )
     
     def generate_answer(
         self,
         question: str,
         k: Optional[int] = None,
-        temperature: Optional[float] = None
+        temperature: Optional[float] = None,
+        timeout: Optional[float] = None
     ) -> Dict:
         """
         Generate an answer to a question using RAG.
         
+        If the LLM is unavailable (circuit open, deadline passed, transient
+        errors outlasting the retries) the answer lists the retrieved sources
+        instead. If the same question (ignoring case and spacing, with the
+        same k and temperature) is already being answered, this waits for
+        that answer instead of retrieving and calling the LLM again.
+        
         Args:
             question: User's question
             k: Number of documents to retrieve (overrides default)
             temperature: LLM temperature (overrides default)
+            timeout: Seconds the whole answer may take, retrieval included
+                     (defaults to the LLM's LLM_TIMEOUT for the LLM call)
             
         Returns:
             Dictionary containing:
@@ -53,43 +82,293 @@ class AnswerGenerator:
                 - sources: List of source metadata
                 - timestamp: When the answer was generated
                 - retrieved_docs: Number of documents retrieved
+                - cached: True when the answer came from the answer cache
+                - fallback: True when the answer only lists the sources
+                - coalesced: True when the answer was shared by an identical concurrent question
+        """
+        deadline = self._deadline(timeout)
+        result, shared = self.single_flight.do(
+            self._flight_key(question, k, temperature),
+            lambda: self._generate_answer(question, k, temperature, deadline=deadline),
+            timeout
+        )
+        return self._shared_result(question, result) if shared else result
+    
+    @staticmethod
+    def _deadline(timeout: Optional[float]) -> Optional[float]:
+        return time.monotonic() + timeout if timeout is not None else None
+    
+    def _flight_key(self, question: str, k: Optional[int], temperature: Optional[float]) -> Tuple:
+        """Single-flight key: questions differing only in case and spacing share an answer."""
+        return normalize_text(question).casefold(), k if k is not None else self.k, temperature
+    
+    @staticmethod
+    def _shared_result(question: str, result: Dict) -> Dict:
+        """Copy of another caller's result for this caller's question."""
+        return dict(result, question=question, coalesced=True)
+    
+    def _generate_answer(
+        self,
+        question: str,
+        k: Optional[int] = None,
+        temperature: Optional[float] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        retrieved: Optional[Tuple[str, List[Dict]]] = None,
+        deadline: Optional[float] = None
+    ) -> Dict:
+        """
+        generate_answer(), pacing the LLM call (if one is needed) with
+        rate_limiter and using already retrieved (context, sources) if given.
         """
         # Retrieve relevant documents
         num_docs = k if k is not None else self.k
-        context, sources = self.retriever.retrieve_and_format(question, k=num_docs)
+        if retrieved is None:
+            retrieved = self.retriever.retrieve_and_format(question, k=num_docs)
+        context, sources = retrieved
         
         # Check if we have any relevant information
         if not sources:
-            return {
-                "question": question,
-                "answer": "I don't have enough information to answer this question. Please try rephrasing or ask about a different topic.",
-                "sources": [],
-                "timestamp": datetime.now().isoformat(),
-                "retrieved_docs": 0
-            }
+            return self._no_information(question)
+        
+        cache_key, cached = self._cache_lookup(question, sources, num_docs, temperature)
+        if cached is not None:
+            return cached
         
         # Create prompt and generate answer
         prompt = self.llm.create_prompt(question, context, sources)
         
         try:
-            answer = self.llm.generate(prompt, temperature=temperature)
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            answer = self.llm.generate(prompt, temperature=temperature, deadline=deadline)
         except Exception as e:
-            return {
-                "question": question,
-                "answer": f"Error generating answer: {str(e)}",
-                "sources": sources,
-                "timestamp": datetime.now().isoformat(),
-                "retrieved_docs": len(sources),
-                "error": str(e)
-            }
+            return self._llm_failure(question, sources, e)
+        
+        return self._answer_result(question, answer, sources, cache_key)
+    
+    async def agenerate_answer(
+        self,
+        question: str,
+        k: Optional[int] = None,
+        temperature: Optional[float] = None,
+        timeout: Optional[float] = None
+    ) -> Dict:
+        """
+        Async generate_answer(): retrieval runs in the retriever's executor and
+        the LLM call uses the provider's async client, so many questions can
+        wait on the LLM at once without holding a thread each.
         
+        Args and return value are the same as generate_answer().
+        """
+        deadline = self._deadline(timeout)
+        key = self._flight_key(question, k, temperature)
+        flight, leader = self.single_flight.begin(key)
+        if not leader:
+            try:
+                # Parks on the event loop: no thread per waiting follower
+                return self._shared_result(question, await flight.await_result(timeout))
+            except Exception:
+                pass
+        try:
+            result = await self._agenerate_answer(question, k, temperature, deadline)
+        except BaseException as e:
+            if leader:
+                self.single_flight.finish(key, flight, error=e)
+            raise
+        if leader:
+            self.single_flight.finish(key, flight, result=result)
+        return result
+    
+    async def _agenerate_answer(self, question: str, k: Optional[int], temperature: Optional[float],
+                                deadline: Optional[float]) -> Dict:
+        num_docs = k if k is not None else self.k
+        context, sources = await self.retriever.aretrieve_and_format(question, k=num_docs)
+        
+        if not sources:
+            return self._no_information(question)
+        
+        cache_key, cached = self._cache_lookup(question, sources, num_docs, temperature)
+        if cached is not None:
+            return cached
+        
+        prompt = self.llm.create_prompt(question, context, sources)
+        
+        try:
+            answer = await self.llm.agenerate(prompt, temperature=temperature, deadline=deadline)
+        except Exception as e:
+            return self._llm_failure(question, sources, e)
+        
+        return self._answer_result(question, answer, sources, cache_key)
+    
+    def generate_answer_stream(
+        self,
+        question: str,
+        k: Optional[int] = None,
+        temperature: Optional[float] = None,
+        timeout: Optional[float] = None
+    ) -> Iterator[Dict]:
+        """
+        Generate an answer, yielding it as the LLM produces it.
+        
+        Args are the same as generate_answer().
+        
+        Yields:
+            Event dictionaries, in order:
+                - {"type": "sources", "sources": [...]} once retrieval is done
+                - {"type": "token", "text": ...} for each piece of the answer
+                - {"type": "done", "result": {...}} with the generate_answer() result
+            An identical question already being streamed is followed: its events
+            are relayed as they are produced. One being answered without
+            streaming is waited for and its answer yielded as a single token.
+        """
+        deadline = self._deadline(timeout)
+        key = self._flight_key(question, k, temperature)
+        flight, leader = self.single_flight.begin(key)
+        relayed = {}
+        if not leader:
+            try:
+                for event in flight.events(timeout):
+                    if event["type"] != "done":
+                        relayed.setdefault(event["type"], event)
+                        yield event
+                shared = self._shared_result(question, flight.wait(0))
+            except Exception:
+                shared = None
+            if shared is not None:
+                if "sources" not in relayed:
+                    yield {"type": "sources", "sources": shared["sources"]}
+                if "token" not in relayed:
+                    yield {"type": "token", "text": shared["answer"]}
+                yield {"type": "done", "result": shared}
+                return
+            if "token" in relayed:
+                # Part of the leader's answer is already out; don't start a second one
+                sources = relayed["sources"]["sources"]
+                error = RuntimeError("the answer this question was sharing was interrupted")
+                result = self._error_result(question, sources, error)
+                yield {"type": "token", "text": "\n\n" + result["answer"]}
+                yield {"type": "done", "result": result}
+                return
+        result = error = None
+        try:
+            for event in self._generate_answer_stream(question, k, temperature, deadline):
+                if event["type"] == "done":
+                    result = event["result"]
+                elif leader:
+                    flight.publish(event)
+                if event["type"] == "sources" and "sources" in relayed:
+                    continue
+                yield event
+        except BaseException as e:
+            # Includes GeneratorExit when the consumer stops reading early
+            error = e
+            raise
+        finally:
+            if leader:
+                self.single_flight.finish(key, flight, result, error if result is None else None)
+    
+    def _generate_answer_stream(self, question: str, k: Optional[int], temperature: Optional[float],
+                                deadline: Optional[float]) -> Iterator[Dict]:
+        num_docs = k if k is not None else self.k
+        context, sources = self.retriever.retrieve_and_format(question, k=num_docs)
+        yield {"type": "sources", "sources": sources}
+        
+        if not sources:
+            result = self._no_information(question)
+            yield {"type": "token", "text": result["answer"]}
+            yield {"type": "done", "result": result}
+            return
+        
+        cache_key, cached = self._cache_lookup(question, sources, num_docs, temperature)
+        if cached is not None:
+            yield {"type": "token", "text": cached["answer"]}
+            yield {"type": "done", "result": cached}
+            return
+        
+        prompt = self.llm.create_prompt(question, context, sources)
+        
+        pieces = []
+        try:
+            for text in self.llm.generate_stream(prompt, temperature=temperature, deadline=deadline):
+                pieces.append(text)
+                yield {"type": "token", "text": text}
+        except Exception as e:
+            result = self._error_result(question, sources, e) if pieces else self._llm_failure(question, sources, e)
+            # Show the error too, so a failed stream never ends silently
+            yield {"type": "token", "text": "\n\n" + result["answer"] if pieces else result["answer"]}
+            yield {"type": "done", "result": result}
+            return
+        
+        yield {"type": "done", "result": self._answer_result(question, "".join(pieces), sources, cache_key)}
+    
+    def _no_information(self, question: str) -> Dict:
         return {
+            "question": question,
+            "answer": "I don't have enough information to answer this question. Please try rephrasing or ask about a different topic.",
+            "sources": [],
+            "timestamp": datetime.now().isoformat(),
+            "retrieved_docs": 0
+        }
+    
+    def _error_result(self, question: str, sources: List[Dict], e: Exception) -> Dict:
+        return {
+            "question": question,
+            "answer": f"Error generating answer: {str(e)}",
+            "sources": sources,
+            "timestamp": datetime.now().isoformat(),
+            "retrieved_docs": len(sources),
+            "error": str(e)
+        }
+    
+    def _llm_failure(self, question: str, sources: List[Dict], e: Exception) -> Dict:
+        """Result for a failed LLM call: the sources alone when the provider is unavailable."""
+        if not isinstance(e, (LLMUnavailableError, RetryableError)):
+            return self._error_result(question, sources, e)
+        lines = ["I can't generate an answer right now, but these official sources cover your question:"]
+        for i, source in enumerate(sources, 1):
+            lines.append(f"[Source {i}] {source.get('scheme', 'General')}: {source['url']}")
+        return dict(self._error_result(question, sources, e), answer="\n".join(lines), fallback=True)
+    
+    def _cache_lookup(self, question: str, sources: List[Dict], k: int, temperature: Optional[float]):
+        """
+        Look the question up in the answer cache.
+        
+        Returns:
+            (cache key for storing the new answer or None, cached result or None)
+        """
+        if self.answer_cache is None:
+            return None, None
+        # A paraphrase of an answered question with the same sources reuses its answer
+        cache_key = {
+            "question_vector": self.retriever.embed_query(question),
+            "source_ids": [source.get('chunk_id') or source['url'] for source in sources],
+            "index_version": self.retriever.index_version,
+            "k": k,
+            "temperature": temperature,
+        }
+        cached = self.answer_cache.get(**cache_key)
+        if cached is None:
+            return cache_key, None
+        return cache_key, {
+            "question": question,
+            "answer": cached["answer"],
+            "sources": sources,
+            "timestamp": datetime.now().isoformat(),
+            "retrieved_docs": len(sources),
+            "cached": True
+        }
+    
+    def _answer_result(self, question: str, answer: str, sources: List[Dict], cache_key: Optional[Dict]) -> Dict:
+        result = {
             "question": question,
             "answer": answer,
             "sources": sources,
             "timestamp": datetime.now().isoformat(),
             "retrieved_docs": len(sources)
         }
+        if cache_key is not None:
+            self.answer_cache.put(result=result, **cache_key)
+        return result
     
     def format_response(self, result: Dict) -> str:
         """
@@ -121,34 +400,96 @@ class AnswerGenerator:
         
         return "\n".join(output)
     
-    def answer_questions(self, questions: List[str]) -> List[Dict]:
+    def answer_questions(
+        self,
+        questions: List[str],
+        k: Optional[int] = None,
+        temperature: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        timeout: Optional[float] = None
+    ) -> List[Dict]:
         """
         Answer multiple questions in batch.
         
+        All questions are retrieved up front with one embedding call and
+        stacked FAISS searches, then answered concurrently: at most
+        max_concurrency LLM calls are in flight, and
+        calls are paced to requests_per_minute. A failure only affects the
+        result of its own question.
+        
         Args:
             questions: List of questions
+            k: Number of documents to retrieve (overrides default)
+            temperature: LLM temperature (overrides default)
+            max_concurrency: Questions answered at once (defaults to BATCH_CONCURRENCY env var, 4)
+            requests_per_minute: LLM calls started per minute (defaults to
+                                 BATCH_REQUESTS_PER_MINUTE env var; unlimited if unset)
+            timeout: Seconds each question may take once its turn comes
             
         Returns:
-            List of answer result dictionaries
+            List of answer result dictionaries, in the order of questions
         """
-        results = []
-        for question in questions:
-            result = self.generate_answer(question)
-            results.append(result)
-        return results
+        if not questions:
+            return []
+        max_concurrency = max_concurrency or int(os.getenv("BATCH_CONCURRENCY", "4"))
+        if requests_per_minute is None and os.getenv("BATCH_REQUESTS_PER_MINUTE"):
+            requests_per_minute = float(os.getenv("BATCH_REQUESTS_PER_MINUTE"))
+        rate_limiter = TokenBucket.per_minute(requests_per_minute, capacity=max_concurrency) if requests_per_minute else None
+        
+        num_docs = k if k is not None else self.k
+        try:
+            retrieved = self.retriever.retrieve_and_format_batch(questions, k=num_docs)
+        except Exception as e:
+            print(f"Batch retrieval failed ({e}); retrieving questions one at a time")
+            retrieved = [None] * len(questions)
+        
+        def answer(question, question_retrieved):
+            try:
+                return self._generate_answer(question, num_docs, temperature, rate_limiter, question_retrieved,
+                                             deadline=self._deadline(timeout))
+            except Exception as e:
+                return self._error_result(question, [], e)
+        
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            return list(pool.map(answer, questions, retrieved))
+
+
+# In-flight answers shared by every generator from get_answer_generator(), i.e.
+# every Streamlit session, so a question many users ask at once is answered once
+_shared_single_flight = SingleFlight()
+
+# Semantic answer cache shared the same way, created on first use
+_shared_answer_cache: Optional[SemanticAnswerCache] = None
+_shared_answer_cache_lock = threading.Lock()
+
+
+def _get_shared_answer_cache() -> SemanticAnswerCache:
+    """Return the process-wide answer cache, creating it once."""
+    global _shared_answer_cache
+    with _shared_answer_cache_lock:
+        if _shared_answer_cache is None:
+            _shared_answer_cache = SemanticAnswerCache()
+        return _shared_answer_cache
 
 
 def get_answer_generator(k: int = 3) -> AnswerGenerator:
     """
     Get AnswerGenerator instance with default configuration.
     
+    The semantic answer cache is on unless ANSWER_CACHE=0. All generators
+    made here share one answer cache and coalesce identical questions in flight.
+    
     Args:
         k: Number of documents to retrieve
         
     Returns:
         Configured AnswerGenerator instance
     """
-    return AnswerGenerator(k=k)
+    answer_cache = None
+    if os.getenv("ANSWER_CACHE", "1").lower() not in ("0", "false", "no"):
+        answer_cache = _get_shared_answer_cache()
+    return AnswerGenerator(k=k, answer_cache=answer_cache, single_flight=_shared_single_flight)
 
 
 if __name__ == "__main__":
@@ -173,21 +173,50 @@ def display_chat_message(role, content, sources=None, is_refusal=False):
     if role == "user":
         st.markdown(f'<div class="chat-message user-message"><strong>You:</strong><br>{content}</div>', unsafe_allow_html=True)
     else:
-        st.markdown(f'<div class="chat-message bot-message"><strong>Bot:</strong><br>{content}</div>', unsafe_allow_html=True)
-        
-        # Display sources if available
-        if sources and len(sources) > 0:
-            st.markdown("**📚 Sources:**")
-            for i, source in enumerate(sources, 1):
-                scheme = source.get('scheme', 'Unknown')
-                url = source.get('url', '#')
-                score = source.get('relevance_score', 0)
-                st.markdown(f"""
-                <div class="source-citation">
-                    <strong>[{i}]</strong> {scheme}<br>
-                    <a href="{url}" target="_blank">🔗 View Source</a> | Relevance: {score:.2f}
-                </div>
-                """, unsafe_allow_html=True)
+        st.markdown(bot_message_html(content), unsafe_allow_html=True)
+        display_sources(sources)
+
+
+def bot_message_html(content):
+    """HTML for a bot chat message."""
+    return f'<div class="chat-message bot-message"><strong>Bot:</strong><br>{content}</div>'
+
+
+def display_sources(sources):
+    """Display source citations, if there are any."""
+    if sources and len(sources) > 0:
+        st.markdown("**📚 Sources:**")
+        for i, source in enumerate(sources, 1):
+            scheme = source.get('scheme', 'Unknown')
+            url = source.get('url', '#')
+            score = source.get('relevance_score', 0)
+            st.markdown(f"""
+            <div class="source-citation">
+                <strong>[{i}]</strong> {scheme}<br>
+                <a href="{url}" target="_blank">🔗 View Source</a> | Relevance: {score:.2f}
+            </div>
+            """, unsafe_allow_html=True)
+
+
+def stream_answer(question):
+    """
+    Render the answer while it is generated and return the final response.
+    Sources appear as soon as retrieval finishes, then the answer fills in token by token.
+    """
+    answer_placeholder = st.empty()
+    answer_placeholder.markdown(bot_message_html("Thinking..."), unsafe_allow_html=True)
+    sources_container = st.container()
+    
+    answer = ""
+    for event in st.session_state.answer_generator.generate_answer_stream(question):
+        if event["type"] == "sources":
+            with sources_container:
+                display_sources(event["sources"])
+        elif event["type"] == "token":
+            answer += event["text"]
+            answer_placeholder.markdown(bot_message_html(answer + " ▌"), unsafe_allow_html=True)
+        else:
+            return event["result"]
 
 
 def process_question(question):
@@ -208,7 +237,7 @@ def process_question(question):
         }
     
     try:
-        response = st.session_state.answer_generator.generate_answer(question)
+        response = stream_answer(question)
         return response
     except Exception as e:
         return {
@@ -249,9 +278,9 @@ def main():
             'content': question
         })
         
-        # Process question
-        with st.spinner('Thinking...'):
-            response = process_question(question)
+        # Process question (the answer streams in as it is generated)
+        display_chat_message('user', question)
+        response = process_question(question)
         
         # Add bot response
         st.session_state.messages.append({
@@ -273,9 +302,9 @@ def main():
             'content': question
         })
         
-        # Process question
-        with st.spinner('Thinking...'):
-            response = process_question(question)
+        # Process question (the answer streams in as it is generated)
+        display_chat_message('user', question)
+        response = process_question(question)
         
         # Add bot response
         st.session_state.messages.append({
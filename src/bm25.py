@@ -0,0 +1,144 @@
+"""
+Lexical (BM25) index over the chunks of a FAISS index.
+Catches exact tokens the embeddings blur, like "TER", "1%", "NIFTY 500 TRI"
+or an ISIN. Postings are stored as flat numpy arrays (CSR layout) so a
+query scores every chunk with a few vectorized operations.
+
+Files saved inside an index version directory:
+    bm25.vocab   one term per line, line i is term id i
+    bm25.npz     indptr, rows and tfs (postings) plus doc_len per chunk
+"""
+import os
+import re
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+VOCAB_FILE = "bm25.vocab"
+ARRAYS_FILE = "bm25.npz"
+
+# Words, numbers with decimals and percentages ("1.05%"), codes like ISINs
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?%?")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word/number tokens."""
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """Okapi BM25 over chunks, where chunk i is row i of the FAISS index."""
+
+    def __init__(self, vocab: List[str], indptr: np.ndarray, rows: np.ndarray, tfs: np.ndarray,
+                 doc_len: np.ndarray, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize from postings arrays (use build() or load()).
+
+        Args:
+            vocab: Terms, indexed by term id
+            indptr: Term id -> slice of rows/tfs holding its postings (len(vocab) + 1)
+            rows: Chunk row of each posting
+            tfs: Term frequency of each posting
+            doc_len: Token count per chunk
+            k1: Term frequency saturation
+            b: Length normalization
+        """
+        self.vocab = vocab
+        self.term_ids = {term: i for i, term in enumerate(vocab)}
+        self.indptr = indptr
+        self.rows = rows
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        n_docs = len(doc_len)
+        df = np.diff(indptr).astype(np.float32)
+        self.idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avg_len = float(doc_len.mean()) if n_docs else 0.0
+        # Per-chunk length factor of the BM25 denominator, computed once
+        self._norm = (k1 * (1 - b + b * doc_len / avg_len)).astype(np.float32) if avg_len else np.full(n_docs, k1, np.float32)
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    @classmethod
+    def build(cls, texts: Iterable[str], **kwargs) -> "BM25Index":
+        """Index chunk texts given in FAISS row order."""
+        term_ids = {}
+        postings = []  # (term id, row, tf)
+        doc_len = []
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_len.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings.append((term_ids.setdefault(term, len(term_ids)), row, tf))
+
+        vocab = [None] * len(term_ids)
+        for term, i in term_ids.items():
+            vocab[i] = term
+        data = np.asarray(postings, dtype=np.int64).reshape(-1, 3)
+        order = np.lexsort((data[:, 1], data[:, 0]))
+        data = data[order]
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(data[:, 0], minlength=len(vocab)), out=indptr[1:])
+        return cls(vocab, indptr, data[:, 1].astype(np.int32), data[:, 2].astype(np.float32),
+                   np.asarray(doc_len, dtype=np.float32), **kwargs)
+
+    def save(self, path: str):
+        """Write the index into a directory."""
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, VOCAB_FILE), "w", encoding="utf-8") as f:
+            f.write("\n".join(self.vocab))
+        np.savez(os.path.join(path, ARRAYS_FILE), indptr=self.indptr, rows=self.rows,
+                 tfs=self.tfs, doc_len=self.doc_len)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        """Whether an index has been saved in this directory."""
+        return os.path.exists(os.path.join(path, ARRAYS_FILE))
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "BM25Index":
+        """Read an index written by save()."""
+        with open(os.path.join(path, VOCAB_FILE), "r", encoding="utf-8") as f:
+            content = f.read()
+        vocab = content.split("\n") if content else []
+        with np.load(os.path.join(path, ARRAYS_FILE)) as arrays:
+            return cls(vocab, arrays["indptr"], arrays["rows"], arrays["tfs"], arrays["doc_len"], **kwargs)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every chunk for the query."""
+        scores = np.zeros(len(self.doc_len), dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            rows, tfs = self.rows[start:end], self.tfs[start:end]
+            # Each row appears once per term, so plain fancy-index addition is safe
+            scores[rows] += self.idf[term_id] * tfs * (self.k1 + 1) / (tfs + self._norm[rows])
+        return scores
+
+    def search(self, query: str, k: int, rows: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Top-k chunks for the query.
+
+        Args:
+            query: The user's question
+            k: Number of chunks to return
+            rows: Only consider these FAISS rows (None = all)
+
+        Returns:
+            (row, score) pairs, best first, only chunks sharing a term with the query
+        """
+        scores = self.scores(query)
+        if rows is not None:
+            masked = np.zeros_like(scores)
+            masked[rows] = scores[rows]
+            scores = masked
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(row), float(scores[row])) for row in candidates]
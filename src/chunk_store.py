@@ -0,0 +1,159 @@
+"""
+Memory-mapped chunk store.
+Replaces the pickled LangChain docstore (index.pkl) next to the FAISS index
+with plain columnar files, so loading an index no longer unpickles every
+Document and chunk text is only decoded for the hits a search returns.
+
+Layout inside an index version directory:
+    chunks.ids        UTF-8 chunk IDs, concatenated
+    chunks.text       UTF-8 chunk text, concatenated
+    chunks.metadata   compact JSON metadata per chunk, concatenated
+    chunks.offsets.npy  int64 array (n + 1, 3) of cumulative byte offsets
+                        into the three column files above
+
+Row i of the store is row i of the FAISS index saved alongside it.
+"""
+import json
+import mmap
+import os
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+COLUMNS = ("ids", "text", "metadata")
+OFFSETS_FILE = "chunks.offsets.npy"
+
+
+def _column_path(path: str, column: str) -> str:
+    return os.path.join(path, f"chunks.{column}")
+
+
+def _map_file(file_path: str) -> Union[mmap.mmap, bytes]:
+    """Memory-map a file read-only (mmap can't map empty files)."""
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class ChunkStore(Docstore, AddableMixin):
+    """
+    Docstore backed by memory-mapped column files.
+
+    Chunks written to disk are read-only; add() and delete() are kept in
+    memory until the owning index is saved to a new version with write().
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the store.
+
+        Args:
+            path: Directory written by ChunkStore.write (empty store if None)
+        """
+        self.path = path
+        self.ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._offsets = None
+        self._columns: Dict[str, Union[mmap.mmap, bytes]] = {}
+        self._added: Dict[str, Document] = {}
+        self._deleted = set()
+        if path is not None:
+            self._open(path)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        """Whether a chunk store has been written to this directory."""
+        return os.path.exists(os.path.join(path, OFFSETS_FILE))
+
+    def _open(self, path: str):
+        self._offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+        for column in ("text", "metadata"):
+            self._columns[column] = _map_file(_column_path(path, column))
+        # IDs are needed up front to map FAISS rows to chunks; they are small
+        with open(_column_path(path, "ids"), "rb") as f:
+            blob = f.read()
+        starts, ends = self._offsets[:-1, 0], self._offsets[1:, 0]
+        self.ids = [blob[start:end].decode("utf-8") for start, end in zip(starts, ends)]
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+
+    def _read(self, row: int) -> Document:
+        """Decode one stored chunk."""
+        start, end = self._offsets[row], self._offsets[row + 1]
+        text = self._columns["text"][start[1]:end[1]].decode("utf-8")
+        metadata = json.loads(self._columns["metadata"][start[2]:end[2]])
+        return Document(id=self.ids[row], page_content=text, metadata=metadata)
+
+    def metadata(self, chunk_id: str) -> Optional[Dict]:
+        """Decode only a chunk's metadata (None if it doesn't exist)."""
+        if chunk_id in self._added:
+            return self._added[chunk_id].metadata
+        if chunk_id not in self._rows or chunk_id in self._deleted:
+            return None
+        row = self._rows[chunk_id]
+        return json.loads(self._columns["metadata"][self._offsets[row, 2]:self._offsets[row + 1, 2]])
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._added or (chunk_id in self._rows and chunk_id not in self._deleted)
+
+    def __len__(self) -> int:
+        return len(self._rows) - len(self._deleted) + len(self._added)
+
+    def search(self, search: str) -> Union[str, Document]:
+        """Return the chunk with this ID, or a message if it doesn't exist."""
+        if search in self._added:
+            return self._added[search]
+        if search in self._rows and search not in self._deleted:
+            return self._read(self._rows[search])
+        return f"ID {search} not found."
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        """Add chunks in memory; they are written with the next save."""
+        overlapping = [chunk_id for chunk_id in texts if chunk_id in self]
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        for chunk_id, doc in texts.items():
+            self._deleted.discard(chunk_id)
+            self._added[chunk_id] = doc
+
+    def delete(self, ids: List) -> None:
+        """Delete chunks by ID."""
+        missing = [chunk_id for chunk_id in ids if chunk_id not in self]
+        if missing:
+            raise ValueError(f"Tried to delete ids that does not exist: {missing}")
+        for chunk_id in ids:
+            if self._added.pop(chunk_id, None) is None:
+                self._deleted.add(chunk_id)
+
+    @staticmethod
+    def write(path: str, chunks: Iterable[Tuple[str, Document]]) -> int:
+        """
+        Write chunks in order as a new store.
+
+        Args:
+            path: Target directory (the index version being published)
+            chunks: (chunk ID, Document) pairs in FAISS row order
+
+        Returns:
+            Number of chunks written
+        """
+        os.makedirs(path, exist_ok=True)
+        files = {column: open(_column_path(path, column), "wb") for column in COLUMNS}
+        offsets = [(0, 0, 0)]
+        try:
+            for chunk_id, doc in chunks:
+                values = (
+                    chunk_id.encode("utf-8"),
+                    doc.page_content.encode("utf-8"),
+                    json.dumps(doc.metadata, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+                )
+                for column, value in zip(COLUMNS, values):
+                    files[column].write(value)
+                offsets.append(tuple(prev + len(value) for prev, value in zip(offsets[-1], values)))
+        finally:
+            for f in files.values():
+                f.close()
+        np.save(os.path.join(path, OFFSETS_FILE), np.asarray(offsets, dtype=np.int64))
+        return len(offsets) - 1
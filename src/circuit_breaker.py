@@ -0,0 +1,112 @@
+"""
+Circuit breaker for LLM providers.
+After repeated transient failures the breaker opens and calls fail fast for
+a cool-down period instead of each waiting out its own timeouts; then a
+single trial call is let through, and its success closes the circuit again.
+"""
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class CircuitBreaker:
+    """Thread-safe closed / open / half-open circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_seconds: Optional[float] = None):
+        """
+        Initialize the breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+                               (defaults to LLM_BREAKER_FAILURES env var, 5)
+            reset_seconds: Time the circuit stays open before a trial call, and the
+                           longest a trial may go unreported before another is let
+                           through (defaults to LLM_BREAKER_RESET_SECONDS env var, 30)
+        """
+        self.failure_threshold = failure_threshold or int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+        self.reset_seconds = reset_seconds if reset_seconds is not None else float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+        self.failures = 0
+        self.stats = {"opened": 0, "short_circuited": 0}
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        # When the half-open trial call was let through, or None if none is out
+        self._trial_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Current state; an open circuit turns half-open once its cool-down is over."""
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+            self._state = self.HALF_OPEN
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go to the provider now (half-open: one trial call at a time)."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN:
+                now = time.monotonic()
+                # A trial that never reported back expires rather than blocking forever
+                if self._trial_started is None or now - self._trial_started >= self.reset_seconds:
+                    self._trial_started = now
+                    return True
+            self.stats["short_circuited"] += 1
+            return False
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit (or an unresolved trial) lets a call through."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.OPEN:
+                return max(0.0, self._opened_at + self.reset_seconds - time.monotonic())
+            if state == self.HALF_OPEN and self._trial_started is not None:
+                return max(0.0, self._trial_started + self.reset_seconds - time.monotonic())
+            return 0.0
+
+    def release_trial(self):
+        """A call let through ended without a verdict on the provider: allow another trial."""
+        with self._lock:
+            self._trial_started = None
+
+    def record_success(self):
+        """A call succeeded: close the circuit."""
+        with self._lock:
+            self.failures = 0
+            self._state = self.CLOSED
+            self._trial_started = None
+
+    def record_failure(self):
+        """A call failed: open the circuit after too many failures, or a failed trial."""
+        with self._lock:
+            self.failures += 1
+            state = self._current_state()
+            if state == self.HALF_OPEN or (state == self.CLOSED and self.failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self.stats["opened"] += 1
+            self._trial_started = None
+
+
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(provider: str, model: str) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for a provider/model, creating it on first use."""
+    key = (provider, model)
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = _breakers[key] = CircuitBreaker()
+        return breaker
@@ -96,6 +96,33 @@ def format_response(response):
     return "\n".join(lines)
 
 
+def stream_response(answer_generator, question, spinner):
+    """
+    Print the answer as it is generated and return the final response.
+    The spinner runs until retrieval is done and the answer starts.
+    """
+    result = None
+    streamed = False
+    for event in answer_generator.generate_answer_stream(question):
+        if event["type"] == "sources":
+            spinner.stop()
+            print("\n💡 ANSWER:")
+        elif event["type"] == "token":
+            streamed = True
+            print(event["text"], end="", flush=True)
+        else:
+            result = event["result"]
+    if not streamed:
+        print(result['answer'], end="")
+    print()
+    
+    if result.get('sources'):
+        print(f"\n📚 SOURCES ({len(result['sources'])}):")
+        for i, source in enumerate(result['sources'], 1):
+            print(f"  [{i}] {source.get('scheme', 'Unknown')}")
+    return result
+
+
 def main():
     """Main CLI function."""
     print_header()
@@ -154,7 +181,9 @@ def main():
                 response = refusal_response
             else:
                 try:
-                    response = answer_generator.generate_answer(question)
+                    stream_response(answer_generator, question, spinner)
+                    print()
+                    continue
                 except Exception as e:
                     response = {
                         "question": question,
@@ -0,0 +1,157 @@
+"""
+Context packing for the LLM prompt.
+Turns retrieved chunks into as few, as non-redundant passages as possible:
+neighbouring chunks of one source are merged (dropping the text their
+overlap repeats), near-duplicate passages are dropped, and passages are
+added in relevance order until the token budget is used up.
+"""
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Chunk IDs end in the chunk's position within its source (see DataLoader.chunk_ids)
+_CHUNK_POSITION = re.compile(r"-(\d{5})$")
+_WORD = re.compile(r"\w+")
+
+# Shortest repeated text treated as chunk overlap when positions are unknown
+MIN_OVERLAP_CHARS = 20
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """The tiktoken encoding, or None if it can't be loaded (e.g. offline)."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(os.getenv("CONTEXT_TOKEN_ENCODING", "cl100k_base"))
+        except Exception as e:
+            print(f"tiktoken encoding unavailable ({e}); estimating 4 characters per token")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in text."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens tokens."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    return encoding.decode(encoding.encode(text)[:max_tokens])
+
+
+def chunk_position(doc) -> Optional[int]:
+    """Position of a chunk within its source, if its ID records one."""
+    match = _CHUNK_POSITION.search(doc.id or "")
+    return int(match.group(1)) if match else None
+
+
+def overlap_length(first: str, second: str) -> int:
+    """Length of the longest suffix of first that is a prefix of second."""
+    for size in range(min(len(first), len(second)), 0, -1):
+        if first.endswith(second[:size]):
+            return size
+    return 0
+
+
+class ContextPacker:
+    """Packs (document, score) retrieval results into a token budget."""
+
+    def __init__(self, max_tokens: Optional[int] = None, duplicate_threshold: float = 0.9, min_tokens: int = 50):
+        """
+        Initialize the packer.
+
+        Args:
+            max_tokens: Token budget for all passages (defaults to CONTEXT_MAX_TOKENS env var, 1500)
+            duplicate_threshold: Share of a passage's words found in a better passage
+                                 above which it is dropped as a near-duplicate
+            min_tokens: Smallest remainder worth filling with a truncated passage
+        """
+        self.max_tokens = max_tokens or int(os.getenv("CONTEXT_MAX_TOKENS", "1500"))
+        self.duplicate_threshold = duplicate_threshold
+        self.min_tokens = min_tokens
+
+    def _merge(self, results: List[Tuple]) -> List[Dict]:
+        """Merge neighbouring chunks of the same source into passages."""
+        by_source: Dict[str, List[Tuple[int, object, float]]] = {}
+        seen = set()
+        for rank, (doc, score) in enumerate(results):
+            key = doc.id or (doc.metadata.get('source'), doc.page_content)
+            if key in seen:
+                continue
+            seen.add(key)
+            by_source.setdefault(doc.metadata.get('source', 'Unknown'), []).append((rank, doc, score))
+
+        passages = []
+        for chunks in by_source.values():
+            positions = [chunk_position(doc) for _, doc, _ in chunks]
+            if None not in positions:
+                chunks = [chunk for _, chunk in sorted(zip(positions, chunks), key=lambda pair: pair[0])]
+            current = None
+            for rank, doc, score in chunks:
+                position = chunk_position(doc)
+                if current is not None:
+                    overlap = overlap_length(current["text"], doc.page_content)
+                    adjacent = position is not None and current["position"] is not None and position == current["position"] + 1
+                    if adjacent or overlap >= MIN_OVERLAP_CHARS:
+                        separator = "" if overlap else "\n"
+                        current["text"] += separator + doc.page_content[overlap:]
+                        current["position"] = position
+                        current["rank"] = min(current["rank"], rank)
+                        current["score"] = max(current["score"], score)
+                        continue
+                current = {"doc": doc, "text": doc.page_content, "position": position, "rank": rank, "score": score}
+                passages.append(current)
+        passages.sort(key=lambda passage: passage["rank"])
+        return passages
+
+    def _is_duplicate(self, words: set, kept: List[set]) -> bool:
+        for other in kept:
+            smaller = min(len(words), len(other))
+            if smaller and len(words & other) / smaller >= self.duplicate_threshold:
+                return True
+        return False
+
+    def pack(self, results: List[Tuple], max_tokens: Optional[int] = None) -> List[Dict]:
+        """
+        Pack retrieval results into passages.
+
+        Args:
+            results: (document, score) tuples, best first
+            max_tokens: Token budget (overrides the default)
+
+        Returns:
+            Passages in relevance order, each a dict with doc (the first chunk,
+            for metadata), text, score and tokens
+        """
+        budget = max_tokens or self.max_tokens
+        packed = []
+        kept_words: List[set] = []
+        used = 0
+        for passage in self._merge(results):
+            words = set(_WORD.findall(passage["text"].lower()))
+            if self._is_duplicate(words, kept_words):
+                continue
+            tokens = count_tokens(passage["text"])
+            remaining = budget - used
+            if tokens > remaining:
+                # Fill what's left with the start of the passage, if it's worth it
+                if remaining < self.min_tokens and packed:
+                    continue
+                passage["text"] = truncate_tokens(passage["text"], remaining)
+                tokens = count_tokens(passage["text"])
+            kept_words.append(words)
+            packed.append({"doc": passage["doc"], "text": passage["text"], "score": passage["score"], "tokens": tokens})
+            used += tokens
+            if used >= budget:
+                break
+        return packed
@@ -1,4 +1,11 @@
 import os
+import hashlib
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 import requests
 import pandas as pd
 from bs4 import BeautifulSoup
@@ -7,11 +14,74 @@ import pypdf
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
+HTML_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+def extract_pdf_pages(content, max_pages=None, deadline_seconds=None):
+    """
+    Extract text from raw PDF bytes, page by page.
+
+    Module-level so it can run in a worker process. Stops early after
+    max_pages pages or once deadline_seconds have elapsed.
+
+    Returns:
+        Dict with text, pages (extracted), total_pages, seconds and truncated
+    """
+    start = time.perf_counter()
+    with BytesIO(content) as f:
+        reader = pypdf.PdfReader(f)
+        total_pages = len(reader.pages)
+        limit = min(total_pages, max_pages) if max_pages else total_pages
+        parts = []
+        for i in range(limit):
+            if deadline_seconds is not None and time.perf_counter() - start > deadline_seconds:
+                break
+            parts.append((reader.pages[i].extract_text() or "") + "\n")
+    # Join once at the end; repeated += is quadratic on 200-page SIDs
+    return {
+        "text": "".join(parts),
+        "pages": len(parts),
+        "total_pages": total_pages,
+        "seconds": time.perf_counter() - start,
+        "truncated": len(parts) < total_pages,
+    }
+
+def _extract_pdf_worker(conn, content, max_pages, deadline_seconds):
+    """Run extract_pdf_pages in a worker process and send back ("ok", result) or ("error", message)."""
+    try:
+        conn.send(("ok", extract_pdf_pages(content, max_pages, deadline_seconds)))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
 class DataLoader:
-    def __init__(self, urls_csv_path="official-urls.csv"):
+    def __init__(self, urls_csv_path="official-urls.csv", max_workers=8, max_per_host=4, cache=None,
+                 pdf_workers=0):
         self.urls_csv_path = urls_csv_path
+        # Optional HttpCache; when set, all downloads go through it
+        self.cache = cache
         self.chunk_size = 1000
         self.chunk_overlap = 200
+        self.timeout = 10
+        # Concurrent fetching: total worker threads and simultaneous requests per host
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        # PDF extraction: worker processes (0 = extract in the calling thread),
+        # plus a page limit and time budget per document
+        self.pdf_workers = pdf_workers
+        self.pdf_max_pages = 500
+        self.pdf_timeout = 120
+        # Extra wait for a worker stuck inside one page before it is killed
+        self.pdf_grace_seconds = 10
+        self._pdf_slots = threading.BoundedSemaphore(max(pdf_workers, 1))
+        self._pdf_processes = set()
+        self.timings = []
+        self._extract_seconds = {}
+        self._host_semaphores = {}
+        self._download_seconds = {}
+        self._lock = threading.Lock()
 
     def load_urls(self):
         """Read URLs from CSV file."""
@@ -19,18 +89,123 @@ class DataLoader:
             raise FileNotFoundError(f"URL list not found at {self.urls_csv_path}")
         return pd.read_csv(self.urls_csv_path)
 
+    def _host_semaphore(self, url):
+        """Return the semaphore limiting concurrent requests to the URL's host."""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_semaphores[host]
+
+    def _get(self, url, headers=None):
+        """HTTP GET bounded by the per-host concurrency limit, recording download time."""
+        with self._host_semaphore(url):
+            start = time.perf_counter()
+            try:
+                if self.cache is not None:
+                    return self.cache.get(url, headers=headers, timeout=self.timeout)
+                return requests.get(url, headers=headers, timeout=self.timeout)
+            finally:
+                with self._lock:
+                    self._download_seconds[url] = time.perf_counter() - start
+
+    @staticmethod
+    def is_pdf(url):
+        """Check whether a URL points to a PDF document."""
+        return url.lower().endswith('.pdf')
+
+    def flush_cache(self):
+        """Write the HTTP cache index once, at the end of a run."""
+        if self.cache is not None:
+            self.cache.flush()
+
+    def close(self):
+        """Flush the HTTP cache and stop any PDF worker processes still running."""
+        self.flush_cache()
+        with self._lock:
+            processes, self._pdf_processes = self._pdf_processes, set()
+        for process in processes:
+            process.terminate()
+
+    def _extract_pdf_in_process(self, content):
+        """
+        Run extract_pdf_pages in a process of its own.
+
+        Each document gets its own process, so one stuck on a malformed
+        file is killed without affecting the others, and its time budget
+        only starts once a worker slot is free rather than while it queues.
+        """
+        with self._pdf_slots:
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(
+                target=_extract_pdf_worker,
+                args=(sender, content, self.pdf_max_pages, self.pdf_timeout),
+                daemon=True
+            )
+            process.start()
+            sender.close()
+            with self._lock:
+                self._pdf_processes.add(process)
+            try:
+                # Workers stop themselves at the deadline; the grace period only
+                # catches a page that hangs inside pypdf
+                if not receiver.poll(self.pdf_timeout + self.pdf_grace_seconds):
+                    process.terminate()
+                    raise TimeoutError(f"PDF extraction exceeded {self.pdf_timeout}s")
+                try:
+                    status, result = receiver.recv()
+                except EOFError:
+                    raise RuntimeError(f"PDF worker exited with code {process.exitcode}")
+                if status != "ok":
+                    raise RuntimeError(f"PDF extraction failed: {result}")
+                return result
+            finally:
+                receiver.close()
+                process.join(1)
+                with self._lock:
+                    self._pdf_processes.discard(process)
+
+    def extract_pdf_text(self, content, url=None):
+        """
+        Extract text from raw PDF bytes, in a worker process when pdf_workers > 0.
+
+        Extraction stops after pdf_max_pages pages or pdf_timeout seconds so a
+        single huge or malformed PDF can't stall ingestion. At most
+        pdf_workers documents are extracted at once.
+        """
+        if self.pdf_workers > 0:
+            result = self._extract_pdf_in_process(content)
+        else:
+            result = extract_pdf_pages(content, self.pdf_max_pages, self.pdf_timeout)
+        
+        note = " (truncated)" if result["truncated"] else ""
+        print(f"Extracted {result['pages']}/{result['total_pages']} pages in {result['seconds']:.2f}s{note}: {url or 'PDF'}")
+        if url is not None:
+            with self._lock:
+                self._extract_seconds[url] = result["seconds"]
+        return result["text"]
+
+    def extract_html_text(self, content):
+        """Extract visible text from raw HTML bytes."""
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # Remove scripts and styles
+        for script in soup(["script", "style", "nav", "footer"]):
+            script.decompose()
+            
+        text = soup.get_text(separator=' ')
+        # Clean up whitespace
+        lines = (line.strip() for line in text.splitlines())
+        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+        text = '\n'.join(chunk for chunk in chunks if chunk)
+        return text
+
     def fetch_pdf_content(self, url):
         """Download and extract text from a PDF URL."""
         try:
-            response = requests.get(url, timeout=10)
+            response = self._get(url)
             response.raise_for_status()
-            
-            with BytesIO(response.content) as f:
-                reader = pypdf.PdfReader(f)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
-            return text
+            return self.extract_pdf_text(response.content, url)
         except Exception as e:
             print(f"Error fetching PDF {url}: {e}")
             return ""
@@ -38,28 +213,24 @@ class DataLoader:
     def fetch_html_content(self, url):
         """Fetch and parse text from an HTML URL."""
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self._get(url, headers=HTML_HEADERS)
             response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove scripts and styles
-            for script in soup(["script", "style", "nav", "footer"]):
-                script.decompose()
-                
-            text = soup.get_text(separator=' ')
-            # Clean up whitespace
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = '\n'.join(chunk for chunk in chunks if chunk)
-            return text
+            return self.extract_html_text(response.content)
         except Exception as e:
             print(f"Error fetching HTML {url}: {e}")
             return ""
 
+    def fetch_raw(self, url):
+        """Download a URL and return the raw response body, or None on error."""
+        try:
+            headers = None if self.is_pdf(url) else HTML_HEADERS
+            response = self._get(url, headers=headers)
+            response.raise_for_status()
+            return response.content
+        except Exception as e:
+            print(f"Error fetching {url}: {e}")
+            return None
+
     def process_url(self, row):
         """Process a single URL row from the CSV."""
         url = row['url']
@@ -69,7 +240,7 @@ class DataLoader:
         print(f"Processing: {url}")
         
         content = ""
-        if url.lower().endswith('.pdf'):
+        if self.is_pdf(url):
             content = self.fetch_pdf_content(url)
         else:
             content = self.fetch_html_content(url)
@@ -96,16 +267,188 @@ class DataLoader:
         docs = text_splitter.create_documents([text], metadatas=[metadata])
         return docs
 
-    def load_and_process_all(self):
-        """Main method to load all data."""
+    def content_hash(self, row, raw):
+        """
+        Fingerprint a source: its raw bytes plus everything that shapes its chunks.
+        A change in chunking parameters or CSV metadata re-ingests the source too.
+        """
+        h = hashlib.sha256()
+        h.update(raw)
+        h.update(f"|{self.chunk_size}|{self.chunk_overlap}|{row['scheme']}|{row['description']}".encode("utf-8"))
+        return h.hexdigest()
+
+    @staticmethod
+    def chunk_ids(url, content_hash, count):
+        """Deterministic chunk IDs for one version of a source."""
+        url_key = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+        return [f"{url_key}-{content_hash[:12]}-{i:05d}" for i in range(count)]
+
+    def fetch_source(self, row, known_hash=None):
+        """
+        Download a source and, only if its content changed, extract and split it.
+
+        Args:
+            row: CSV row with url, scheme and description
+            known_hash: Content hash recorded by the previous ingestion run
+
+        Returns:
+            Dict with url, content_hash (None if the download or extraction failed) and docs
+            (None when the content is unchanged). Docs carry deterministic IDs.
+        """
+        url = row['url']
+        start = time.perf_counter()
+        result = {"url": url, "content_hash": None, "docs": None}
+        
+        raw = self.fetch_raw(url)
+        if raw:
+            content_hash = self.content_hash(row, raw)
+            result["content_hash"] = content_hash
+            if content_hash != known_hash:
+                print(f"Processing: {url}")
+                try:
+                    text = self.extract_pdf_text(raw, url) if self.is_pdf(url) else self.extract_html_text(raw)
+                except Exception as e:
+                    # Treat it like a failed download: the previous chunks stay and
+                    # the next run tries again instead of recording an empty source
+                    print(f"Error extracting {url}: {e}")
+                    result["content_hash"] = None
+                    text = None
+                if text is not None:
+                    metadata = {
+                        "source": url,
+                        "scheme": row['scheme'],
+                        "description": row['description']
+                    }
+                    docs = self.split_text(text, metadata) if text else []
+                    for doc, chunk_id in zip(docs, self.chunk_ids(url, content_hash, len(docs))):
+                        doc.id = chunk_id
+                    result["docs"] = docs
+        
+        with self._lock:
+            result["download_seconds"] = self._download_seconds.pop(url, None)
+            result["extract_seconds"] = self._extract_seconds.pop(url, None)
+        result["total_seconds"] = time.perf_counter() - start
+        return result
+
+    def iter_sources(self, known_hashes=None, max_workers=None, prefetch=None):
+        """
+        Stream fetch_source() results in CSV row order as they become ready.
+
+        At most `prefetch` sources (default 2 x max_workers) are downloaded
+        ahead of the consumer, so a slow consumer (e.g. embedding) throttles
+        fetching and memory stays bounded instead of growing with the corpus.
+
+        Args:
+            known_hashes: Mapping url -> content hash from the previous run
+            max_workers: Override the worker pool size
+            prefetch: Maximum number of sources in flight ahead of the consumer
+        """
+        known_hashes = known_hashes or {}
+        rows = [row for _, row in self.load_urls().iterrows()]
+        return self._flush_cache_after(self._iter_rows(
+            lambda row: self.fetch_source(row, known_hashes.get(row['url'])),
+            rows,
+            max_workers,
+            prefetch
+        ))
+
+    def _flush_cache_after(self, results):
+        """Pass results through, flushing the HTTP cache once they are exhausted or abandoned."""
+        try:
+            yield from results
+        finally:
+            self.flush_cache()
+
+    def load_sources(self, known_hashes=None, max_workers=None):
+        """
+        Fetch every CSV source concurrently, re-splitting only changed ones.
+
+        Args:
+            known_hashes: Mapping url -> content hash from the previous run
+            max_workers: Override the worker pool size
+
+        Returns:
+            List of fetch_source() results in CSV row order
+        """
+        return list(self.iter_sources(known_hashes, max_workers))
+
+    def _iter_rows(self, fn, rows, max_workers=None, prefetch=None):
+        """Apply fn to rows on the worker pool, yielding results in row order with a bounded window."""
+        workers = max_workers or self.max_workers
+        if workers <= 1 or len(rows) <= 1:
+            for row in rows:
+                yield fn(row)
+            return
+        
+        window = max(prefetch or workers * 2, 1)
+        row_iter = iter(rows)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=min(workers, len(rows))) as executor:
+            try:
+                for row in row_iter:
+                    pending.append(executor.submit(fn, row))
+                    if len(pending) >= window:
+                        break
+                while pending:
+                    # Waiting on the oldest future keeps output deterministic
+                    result = pending.popleft().result()
+                    next_row = next(row_iter, None)
+                    if next_row is not None:
+                        pending.append(executor.submit(fn, next_row))
+                    yield result
+            finally:
+                # Consumer stopped early or failed: don't start queued downloads
+                for future in pending:
+                    future.cancel()
+
+    def _map_rows(self, fn, rows, max_workers=None):
+        """Apply fn to every row on the worker pool, returning results in row order."""
+        return list(self._iter_rows(fn, rows, max_workers))
+
+    def _timed_process_url(self, row):
+        """Process a URL row and return (docs, timing) for reporting."""
+        start = time.perf_counter()
+        docs = self.process_url(row)
+        total = time.perf_counter() - start
+        url = row['url']
+        with self._lock:
+            download = self._download_seconds.pop(url, None)
+            extract = self._extract_seconds.pop(url, None)
+        timing = {
+            "url": url,
+            "scheme": row['scheme'],
+            "chunks": len(docs),
+            "download_seconds": download,
+            "extract_seconds": extract,
+            "total_seconds": total,
+        }
+        return docs, timing
+
+    def load_and_process_all(self, max_workers=None):
+        """
+        Main method to load all data.
+
+        URLs are fetched and parsed concurrently on a bounded thread pool
+        (max_workers=1 processes them one by one). Chunks are returned in
+        CSV row order regardless of which download finishes first, and
+        per-URL timings are stored in self.timings.
+        """
         df = self.load_urls()
-        all_docs = []
+        rows = [row for _, row in df.iterrows()]
+        
+        start = time.perf_counter()
+        results = self._map_rows(self._timed_process_url, rows, max_workers)
+        self.flush_cache()
+        elapsed = time.perf_counter() - start
         
-        for _, row in df.iterrows():
-            docs = self.process_url(row)
+        all_docs = []
+        self.timings = []
+        for docs, timing in results:
             all_docs.extend(docs)
+            self.timings.append(timing)
+            print(f"  {timing['total_seconds']:6.2f}s  {timing['chunks']:4d} chunks  {timing['url']}")
             
-        print(f"Total documents processed: {len(all_docs)}")
+        print(f"Total documents processed: {len(all_docs)} from {len(rows)} URLs in {elapsed:.2f}s")
         return all_docs
 
 if __name__ == "__main__":
@@ -0,0 +1,288 @@
+"""
+Embedding caches.
+Chunk vectors are stored in SQLite keyed by (model name, hash of the
+normalized chunk text), so identical text is only embedded once across
+ingestion runs, sources and chunking-parameter changes. Query vectors are
+kept in a bounded in-memory LRU so repeated questions skip the model.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Get the project root directory (parent of src)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EMBEDDING_CACHE_PATH = os.path.join(PROJECT_ROOT, "embedding_cache", "embeddings.sqlite3")
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH = 500
+
+
+def normalize_text(text: str) -> str:
+    """Normalize chunk text so whitespace-only differences share a cache entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_hash(text: str) -> str:
+    """Hash of the normalized text."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    SQLite-backed store of chunk embeddings with least-recently-used eviction.
+    The database is opened lazily on first use.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            path: SQLite file (defaults to EMBEDDING_CACHE_PATH env var or ./embedding_cache/)
+            max_entries: Entries kept before the least recently used are evicted
+                         (defaults to EMBEDDING_CACHE_MAX_ENTRIES env var, 100000)
+        """
+        self.path = path or os.getenv("EMBEDDING_CACHE_PATH", EMBEDDING_CACHE_PATH)
+        self.max_entries = max_entries or int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " hash TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (model, hash))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings (last_used)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """
+        Look up many chunk hashes at once.
+
+        Returns:
+            Mapping hash -> vector for the hashes that are cached
+        """
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            for i in range(0, len(unique), _LOOKUP_BATCH):
+                batch = unique[i:i + _LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND hash = ?",
+                    [(now, model, h) for h in found]
+                )
+                conn.commit()
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(unique) - len(found)
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]):
+        """Store vectors by hash, evicting the least recently used beyond max_entries."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(model, h, np.asarray(v, dtype=np.float32).tobytes(), now) for h, v in items.items()]
+            )
+            count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (overflow,)
+                )
+                self.stats["evicted"] += overflow
+            conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class QueryEmbeddingCache:
+    """
+    Thread-safe in-memory LRU cache of query embeddings, bounded by bytes.
+    FAQ traffic repeats the same questions, so hits skip the model entirely.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Memory allowed for cached vectors and keys
+                       (defaults to QUERY_CACHE_MAX_BYTES env var, 16 MB)
+        """
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("QUERY_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+        self.bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size(key: Tuple[str, str], vector: np.ndarray) -> int:
+        return vector.nbytes + len(key[0]) + len(key[1])
+
+    def get(self, model: str, query: str) -> Optional[List[float]]:
+        """Return the cached vector for a query, or None."""
+        key = (model, normalize_text(query))
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+        return vector.tolist()
+
+    def put(self, model: str, query: str, vector: List[float]):
+        """Cache a query vector, evicting the least recently used beyond max_bytes."""
+        key = (model, normalize_text(query))
+        # float64 keeps the model's values exactly
+        array = np.asarray(vector, dtype=np.float64)
+        size = self._size(key, array)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= self._size(key, old)
+            self._entries[key] = array
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                old_key, old_vector = self._entries.popitem(last=False)
+                self.bytes -= self._size(old_key, old_vector)
+                self.stats["evicted"] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def hit_rate(self) -> float:
+        """Share of lookups served from the cache."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def clear(self):
+        """Drop every cached vector."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+
+_query_cache = QueryEmbeddingCache()
+
+
+def get_query_cache() -> QueryEmbeddingCache:
+    """Return the process-wide query embedding cache."""
+    return _query_cache
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves chunk vectors from an EmbeddingCache and
+    only runs the model on text it has not embedded before.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: Optional[EmbeddingCache] = None,
+                 model_name: Optional[str] = None, query_cache: Optional[QueryEmbeddingCache] = None):
+        """
+        Initialize the wrapper.
+
+        Args:
+            embeddings: Underlying embedding function (the shared model)
+            cache: Persistent chunk cache (creates the default one if None)
+            model_name: Cache namespace (defaults to the wrapped model's name)
+            query_cache: In-memory query cache (defaults to the process-wide one)
+        """
+        self.embeddings = embeddings
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self.query_cache = query_cache if query_cache is not None else get_query_cache()
+        self.model_name = model_name or getattr(embeddings, "model_name", type(embeddings).__name__)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed chunks, computing only cache misses in a single model call."""
+        if not texts:
+            return []
+        hashes = [text_hash(t) for t in texts]
+        cached = self.cache.get_many(self.model_name, hashes)
+
+        # Embed each distinct missing text once, even if it repeats in this batch
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = t
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(self.model_name, computed)
+            cached.update(computed)
+
+        return [cached[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, reusing the vector of an identical earlier query."""
+        vector = self.query_cache.get(self.model_name, text)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.query_cache.put(self.model_name, text, vector)
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed many queries, computing the uncached ones in a single model call.
+        The vectors land in the query cache, so embed_query() for any of them is a hit.
+        """
+        vectors = {}
+        missing = []
+        for text in texts:
+            key = normalize_text(text)
+            if key in vectors:
+                continue
+            vectors[key] = self.query_cache.get(self.model_name, text)
+            if vectors[key] is None:
+                missing.append(text)
+        if missing:
+            # Sentence-transformers embed queries and documents the same way
+            for text, vector in zip(missing, self.embeddings.embed_documents(missing)):
+                vectors[normalize_text(text)] = vector
+                self.query_cache.put(self.model_name, text, vector)
+        return [vectors[normalize_text(text)] for text in texts]
@@ -1,8 +1,157 @@
+"""
+Embeddings module providing a process-wide registry of embedding models.
+Every VectorStore, Retriever and ingestion script in the process shares one
+copy of the model weights per (model name, device).
+"""
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
 from langchain_community.embeddings import SentenceTransformerEmbeddings
 
-def get_embedding_function():
+# Using a lightweight, high-performance model suitable for CPU usage
+# all-MiniLM-L6-v2 is a standard choice for tasks like this
+DEFAULT_MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+DEFAULT_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu")
+
+
+def _current_rss_bytes() -> Optional[int]:
+    """Return the resident set size of this process, or None if unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _weights_bytes(embeddings) -> Optional[int]:
+    """Return the size of the model parameters in bytes, or None if unknown."""
+    try:
+        return sum(p.numel() * p.element_size() for p in embeddings.client.parameters())
+    except Exception:
+        return None
+
+
+class EmbeddingModelRegistry:
+    """
+    Thread-safe, process-wide cache of loaded embedding models.
+    Models are loaded lazily on first use and kept for the life of the process.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._models: Dict[Tuple[str, str], SentenceTransformerEmbeddings] = {}
+        self._stats: Dict[Tuple[str, str], Dict] = {}
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+            return self._key_locks[key]
+
+    def get(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        device: str = DEFAULT_DEVICE
+    ) -> SentenceTransformerEmbeddings:
+        """
+        Return the shared embedding function, loading it on first request.
+
+        Args:
+            model_name: Sentence-transformers model name
+            device: Torch device to load the model on
+
+        Returns:
+            Shared SentenceTransformerEmbeddings instance
+        """
+        key = (model_name, device)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        # Per-model lock so concurrent first callers load the weights only once
+        # without blocking lookups of other, already loaded models.
+        with self._key_lock(key):
+            model = self._models.get(key)
+            if model is not None:
+                return model
+
+            rss_before = _current_rss_bytes()
+            start = time.perf_counter()
+            model = SentenceTransformerEmbeddings(
+                model_name=model_name,
+                model_kwargs={'device': device}
+            )
+            load_seconds = time.perf_counter() - start
+            rss_after = _current_rss_bytes()
+
+            self._stats[key] = {
+                "model_name": model_name,
+                "device": device,
+                "load_seconds": load_seconds,
+                "weights_bytes": _weights_bytes(model),
+                "rss_delta_bytes": (
+                    rss_after - rss_before
+                    if rss_before is not None and rss_after is not None
+                    else None
+                ),
+                "loaded_at": time.time(),
+            }
+            self._models[key] = model
+            print(f"Loaded embedding model {model_name} on {device} in {load_seconds:.2f}s")
+            return model
+
+    def warmup(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        device: str = DEFAULT_DEVICE
+    ) -> Dict:
+        """
+        Load a model ahead of the first query and run one forward pass.
+
+        Returns:
+            Load metrics for the model (see stats())
+        """
+        model = self.get(model_name, device)
+        start = time.perf_counter()
+        model.embed_query("warmup")
+        self._stats[(model_name, device)]["warmup_seconds"] = time.perf_counter() - start
+        return dict(self._stats[(model_name, device)])
+
+    def is_loaded(self, model_name: str = DEFAULT_MODEL_NAME, device: str = DEFAULT_DEVICE) -> bool:
+        """Check whether a model has already been loaded."""
+        return (model_name, device) in self._models
+
+    def stats(self) -> list:
+        """Return load time and memory metrics for every loaded model."""
+        with self._lock:
+            return [dict(s) for s in self._stats.values()]
+
+    def clear(self):
+        """Drop all loaded models (mainly for tests)."""
+        with self._lock:
+            self._models.clear()
+            self._stats.clear()
+            self._key_locks.clear()
+
+
+_registry = EmbeddingModelRegistry()
+
+
+def get_embedding_registry() -> EmbeddingModelRegistry:
+    """Return the process-wide embedding model registry."""
+    return _registry
+
+
+def get_embedding_function(model_name: str = DEFAULT_MODEL_NAME, device: str = DEFAULT_DEVICE):
     """Return the singleton embedding function."""
-    # Using a lightweight, high-performance model suitable for CPU usage
-    # all-MiniLM-L6-v2 is a standard choice for tasks like this
-    embeddings = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2", model_kwargs={'device': 'cpu'})
-    return embeddings
+    return _registry.get(model_name, device)
+
+
+def warmup_embedding_model(model_name: str = DEFAULT_MODEL_NAME, device: str = DEFAULT_DEVICE) -> Dict:
+    """Eagerly load the embedding model and return its load metrics."""
+    return _registry.warmup(model_name, device)
@@ -0,0 +1,227 @@
+"""
+On-disk HTTP cache for source documents.
+Stores raw response bodies content-addressed by SHA-256 and revalidates them
+with conditional GETs (ETag / Last-Modified), so unchanged KIM/SID PDFs and
+scheme pages are served from disk instead of being downloaded again.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+import requests
+
+# Get the project root directory (parent of src)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HTTP_CACHE_PATH = os.path.join(PROJECT_ROOT, "http_cache")
+
+
+class CachedResponse:
+    """Minimal response object mirroring the parts of requests.Response we use."""
+
+    def __init__(self, url: str, content: bytes, status_code: int = 200,
+                 headers: Optional[Dict] = None, from_cache: bool = False):
+        self.url = url
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+    def raise_for_status(self):
+        """Raise requests.HTTPError for 4xx/5xx responses."""
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+class HttpCache:
+    """
+    Content-addressed cache of raw HTTP responses with conditional revalidation.
+
+    Layout on disk:
+        <cache_dir>/index.json       url -> {sha256, etag, last_modified, ...}
+        <cache_dir>/blobs/<sha256>   raw response body
+
+    Index changes are kept in memory and written by flush() (or on leaving a
+    `with` block), once per run rather than once per request. Blobs are
+    written straight away, so an unflushed run only costs revalidations.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, offline: Optional[bool] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Cache directory (defaults to HTTP_CACHE_DIR env var or ./http_cache)
+            offline: Serve only from cache without touching the network
+                     (defaults to HTTP_CACHE_OFFLINE env var)
+        """
+        self.cache_dir = cache_dir or os.getenv("HTTP_CACHE_DIR", HTTP_CACHE_PATH)
+        if offline is None:
+            offline = os.getenv("HTTP_CACHE_OFFLINE", "0").lower() in ("1", "true", "yes")
+        self.offline = offline
+        self.blob_dir = os.path.join(self.cache_dir, "blobs")
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stale": 0}
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._index = self._load_index()
+        # Index entries using each blob, so replaced bodies can be deleted
+        self._blob_refs = Counter(entry["sha256"] for entry in self._index.values())
+        self._dirty = False
+        self._flush_lock = threading.Lock()
+
+    def __enter__(self) -> "HttpCache":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def _load_index(self) -> Dict:
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable HTTP cache index {self.index_path}: {e}")
+            return {}
+
+    def flush(self):
+        """Write the index to disk if it changed since the last flush."""
+        # One writer at a time; fetches only wait for the in-memory snapshot
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = json.dumps(self._index, indent=2, sort_keys=True)
+                self._dirty = False
+            # Write-then-rename so a crash never leaves a truncated index behind
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.index_path)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest)
+
+    def _read_blob(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._blob_path(digest), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_blob(self, content: bytes) -> str:
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        return digest
+
+    def entry(self, url: str) -> Optional[Dict]:
+        """Return the index entry for a URL, if cached."""
+        with self._lock:
+            entry = self._index.get(url)
+            return dict(entry) if entry else None
+
+    def _cached_response(self, url: str, entry: Dict) -> Optional[CachedResponse]:
+        content = self._read_blob(entry["sha256"])
+        if content is None:
+            return None
+        headers = {"Content-Type": entry.get("content_type", "")}
+        return CachedResponse(url, content, 200, headers, from_cache=True)
+
+    def get(self, url: str, headers: Optional[Dict] = None, timeout: float = 10) -> CachedResponse:
+        """
+        Fetch a URL through the cache.
+
+        Cached entries are revalidated with If-None-Match / If-Modified-Since;
+        a 304 reply is served from disk. In offline mode, or when the network
+        request fails, the last cached copy is returned if there is one.
+
+        Args:
+            url: URL to fetch
+            headers: Extra request headers
+            timeout: Request timeout in seconds
+
+        Returns:
+            CachedResponse with the body and a from_cache flag
+        """
+        entry = self.entry(url)
+        cached = self._cached_response(url, entry) if entry else None
+
+        if self.offline:
+            if cached is None:
+                raise requests.ConnectionError(f"Offline mode: {url} is not in the HTTP cache")
+            self._count("hits")
+            return cached
+
+        request_headers = dict(headers or {})
+        if cached is not None:
+            if entry.get("etag"):
+                request_headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                request_headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            response = requests.get(url, headers=request_headers, timeout=timeout)
+        except requests.RequestException as e:
+            if cached is None:
+                raise
+            print(f"Network error for {url} ({e}); serving cached copy")
+            self._count("stale")
+            return cached
+
+        if response.status_code == 304 and cached is not None:
+            self._count("revalidated")
+            with self._lock:
+                self._index[url]["validated_at"] = time.time()
+                self._dirty = True
+            return cached
+
+        if response.status_code >= 400:
+            if cached is not None and response.status_code >= 500:
+                print(f"HTTP {response.status_code} for {url}; serving cached copy")
+                self._count("stale")
+                return cached
+            return CachedResponse(url, response.content, response.status_code, dict(response.headers))
+
+        self._count("misses")
+        digest = self._write_blob(response.content)
+        now = time.time()
+        with self._lock:
+            previous = self._index.get(url)
+            self._index[url] = {
+                "sha256": digest,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "content_type": response.headers.get("Content-Type", ""),
+                "size": len(response.content),
+                "fetched_at": now,
+                "validated_at": now,
+            }
+            self._blob_refs[digest] += 1
+            if previous is not None:
+                self._release_blob(previous["sha256"])
+            self._dirty = True
+        return CachedResponse(url, response.content, response.status_code, dict(response.headers))
+
+    def _release_blob(self, digest: str):
+        """Drop one reference to a blob, deleting it once no entry uses it (call with the lock held)."""
+        self._blob_refs[digest] -= 1
+        if self._blob_refs[digest] <= 0:
+            del self._blob_refs[digest]
+            try:
+                os.remove(self._blob_path(digest))
+            except OSError:
+                pass
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
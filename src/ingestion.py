@@ -0,0 +1,235 @@
+"""
+Incremental ingestion module.
+Keeps a manifest of per-source content hashes and the chunk IDs each source
+produced, so re-ingestion only re-extracts, re-splits and re-embeds sources
+whose content changed and removes their stale chunks from the index.
+"""
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+class IngestionManifest:
+    """
+    JSON manifest stored next to the FAISS index.
+
+    Format:
+        {"sources": {url: {"content_hash", "chunk_ids", "scheme", "ingested_at"}}}
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the manifest.
+
+        Args:
+            path: Path of the manifest JSON file
+        """
+        self.path = path
+        self.sources: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.sources = json.load(f).get("sources", {})
+
+    @property
+    def exists(self) -> bool:
+        """Whether the manifest has been saved before."""
+        return os.path.exists(self.path)
+
+    def content_hashes(self) -> Dict[str, str]:
+        """Return url -> content hash for every recorded source."""
+        return {url: entry["content_hash"] for url, entry in self.sources.items()}
+
+    def chunk_ids(self, url: str) -> List[str]:
+        """Return the chunk IDs recorded for a source."""
+        return list(self.sources.get(url, {}).get("chunk_ids", []))
+
+    def update(self, url: str, content_hash: str, chunk_ids: List[str], scheme: Optional[str] = None):
+        """Record the current version of a source."""
+        self.sources[url] = {
+            "content_hash": content_hash,
+            "chunk_ids": list(chunk_ids),
+            "scheme": scheme,
+            "ingested_at": time.time(),
+        }
+
+    def remove(self, url: str):
+        """Forget a source."""
+        self.sources.pop(url, None)
+
+    def save(self):
+        """Write the manifest atomically."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"sources": self.sources}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class IncrementalIngestor:
+    """
+    Brings a VectorStore in line with the CSV sources, touching only what changed.
+
+    Sources are streamed from the loader and embedded in batches of chunks,
+    so memory stays bounded by the batch size. Batches are appended to the
+    in-memory index, which is saved (with the manifest) at checkpoints and at
+    the end of the run. Every save rewrites the whole index, so checkpoints
+    get further apart as it grows: the first batch is published at once, so
+    early sources are searchable while later ones download, and after that
+    the index is saved again once as many chunks have changed as it held at
+    its last save. Saves therefore at most double the total chunks written.
+    """
+
+    def __init__(
+        self,
+        loader,
+        vector_store,
+        manifest_path: Optional[str] = None,
+        batch_size: int = 256,
+        checkpoint_chunks: Optional[int] = None,
+    ):
+        """
+        Initialize the ingestor.
+
+        Args:
+            loader: DataLoader used to fetch and split sources
+            vector_store: VectorStore to update
+            manifest_path: Manifest location (defaults to manifest.json in the index directory)
+            batch_size: Chunks embedded and appended to the index per batch
+            checkpoint_chunks: Fewest changed chunks between intermediate saves
+                (defaults to batch_size); the interval also grows with the index
+        """
+        self.loader = loader
+        self.vector_store = vector_store
+        self.manifest_path = manifest_path or os.path.join(vector_store.faiss_path, MANIFEST_FILENAME)
+        self.batch_size = batch_size
+        self.checkpoint_chunks = checkpoint_chunks or batch_size
+        self._unsaved_chunks = 0
+        self._saved_size = 0
+        self._rebuilding = False
+
+    def _flush(self, manifest: IngestionManifest, pending: List[Dict], summary: Dict):
+        """Replace the chunks of the pending sources in the in-memory index, then record them."""
+        if not pending:
+            return
+        # Also drop the new IDs in case an interrupted run already added some of them
+        stale_ids = []
+        for source in pending:
+            stale_ids.extend(manifest.chunk_ids(source["url"]))
+            stale_ids.extend(doc.id for doc in source["docs"])
+        deleted = self.vector_store.delete_documents(stale_ids, save=False)
+
+        added = 0
+        docs = [doc for source in pending for doc in source["docs"]]
+        for i in range(0, len(docs), self.batch_size):
+            added += self.vector_store.add_documents(docs[i:i + self.batch_size], save=False)
+        summary["chunks_deleted"] += deleted
+        summary["chunks_added"] += added
+        self._unsaved_chunks += deleted + added
+
+        for source in pending:
+            scheme = source["docs"][0].metadata.get("scheme") if source["docs"] else None
+            manifest.update(source["url"], source["content_hash"], [doc.id for doc in source["docs"]], scheme)
+        pending.clear()
+
+    def _index_size(self) -> int:
+        """Number of chunks currently in the in-memory index."""
+        db = self.vector_store.get_db()
+        return len(db.index_to_docstore_id) if db is not None else 0
+
+    def _checkpoint(self, manifest: IngestionManifest, final: bool = False):
+        """Save the index, then the manifest that describes it."""
+        if self._rebuilding and not final:
+            # Persist progress without publishing a partial index; the manifest on
+            # disk keeps describing the published one until the rebuild completes
+            if self._unsaved_chunks:
+                self.vector_store.save(publish=False)
+                self._unsaved_chunks = 0
+                self._saved_size = self._index_size()
+            return
+        if self._unsaved_chunks or self._rebuilding:
+            self.vector_store.save()
+            self._unsaved_chunks = 0
+            self._saved_size = self._index_size()
+        manifest.save()
+
+    def run(self, full_rebuild: bool = False) -> Dict:
+        """
+        Run one ingestion pass.
+
+        Args:
+            full_rebuild: Drop the index and manifest and re-ingest everything
+
+        Returns:
+            Summary dict with per-category URL lists and chunk counts
+        """
+        manifest = IngestionManifest(self.manifest_path)
+
+        # An index without a manifest was built before chunk IDs were tracked;
+        # its chunks can't be matched to sources, so rebuild it once.
+        if full_rebuild or (not manifest.exists and self.vector_store.get_db() is not None):
+            print("Rebuilding index from scratch")
+            # The published index keeps serving queries until the rebuilt one replaces it
+            self.vector_store.reset()
+            # Start from no recorded sources so everything is re-fetched; the file
+            # on disk still describes the published index until the rebuild replaces it
+            manifest.sources = {}
+            self._rebuilding = True
+        else:
+            self._rebuilding = False
+
+        self._unsaved_chunks = 0
+        self._saved_size = self._index_size()
+        summary = {
+            "new": [], "changed": [], "unchanged": [], "failed": [], "removed": [],
+            "chunks_added": 0, "chunks_deleted": 0,
+        }
+        pending: List[Dict] = []
+        pending_chunks = 0
+        seen_urls = set()
+
+        for result in self.loader.iter_sources(manifest.content_hashes()):
+            url = result["url"]
+            seen_urls.add(url)
+            if result["content_hash"] is None:
+                # Keep the previous chunks rather than dropping a source on a transient failure
+                summary["failed"].append(url)
+                continue
+            if result["docs"] is None:
+                summary["unchanged"].append(url)
+                continue
+
+            summary["changed" if url in manifest.sources else "new"].append(url)
+            pending.append(result)
+            pending_chunks += len(result["docs"])
+            if pending_chunks >= self.batch_size:
+                self._flush(manifest, pending, summary)
+                pending_chunks = 0
+                print(f"Indexed {summary['chunks_added']} chunks so far")
+                # Each save rewrites the whole index, so space them out as it grows
+                if self._unsaved_chunks >= max(self.checkpoint_chunks, self._saved_size):
+                    self._checkpoint(manifest)
+
+        self._flush(manifest, pending, summary)
+
+        removed_ids: List[str] = []
+        for url in list(manifest.sources):
+            if url not in seen_urls:
+                summary["removed"].append(url)
+                removed_ids.extend(manifest.chunk_ids(url))
+                manifest.remove(url)
+        if removed_ids:
+            deleted = self.vector_store.delete_documents(removed_ids, save=False)
+            summary["chunks_deleted"] += deleted
+            self._unsaved_chunks += deleted
+        self._checkpoint(manifest, final=True)
+
+        print(
+            f"Ingestion: {len(summary['new'])} new, {len(summary['changed'])} changed, "
+            f"{len(summary['unchanged'])} unchanged, {len(summary['removed'])} removed, "
+            f"{len(summary['failed'])} failed; "
+            f"+{summary['chunks_added']} / -{summary['chunks_deleted']} chunks"
+        )
+        return summary
@@ -1,22 +1,115 @@
 """
-LLM wrapper module supporting multiple providers (Gemini, Grok).
+LLM wrapper module supporting multiple providers (Gemini, Grok, OpenAI-compatible).
 Handles API calls, prompt formatting, and error handling.
 """
 import os
+import re
+import math
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, List, Tuple
 from dotenv import load_dotenv
+from rate_limiter import get_rate_limiter
+from circuit_breaker import get_circuit_breaker
 
 # Load environment variables
 load_dotenv()
 
 
+class RetryableError(RuntimeError):
+    """A transient provider failure (timeout, connection error, 5xx) worth retrying."""
+
+
+class RateLimitError(RetryableError):
+    """The provider rejected a call for rate or quota reasons."""
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(e: Exception) -> Optional[float]:
+    """Seconds a throttled provider asked us to wait, if the error says."""
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        value = headers.get("retry-after")
+        try:
+            if value is not None:
+                return float(value)
+        except (TypeError, ValueError):
+            pass
+    # Gemini puts the delay in the message: "retry in 12.5s" / "retry_delay { seconds: 12 }"
+    match = re.search(r"retry in ([\d.]+)s|retry_delay\s*\{\s*seconds:\s*(\d+)", str(e))
+    if match:
+        return float(match.group(1) or match.group(2))
+    return None
+
+
+class LLMUnavailableError(RuntimeError):
+    """No answer could be had from the provider in time."""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """The provider's circuit breaker is open, so the call was not made."""
+
+
+class DeadlineExceededError(LLMUnavailableError):
+    """The request's deadline passed before the provider answered."""
+
+
+def http_status(e: Exception) -> Optional[int]:
+    """
+    HTTP status of an SDK exception: its status_code/code attributes or its response's,
+    else a status leading the message ("503 Service Unavailable", "Error code: 503 - ...").
+    """
+    for status in (getattr(e, "status_code", None), getattr(e, "code", None),
+                   getattr(getattr(e, "response", None), "status_code", None)):
+        if isinstance(status, int) and not isinstance(status, bool) and 100 <= status <= 599:
+            return status
+    match = re.match(r"\s*(?:Error code:\s*)?([1-5]\d\d)\b", str(e))
+    return int(match.group(1)) if match else None
+
+
+def is_transient(e: Exception) -> bool:
+    """Whether an SDK exception is a timeout, connection problem or server (5xx) error."""
+    if isinstance(e, (TimeoutError, ConnectionError)):
+        return True
+    name = type(e).__name__
+    if any(word in name for word in ("Timeout", "Connection", "DeadlineExceeded", "ServiceUnavailable",
+                                     "InternalServerError", "ServerError")):
+        return True
+    status = http_status(e)
+    return status is not None and status >= 500
+
+
 class LLMProvider:
     """Base class for LLM providers."""
     
     def generate(self, prompt: str, **kwargs) -> str:
         """Generate response from LLM."""
         raise NotImplementedError
+    
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """
+        Generate response without blocking the event loop.
+        Providers with an async SDK client override this; the default runs
+        generate() in a worker thread.
+        """
+        return await asyncio.to_thread(self.generate, prompt, **kwargs)
+    
+    def generate_stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """
+        Generate response as a stream of text pieces.
+        Providers with a streaming API override this; the default yields the
+        whole generate() response at once.
+        """
+        yield self.generate(prompt, **kwargs)
 
 
 class GeminiProvider(LLMProvider):
@@ -42,7 +135,8 @@ class GeminiProvider(LLMProvider):
         self.genai.configure(api_key=api_key)
         self.model = self.genai.GenerativeModel(model)
     
-    def generate(self, prompt: str, temperature: float = 0.1, max_tokens: int = 1000) -> str:
+    def generate(self, prompt: str, temperature: float = 0.1, max_tokens: int = 1000,
+                 timeout: Optional[float] = None) -> str:
         """
         Generate response using Gemini.
         
@@ -50,6 +144,7 @@ class GeminiProvider(LLMProvider):
             prompt: Input prompt
             temperature: Sampling temperature (0.0-1.0)
             max_tokens: Maximum tokens in response
+            timeout: Seconds to wait for the API (None = SDK default)
             
         Returns:
             Generated text response
@@ -62,79 +157,138 @@ class GeminiProvider(LLMProvider):
             
             response = self.model.generate_content(
                 prompt,
-                generation_config=generation_config
+                generation_config=generation_config,
+                request_options={"timeout": timeout} if timeout else None
             )
             
             return response.text
         except Exception as e:
-            error_msg = str(e)
+            raise self._error(e)
+    
+    async def agenerate(self, prompt: str, temperature: float = 0.1, max_tokens: int = 1000,
+                 timeout: Optional[float] = None) -> str:
+        """Generate response using Gemini's async client (see generate())."""
+        try:
+            generation_config = {
+                "temperature": temperature,
+                "max_output_tokens": max_tokens,
+            }
             
-            # Provide user-friendly error messages
-            if "429" in error_msg or "quota" in error_msg.lower():
-                raise RuntimeError(
-                    "⚠️ API QUOTA EXCEEDED\n"
-                    "You've reached the Gemini free tier limit.\n"
-                    "Solutions:\n"
-                    "  1. Wait a few minutes and try again\n"
-                    "  2. Upgrade at https://ai.google.dev/pricing\n"
-                    "  3. Use a different API key"
-                )
-            elif "rate limit" in error_msg.lower():
-                raise RuntimeError(
-                    "⚠️ RATE LIMIT EXCEEDED\n"
-                    "Too many requests in a short time.\n"
-                    "Please wait 30-60 seconds and try again."
-                )
-            elif "404" in error_msg or "not found" in error_msg.lower():
-                raise RuntimeError(
-                    f"⚠️ MODEL NOT FOUND\n"
-                    f"The model '{self.model._model_name}' is not available.\n"
-                    f"Try changing GEMINI_MODEL in .env to 'gemini-pro'"
-                )
-            elif "invalid api key" in error_msg.lower() or "401" in error_msg:
-                raise RuntimeError(
-                    "⚠️ INVALID API KEY\n"
-                    "Please check your GEMINI_API_KEY in .env file.\n"
-                    "Get a key at https://ai.google.dev/"
-                )
-            else:
-                raise RuntimeError(f"Gemini API error: {error_msg}")
+            response = await self.model.generate_content_async(
+                prompt,
+                generation_config=generation_config,
+                request_options={"timeout": timeout} if timeout else None
+            )
+            
+            return response.text
+        except Exception as e:
+            raise self._error(e)
+    
+    def generate_stream(self, prompt: str, temperature: float = 0.1, max_tokens: int = 1000,
+                 timeout: Optional[float] = None) -> Iterator[str]:
+        """Generate response using Gemini, yielding text as it arrives (see generate())."""
+        try:
+            generation_config = {
+                "temperature": temperature,
+                "max_output_tokens": max_tokens,
+            }
+            
+            response = self.model.generate_content(
+                prompt,
+                generation_config=generation_config,
+                stream=True,
+                request_options={"timeout": timeout} if timeout else None
+            )
+            
+            for chunk in response:
+                # The final chunk may only carry the finish reason
+                if chunk.parts:
+                    yield chunk.text
+        except Exception as e:
+            raise self._error(e)
+    
+    def _error(self, e: Exception) -> RuntimeError:
+        """Translate an API exception into a user-friendly error."""
+        error_msg = str(e)
+        status = http_status(e)
+        
+        # Provide user-friendly error messages
+        if status == 429 or "quota" in error_msg.lower():
+            return RateLimitError(
+                "⚠️ API QUOTA EXCEEDED\n"
+                "You've reached the Gemini free tier limit.\n"
+                "Solutions:\n"
+                "  1. Wait a few minutes and try again\n"
+                "  2. Upgrade at https://ai.google.dev/pricing\n"
+                "  3. Use a different API key",
+                retry_after_seconds(e)
+            )
+        elif "rate limit" in error_msg.lower():
+            return RateLimitError(
+                "⚠️ RATE LIMIT EXCEEDED\n"
+                "Too many requests in a short time.\n"
+                "Please wait 30-60 seconds and try again.",
+                retry_after_seconds(e)
+            )
+        elif status == 404 or "not found" in error_msg.lower():
+            return RuntimeError(
+                f"⚠️ MODEL NOT FOUND\n"
+                f"The model '{self.model._model_name}' is not available.\n"
+                f"Try changing GEMINI_MODEL in .env to 'gemini-pro'"
+            )
+        elif "invalid api key" in error_msg.lower() or status == 401:
+            return RuntimeError(
+                "⚠️ INVALID API KEY\n"
+                "Please check your GEMINI_API_KEY in .env file.\n"
+                "Get a key at https://ai.google.dev/"
+            )
+        elif is_transient(e):
+            return RetryableError(f"Gemini API error: {error_msg}")
+        else:
+            return RuntimeError(f"Gemini API error: {error_msg}")
 
 
-class GrokProvider(LLMProvider):
-    """Grok API provider (using OpenAI-compatible API)."""
+class OpenAICompatibleProvider(LLMProvider):
+    """Provider for any OpenAI-compatible chat completions API."""
     
-    def __init__(self, api_key: str, model: str = "grok-beta"):
+    def __init__(self, api_key: str, model: str, base_url: Optional[str] = None):
         """
-        Initialize Grok provider.
+        Initialize OpenAI-compatible provider.
         
         Args:
-            api_key: Grok API key
-            model: Model name (default: grok-beta)
+            api_key: API key for the endpoint
+            model: Model name
+            base_url: API base URL (None = api.openai.com)
         """
         try:
-            from openai import OpenAI
+            from openai import AsyncOpenAI, OpenAI
         except ImportError:
             raise ImportError(
                 "openai not installed. "
                 "Install with: pip install openai"
             )
         
-        # Grok uses OpenAI-compatible API
         self.client = OpenAI(
             api_key=api_key,
-            base_url="https://api.x.ai/v1"
+            base_url=base_url
         )
+        self.async_client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url
+        )
+        self.base_url = base_url
         self.model = model
     
-    def generate(self, prompt: str, temperature: float = 0.1, max_tokens: int = 1000) -> str:
+    def generate(self, prompt: str, temperature: float = 0.1, max_tokens: int = 1000,
+                 timeout: Optional[float] = None) -> str:
         """
-        Generate response using Grok.
+        Generate response using the chat completions API.
         
         Args:
             prompt: Input prompt
             temperature: Sampling temperature (0.0-1.0)
             max_tokens: Maximum tokens in response
+            timeout: Seconds to wait for the API (None = SDK default)
             
         Returns:
             Generated text response
@@ -144,32 +298,151 @@ class GrokProvider(LLMProvider):
                 model=self.model,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=temperature,
-                max_tokens=max_tokens
+                max_tokens=max_tokens,
+                **({"timeout": timeout} if timeout else {})
             )
             
             return response.choices[0].message.content
         except Exception as e:
-            error_msg = str(e)
+            raise self._error(e)
+    
+    async def agenerate(self, prompt: str, temperature: float = 0.1, max_tokens: int = 1000,
+                 timeout: Optional[float] = None) -> str:
+        """Generate response using the async client (see generate())."""
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **({"timeout": timeout} if timeout else {})
+            )
             
-            # Provide user-friendly error messages
-            if "429" in error_msg or "quota" in error_msg.lower():
-                raise RuntimeError(
-                    "⚠️ API QUOTA EXCEEDED\n"
-                    "You've reached your Grok API limit.\n"
-                    "Check your plan at https://x.ai"
-                )
-            elif "rate limit" in error_msg.lower():
-                raise RuntimeError(
-                    "⚠️ RATE LIMIT EXCEEDED\n"
-                    "Too many requests. Please wait and try again."
-                )
-            elif "invalid api key" in error_msg.lower() or "401" in error_msg:
-                raise RuntimeError(
-                    "⚠️ INVALID API KEY\n"
-                    "Please check your GROK_API_KEY in .env file."
-                )
-            else:
-                raise RuntimeError(f"Grok API error: {error_msg}")
+            return response.choices[0].message.content
+        except Exception as e:
+            raise self._error(e)
+    
+    def generate_stream(self, prompt: str, temperature: float = 0.1, max_tokens: int = 1000,
+                 timeout: Optional[float] = None) -> Iterator[str]:
+        """Generate response, yielding text as it arrives (see generate())."""
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                **({"timeout": timeout} if timeout else {})
+            )
+            
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise self._error(e)
+    
+    def _error(self, e: Exception) -> RuntimeError:
+        """Translate an API exception into a user-friendly error."""
+        error_msg = str(e)
+        status = http_status(e)
+        
+        if status == 429 or "quota" in error_msg.lower() or "rate limit" in error_msg.lower():
+            return RateLimitError(
+                "⚠️ RATE LIMIT EXCEEDED\n"
+                f"{self.base_url or 'The OpenAI API'} is throttling requests. Please wait and try again.",
+                retry_after_seconds(e)
+            )
+        elif "invalid api key" in error_msg.lower() or status == 401:
+            return RuntimeError(
+                "⚠️ INVALID API KEY\n"
+                "Please check your OPENAI_API_KEY in .env file."
+            )
+        elif is_transient(e):
+            return RetryableError(f"OpenAI-compatible API error: {error_msg}")
+        else:
+            return RuntimeError(f"OpenAI-compatible API error: {error_msg}")
+
+
+class GrokProvider(OpenAICompatibleProvider):
+    """Grok API provider (using OpenAI-compatible API)."""
+    
+    def __init__(self, api_key: str, model: str = "grok-beta"):
+        """
+        Initialize Grok provider.
+        
+        Args:
+            api_key: Grok API key
+            model: Model name (default: grok-beta)
+        """
+        super().__init__(api_key, model, base_url="https://api.x.ai/v1")
+    
+    def _error(self, e: Exception) -> RuntimeError:
+        """Translate an API exception into a user-friendly error."""
+        error_msg = str(e)
+        status = http_status(e)
+        
+        # Provide user-friendly error messages
+        if status == 429 or "quota" in error_msg.lower():
+            return RateLimitError(
+                "⚠️ API QUOTA EXCEEDED\n"
+                "You've reached your Grok API limit.\n"
+                "Check your plan at https://x.ai",
+                retry_after_seconds(e)
+            )
+        elif "rate limit" in error_msg.lower():
+            return RateLimitError(
+                "⚠️ RATE LIMIT EXCEEDED\n"
+                "Too many requests. Please wait and try again.",
+                retry_after_seconds(e)
+            )
+        elif "invalid api key" in error_msg.lower() or status == 401:
+            return RuntimeError(
+                "⚠️ INVALID API KEY\n"
+                "Please check your GROK_API_KEY in .env file."
+            )
+        elif is_transient(e):
+            return RetryableError(f"Grok API error: {error_msg}")
+        else:
+            return RuntimeError(f"Grok API error: {error_msg}")
+
+
+class LatencyHistory:
+    """Thread-safe window of a provider's recent successful-call latencies."""
+    
+    def __init__(self, maxlen: int = 200):
+        self._samples = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+    
+    def record(self, seconds: float):
+        """Add the latency of a successful call."""
+        with self._lock:
+            self._samples.append(seconds)
+    
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Nearest-rank percentile of the recorded latencies (None without samples)."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[max(0, math.ceil(len(samples) * percentile / 100) - 1)]
+
+
+_latency_histories: Dict[Tuple[str, str], LatencyHistory] = {}
+_latency_histories_lock = threading.Lock()
+
+
+def get_latency_history(provider: str, model: Optional[str]) -> LatencyHistory:
+    """Return the process-wide latency history for a provider/model, creating it on first use."""
+    key = (provider, model)
+    with _latency_histories_lock:
+        history = _latency_histories.get(key)
+        if history is None:
+            history = _latency_histories[key] = LatencyHistory()
+        return history
 
 
 class LLM:
@@ -182,15 +455,26 @@ class LLM:
         self,
         provider: Optional[str] = None,
         api_key: Optional[str] = None,
-        model: Optional[str] = None
+        model: Optional[str] = None,
+        rate_limiter=None,
+        circuit_breaker=None,
+        latency_history=None
     ):
         """
         Initialize LLM wrapper.
         
         Args:
-            provider: LLM provider ('gemini' or 'grok'). Defaults to env var LLM_PROVIDER
+            provider: LLM provider ('gemini', 'grok', 'openai' for any OpenAI-compatible
+                      endpoint at OPENAI_BASE_URL, or 'local' for the offline stand-in
+                      in local_llm.py). Defaults to env var LLM_PROVIDER
             api_key: API key. Defaults to env var based on provider
             model: Model name. Defaults to env var based on provider
+            rate_limiter: AdaptiveRateLimiter for the calls. Defaults to the one
+                          shared by every LLM using this provider and model
+            circuit_breaker: CircuitBreaker for the calls. Defaults to the one
+                             shared by every LLM using this provider and model
+            latency_history: LatencyHistory that FailoverLLM hedges on. Defaults to
+                             the one shared by every LLM using this provider and model
         """
         # Get provider from env or argument
         self.provider_name = provider or os.getenv("LLM_PROVIDER", "gemini")
@@ -220,34 +504,249 @@ class LLM:
             
             self.provider = GrokProvider(api_key, model)
             
+        elif self.provider_name == "openai":
+            api_key = api_key or os.getenv("OPENAI_API_KEY")
+            model = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+            
+            if not api_key or api_key == "your_openai_api_key_here":
+                raise ValueError(
+                    "OPENAI_API_KEY not set. "
+                    "Please set it in .env file or pass as argument."
+                )
+            
+            self.provider = OpenAICompatibleProvider(api_key, model, os.getenv("OPENAI_BASE_URL") or None)
+            
+        elif self.provider_name == "local":
+            # Deterministic offline stand-in for load tests; needs no API key
+            from local_llm import LocalProvider
+            model = model or "local-extractive"
+            self.provider = LocalProvider(model)
+            
         else:
             raise ValueError(f"Unknown provider: {self.provider_name}")
         
         # Get default settings from env
         self.temperature = float(os.getenv("TEMPERATURE", "0.3"))
         self.max_tokens = int(os.getenv("MAX_TOKENS", "1000"))
+        
+        # Bursts queue here instead of failing at the provider
+        self.rate_limiter = rate_limiter or get_rate_limiter(self.provider_name, model)
+        # A failing provider is skipped for a while instead of timing out every call
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker(self.provider_name, model)
+        # Hedging needs many samples, so every session's calls feed one history
+        if latency_history is None:
+            latency_history = get_latency_history(self.provider_name, model)
+        self.latency_history = latency_history
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "3"))
+        self.backoff_base = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+        self.backoff_max = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+        # Deadline for calls whose caller doesn't pass one
+        self.timeout = float(os.getenv("LLM_TIMEOUT", "30"))
     
     def generate(
         self,
         prompt: str,
         temperature: Optional[float] = None,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        deadline: Optional[float] = None
     ) -> str:
         """
         Generate response from LLM.
         
+        Transient failures are retried with jittered exponential backoff
+        until the deadline; a provider that keeps failing trips the circuit
+        breaker, after which calls raise CircuitOpenError at once.
+        
         Args:
             prompt: Input prompt
             temperature: Sampling temperature (overrides default)
             max_tokens: Maximum tokens (overrides default)
+            deadline: time.monotonic() by which the answer is needed
+                      (defaults to LLM_TIMEOUT seconds from now)
             
         Returns:
             Generated text response
         """
         temp = temperature if temperature is not None else self.temperature
         tokens = max_tokens if max_tokens is not None else self.max_tokens
+        deadline = deadline if deadline is not None else time.monotonic() + self.timeout
+        
+        for attempt in range(self.max_retries + 1):
+            timeout = self._start_attempt(deadline)
+            try:
+                result = self.provider.generate(prompt, temperature=temp, max_tokens=tokens, timeout=timeout)
+            except BaseException as e:
+                delay = self._end_failed_attempt(e, attempt, deadline)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self._end_attempt()
+            return result
+    
+    async def agenerate(
+        self,
+        prompt: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        deadline: Optional[float] = None
+    ) -> str:
+        """
+        Generate response from LLM without blocking the event loop.
+        
+        Args:
+            prompt: Input prompt
+            temperature: Sampling temperature (overrides default)
+            max_tokens: Maximum tokens (overrides default)
+            deadline: time.monotonic() by which the answer is needed
+                      (defaults to LLM_TIMEOUT seconds from now)
+            
+        Returns:
+            Generated text response
+        """
+        temp = temperature if temperature is not None else self.temperature
+        tokens = max_tokens if max_tokens is not None else self.max_tokens
+        deadline = deadline if deadline is not None else time.monotonic() + self.timeout
+        
+        for attempt in range(self.max_retries + 1):
+            timeout = await self._astart_attempt(deadline)
+            try:
+                # The deadline is enforced here too, in case the SDK ignores its timeout
+                result = await asyncio.wait_for(
+                    self.provider.agenerate(prompt, temperature=temp, max_tokens=tokens, timeout=timeout),
+                    timeout
+                )
+            except asyncio.TimeoutError as e:
+                self._end_failed_attempt(RetryableError("LLM call timed out"), self.max_retries, deadline)
+                raise DeadlineExceededError("The LLM did not answer before the deadline") from e
+            except BaseException as e:
+                delay = self._end_failed_attempt(e, attempt, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self._end_attempt()
+            return result
+    
+    def generate_stream(
+        self,
+        prompt: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        deadline: Optional[float] = None
+    ) -> Iterator[str]:
+        """
+        Generate response from LLM, yielding text as the provider produces it.
+        
+        Args:
+            prompt: Input prompt
+            temperature: Sampling temperature (overrides default)
+            max_tokens: Maximum tokens (overrides default)
+            deadline: time.monotonic() by which the answer is needed
+                      (defaults to LLM_TIMEOUT seconds from now)
+            
+        Yields:
+            Pieces of the response text, in order
+        """
+        temp = temperature if temperature is not None else self.temperature
+        tokens = max_tokens if max_tokens is not None else self.max_tokens
+        deadline = deadline if deadline is not None else time.monotonic() + self.timeout
+        
+        for attempt in range(self.max_retries + 1):
+            timeout = self._start_attempt(deadline)
+            started = False
+            try:
+                for text in self.provider.generate_stream(prompt, temperature=temp, max_tokens=tokens, timeout=timeout):
+                    started = True
+                    yield text
+            except BaseException as e:
+                # Text already shown can't be taken back, so only a stream that hasn't started is retried
+                delay = self._end_failed_attempt(e, attempt, deadline, retry=not started)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self._end_attempt()
+            return
+    
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number attempt + 1."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+    
+    def _check_attempt(self, deadline: float) -> float:
+        """Check the circuit breaker and the deadline, returning the seconds left."""
+        if not self.circuit_breaker.allow():
+            raise CircuitOpenError(
+                f"{self.provider_name} is failing; calls are paused for "
+                f"{self.circuit_breaker.retry_in():.0f}s"
+            )
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceededError("The deadline passed before the LLM was called")
+        return remaining
+    
+    def _start_attempt(self, deadline: float) -> float:
+        """
+        Check the circuit breaker and wait for the rate limiter.
+        
+        Returns:
+            Seconds left until the deadline, for the provider call's timeout
+        """
+        remaining = self._check_attempt(deadline)
+        try:
+            self.rate_limiter.acquire(timeout=remaining)
+        except TimeoutError as e:
+            self.circuit_breaker.release_trial()
+            raise DeadlineExceededError(f"The LLM could not be called before the deadline: {e}") from e
+        return max(deadline - time.monotonic(), 0.001)
+    
+    async def _astart_attempt(self, deadline: float) -> float:
+        """Like _start_attempt(), but queues on the event loop; cancelling it frees the slot."""
+        remaining = self._check_attempt(deadline)
+        try:
+            await self.rate_limiter.aacquire(timeout=remaining)
+        except TimeoutError as e:
+            self.circuit_breaker.release_trial()
+            raise DeadlineExceededError(f"The LLM could not be called before the deadline: {e}") from e
+        except asyncio.CancelledError:
+            self.circuit_breaker.release_trial()
+            raise
+        return max(deadline - time.monotonic(), 0.001)
+    
+    def _end_attempt(self):
+        """Record a successful call."""
+        self.rate_limiter.release()
+        self.circuit_breaker.record_success()
+    
+    def _end_failed_attempt(self, e: BaseException, attempt: int, deadline: float, retry: bool = True) -> Optional[float]:
+        """
+        Record a failed call.
         
-        return self.provider.generate(prompt, temperature=temp, max_tokens=tokens)
+        Returns:
+            Seconds to wait before retrying, or None if the error should be raised
+        """
+        if isinstance(e, RateLimitError):
+            # The limiter holds back the next attempt (and everyone else's) for the hint
+            retry_after = e.retry_after if e.retry_after is not None else self._backoff(attempt)
+            self.rate_limiter.release(throttled=True, retry_after=retry_after)
+            self.circuit_breaker.release_trial()
+            delay = 0.0
+        elif isinstance(e, RetryableError):
+            self.rate_limiter.release()
+            self.circuit_breaker.record_failure()
+            delay = self._backoff(attempt)
+        else:
+            # Says nothing about the provider's health (bad request, cancelled, ...)
+            self.rate_limiter.release()
+            self.circuit_breaker.release_trial()
+            return None
+        if not retry or attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+            return None
+        return delay
+    
+    def rate_limit_metrics(self) -> Dict[str, Any]:
+        """Queue depth, calls in flight, concurrency limit and wait times of the rate limiter."""
+        return dict(self.rate_limiter.metrics(), circuit=self.circuit_breaker.state)
     
     def create_prompt(
         self,
@@ -295,13 +794,260 @@ Answer the question now:"""
         return prompt
 
 
-def get_llm() -> LLM:
+class FailoverLLM:
+    """
+    LLM over an ordered pool of providers.
+    
+    Calls go to the first provider and fail over to the next one on error.
+    Each provider gets a single attempt (the last keeps its retries), so a
+    failing provider costs one error rather than a round of backoffs. With
+    hedging on, a call the current provider hasn't answered within its p95
+    latency is also sent to the next provider and the first answer wins.
+    """
+    
+    def __init__(self, llms: List[LLM], hedge: Optional[bool] = None, hedge_percentile: float = 95,
+                 hedge_min_samples: int = 20):
+        """
+        Initialize the pool.
+        
+        Args:
+            llms: LLMs in order of preference
+            hedge: Send a second request when the first is slow (defaults to LLM_HEDGE env var, off)
+            hedge_percentile: Latency percentile of a provider after which its call is hedged
+            hedge_min_samples: Successful calls a provider needs before its calls are hedged
+        """
+        if not llms:
+            raise ValueError("FailoverLLM needs at least one LLM")
+        self.llms = llms
+        for llm in llms[:-1]:
+            llm.max_retries = 0
+        self.provider_name = ",".join(llm.provider_name for llm in llms)
+        self.temperature = llms[0].temperature
+        self.max_tokens = llms[0].max_tokens
+        self.timeout = llms[0].timeout
+        if hedge is None:
+            hedge = os.getenv("LLM_HEDGE", "0").lower() in ("1", "true", "yes")
+        self.hedge = hedge and len(llms) > 1
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        # Recent latencies of successful calls, per provider (shared process-wide)
+        self.latencies = [llm.latency_history for llm in llms]
+        self.stats = {"failovers": 0, "hedged": 0, "hedge_wins": 0}
+        self._lock = threading.Lock()
+        self._executor = None
+    
+    def generate(
+        self,
+        prompt: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        deadline: Optional[float] = None
+    ) -> str:
+        """
+        Generate response from the first provider that answers (see LLM.generate()).
+        
+        Hedged calls run on a thread pool. A losing request can't be
+        cancelled, so it runs to completion in the background and still
+        counts against its provider's rate limit.
+        """
+        deadline = deadline if deadline is not None else time.monotonic() + self.timeout
+        
+        def call(i):
+            return self._timed(i, lambda: self.llms[i].generate(prompt, temperature, max_tokens, deadline=deadline))
+        
+        if not self.hedge:
+            return self._in_order(call)
+        
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=len(self.llms) * int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+                    thread_name_prefix="llm-hedge"
+                )
+        waiting = list(range(len(self.llms)))
+        running = {}
+        hedges = set()
+        error = None
+        while waiting or running:
+            if not running:
+                latest = self._next(waiting, error)
+                running[self._executor.submit(call, latest)] = latest
+            timeout = deadline - time.monotonic()
+            hedge_after = self._hedge_delay(latest) if waiting else None
+            if hedge_after is not None:
+                timeout = min(timeout, hedge_after)
+            done, _ = wait(running, timeout=max(timeout, 0.0), return_when=FIRST_COMPLETED)
+            if not done:
+                if time.monotonic() >= deadline:
+                    raise DeadlineExceededError("No LLM provider answered before the deadline")
+                latest = waiting.pop(0)
+                hedges.add(latest)
+                self._count("hedged")
+                running[self._executor.submit(call, latest)] = latest
+                continue
+            for future in done:
+                index = running.pop(future)
+                try:
+                    result = future.result()
+                except DeadlineExceededError:
+                    raise
+                except Exception as e:
+                    error = e
+                    continue
+                if index in hedges:
+                    self._count("hedge_wins")
+                return result
+        raise error
+    
+    async def agenerate(
+        self,
+        prompt: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        deadline: Optional[float] = None
+    ) -> str:
+        """Async generate(); a hedged request that loses is cancelled."""
+        deadline = deadline if deadline is not None else time.monotonic() + self.timeout
+        
+        async def call(i):
+            start = time.monotonic()
+            result = await self.llms[i].agenerate(prompt, temperature, max_tokens, deadline=deadline)
+            self._record(i, time.monotonic() - start)
+            return result
+        
+        waiting = list(range(len(self.llms)))
+        running = {}
+        hedges = set()
+        error = None
+        try:
+            while waiting or running:
+                if not running:
+                    latest = self._next(waiting, error)
+                    running[asyncio.ensure_future(call(latest))] = latest
+                timeout = deadline - time.monotonic()
+                hedge_after = self._hedge_delay(latest) if self.hedge and waiting else None
+                if hedge_after is not None:
+                    timeout = min(timeout, hedge_after)
+                done, _ = await asyncio.wait(running, timeout=max(timeout, 0.0), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if time.monotonic() >= deadline:
+                        raise DeadlineExceededError("No LLM provider answered before the deadline")
+                    latest = waiting.pop(0)
+                    hedges.add(latest)
+                    self._count("hedged")
+                    running[asyncio.ensure_future(call(latest))] = latest
+                    continue
+                for task in done:
+                    index = running.pop(task)
+                    try:
+                        result = task.result()
+                    except DeadlineExceededError:
+                        raise
+                    except Exception as e:
+                        error = e
+                        continue
+                    if index in hedges:
+                        self._count("hedge_wins")
+                    return result
+            raise error
+        finally:
+            for task in running:
+                task.cancel()
+    
+    def generate_stream(
+        self,
+        prompt: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        deadline: Optional[float] = None
+    ) -> Iterator[str]:
+        """
+        Stream the response from the first provider that answers (see LLM.generate_stream()).
+        Streams fail over only before their first token and are not hedged.
+        """
+        deadline = deadline if deadline is not None else time.monotonic() + self.timeout
+        for i, llm in enumerate(self.llms):
+            started = False
+            try:
+                for text in llm.generate_stream(prompt, temperature, max_tokens, deadline=deadline):
+                    started = True
+                    yield text
+                return
+            except DeadlineExceededError:
+                raise
+            except Exception:
+                if started or i == len(self.llms) - 1:
+                    raise
+                self._count("failovers")
+    
+    def _in_order(self, call):
+        """Call each provider in turn until one answers."""
+        for i in range(len(self.llms)):
+            try:
+                return call(i)
+            except DeadlineExceededError:
+                raise
+            except Exception:
+                if i == len(self.llms) - 1:
+                    raise
+                self._count("failovers")
+    
+    def _next(self, waiting: List[int], error: Optional[Exception]) -> int:
+        """Take the next provider to call, counting a failover if the previous one failed."""
+        if error is not None:
+            self._count("failovers")
+        return waiting.pop(0)
+    
+    def _timed(self, i: int, call):
+        """Run call, recording its latency for provider i if it succeeds."""
+        start = time.monotonic()
+        result = call()
+        self._record(i, time.monotonic() - start)
+        return result
+    
+    def _record(self, i: int, seconds: float):
+        self.latencies[i].record(seconds)
+    
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+    
+    def latency_percentile(self, i: int, percentile: float) -> Optional[float]:
+        """Nearest-rank percentile of provider i's recent latencies (None without samples)."""
+        return self.latencies[i].percentile(percentile)
+    
+    def _hedge_delay(self, i: int) -> Optional[float]:
+        """Seconds to wait for provider i before hedging (None = don't hedge yet)."""
+        if len(self.latencies[i]) < self.hedge_min_samples:
+            return None
+        return self.latency_percentile(i, self.hedge_percentile)
+    
+    def rate_limit_metrics(self) -> Dict[str, Any]:
+        """Failover and hedging counts, plus each provider's limiter metrics and p95 latency."""
+        providers = {}
+        for i, llm in enumerate(self.llms):
+            providers[llm.provider_name] = dict(llm.rate_limit_metrics(), p95_seconds=self.latency_percentile(i, 95))
+        with self._lock:
+            return dict(self.stats, providers=providers)
+    
+    def create_prompt(self, question: str, context: str, sources: list) -> str:
+        """Create the Q&A prompt (see LLM.create_prompt())."""
+        return self.llms[0].create_prompt(question, context, sources)
+
+
+def get_llm():
     """
     Get LLM instance with default configuration from environment.
     
+    A comma-separated LLM_PROVIDER (e.g. "gemini,grok") gives a FailoverLLM
+    over those providers, in that order.
+    
     Returns:
-        Configured LLM instance
+        Configured LLM (or FailoverLLM) instance
     """
+    providers = [name.strip() for name in os.getenv("LLM_PROVIDER", "gemini").split(",") if name.strip()]
+    if len(providers) > 1:
+        return FailoverLLM([LLM(provider=name) for name in providers])
     return LLM()
 
 
@@ -0,0 +1,295 @@
+"""
+Deterministic local stand-in for an LLM provider.
+Answers extractively from the prompt's context with a configurable latency
+distribution, token rate and injected failures (429s, 5xx, timeouts), so
+AnswerGenerator can be load-tested and run offline without API keys.
+Run this file to serve it as an OpenAI-compatible endpoint.
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import itertools
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List, Optional, Tuple
+from llm import LLMProvider, RateLimitError, RetryableError
+
+NO_INFORMATION = "I don't have information about that in my current sources."
+
+# Words too common to say whether a sentence answers the question
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how", "i", "in",
+    "is", "it", "me", "my", "of", "on", "or", "the", "this", "to", "what", "when", "which", "who", "with",
+}
+
+
+def _words(text: str) -> set:
+    return {word for word in re.findall(r"[a-z0-9%]+(?:\.[0-9]+)?", text.lower()) if word not in STOPWORDS}
+
+
+def extractive_answer(prompt: str, max_sentences: int = 2) -> str:
+    """
+    Answer a create_prompt() prompt with the context sentences that share the most words with the question.
+
+    Args:
+        prompt: Prompt built by LLM.create_prompt()
+        max_sentences: Most sentences to quote
+
+    Returns:
+        The chosen sentences in context order, each cited as [Source N]
+    """
+    question = re.search(r"^QUESTION: (.*)$", prompt, re.M)
+    context = re.search(r"CONTEXT:\n(.*?)\n\nAVAILABLE SOURCES:", prompt, re.S)
+    if not question or not context:
+        return NO_INFORMATION
+    question_words = _words(question.group(1))
+
+    scored = []
+    for passage in context.group(1).split("\n---\n"):
+        match = re.match(r"\s*\[Source (\d+)\]\n(.*)", passage, re.S)
+        if not match:
+            continue
+        for sentence in re.split(r"(?<=[.!?])\s+", " ".join(match.group(2).split())):
+            score = len(question_words & _words(sentence))
+            if score:
+                scored.append((score, len(scored), f"{sentence} [Source {match.group(1)}]"))
+
+    if not scored:
+        return NO_INFORMATION
+    best = sorted(scored, key=lambda item: (-item[0], item[1]))[:max_sentences]
+    return " ".join(text for _, _, text in sorted(best, key=lambda item: item[1]))
+
+
+class LocalProvider(LLMProvider):
+    """
+    In-process LLM stand-in.
+
+    Each call draws an outcome from a seeded generator: a 429, a 5xx, a
+    timeout (the call hangs until its timeout) or an answer whose first token
+    arrives after a log-normal delay and whose tokens follow at a fixed rate.
+    Failures raise the same errors the real providers do, so retries, the
+    rate limiter and the circuit breaker see realistic behaviour.
+    """
+
+    def __init__(self, model: str = "local-extractive", latency_ms: Optional[float] = None,
+                 latency_sigma: Optional[float] = None, tokens_per_second: Optional[float] = None,
+                 rate_limit_rate: Optional[float] = None, server_error_rate: Optional[float] = None,
+                 timeout_rate: Optional[float] = None, retry_after: float = 1.0, seed: Optional[int] = None):
+        """
+        Initialize local provider.
+
+        Args:
+            model: Model name reported by the server
+            latency_ms: Median time to first token (LOCAL_LLM_LATENCY_MS env var, 200)
+            latency_sigma: Spread of the log-normal latency, 0 = fixed (LOCAL_LLM_LATENCY_SIGMA, 0.5)
+            tokens_per_second: Streaming speed, 0 = instant (LOCAL_LLM_TOKENS_PER_SECOND, 50)
+            rate_limit_rate: Share of calls rejected with a 429 (LOCAL_LLM_429_RATE, 0)
+            server_error_rate: Share of calls failing with a 503 (LOCAL_LLM_5XX_RATE, 0)
+            timeout_rate: Share of calls that hang until they time out (LOCAL_LLM_TIMEOUT_RATE, 0)
+            retry_after: Seconds a 429 asks the caller to wait
+            seed: Seed of the outcome generator (LOCAL_LLM_SEED, 0)
+        """
+        def setting(value, name, default):
+            return value if value is not None else float(os.getenv(name, default))
+
+        self.model = model
+        self.latency_ms = setting(latency_ms, "LOCAL_LLM_LATENCY_MS", "200")
+        self.latency_sigma = setting(latency_sigma, "LOCAL_LLM_LATENCY_SIGMA", "0.5")
+        self.tokens_per_second = setting(tokens_per_second, "LOCAL_LLM_TOKENS_PER_SECOND", "50")
+        self.rate_limit_rate = setting(rate_limit_rate, "LOCAL_LLM_429_RATE", "0")
+        self.server_error_rate = setting(server_error_rate, "LOCAL_LLM_5XX_RATE", "0")
+        self.timeout_rate = setting(timeout_rate, "LOCAL_LLM_TIMEOUT_RATE", "0")
+        self.retry_after = retry_after
+        # How long a "timed out" call hangs when the caller sets no timeout
+        self.hang_seconds = 30.0
+        self.stats = {"calls": 0, "rate_limited": 0, "server_error": 0, "timeout": 0}
+        self._random = random.Random(int(setting(seed, "LOCAL_LLM_SEED", "0")))
+        self._lock = threading.Lock()
+
+    def _plan(self, prompt: str, max_tokens: int) -> Tuple[str, float, List[str]]:
+        """
+        Draw the next call's outcome.
+
+        Returns:
+            (outcome, seconds to first token, response pieces); outcome is
+            "ok", "rate_limited", "server_error" or "timeout"
+        """
+        with self._lock:
+            self.stats["calls"] += 1
+            draw = self._random.random()
+            first_token = self.latency_ms / 1000 * self._random.lognormvariate(0, self.latency_sigma)
+            outcome = "ok"
+            for name, rate in (("rate_limited", self.rate_limit_rate), ("server_error", self.server_error_rate),
+                               ("timeout", self.timeout_rate)):
+                if draw < rate:
+                    outcome = name
+                    self.stats[name] += 1
+                    break
+                draw -= rate
+        pieces = re.findall(r"\S+\s*", extractive_answer(prompt))[:max_tokens]
+        return outcome, first_token, pieces
+
+    def _error(self, outcome: str, timeout: Optional[float]) -> Optional[RuntimeError]:
+        """The error an outcome raises, or None for an answer."""
+        if outcome == "rate_limited":
+            return RateLimitError(
+                "⚠️ RATE LIMIT EXCEEDED\n"
+                "Local LLM rejected the request (injected 429).",
+                self.retry_after
+            )
+        if outcome == "server_error":
+            return RetryableError("Local LLM error: 503 Service Unavailable (injected)")
+        if outcome == "timeout":
+            return RetryableError(f"Local LLM error: request timed out after {self._hang(timeout):.1f}s")
+        return None
+
+    def _hang(self, timeout: Optional[float]) -> float:
+        """Seconds a timed-out call hangs before failing."""
+        return timeout if timeout is not None else self.hang_seconds
+
+    def _schedule(self, first_token: float, pieces: List[str], timeout: Optional[float]) -> List[Tuple[float, str]]:
+        """Seconds to wait before each piece, cut off where the timeout would expire."""
+        gap = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        schedule, elapsed = [], 0.0
+        for i, piece in enumerate(pieces):
+            delay = first_token if i == 0 else gap
+            if timeout is not None and elapsed + delay > timeout:
+                break
+            schedule.append((delay, piece))
+            elapsed += delay
+        return schedule
+
+    def generate_stream(self, prompt: str, temperature: float = 0.1, max_tokens: int = 1000,
+                        timeout: Optional[float] = None) -> Iterator[str]:
+        """
+        Generate response, yielding one word at a time at the configured rate.
+
+        Args:
+            prompt: Input prompt (from LLM.create_prompt())
+            temperature: Ignored; answers are deterministic
+            max_tokens: Maximum words in response
+            timeout: Seconds before the call fails as timed out (None = no limit)
+
+        Yields:
+            Pieces of the response text, in order
+        """
+        outcome, first_token, pieces = self._plan(prompt, max_tokens)
+        if outcome != "ok":
+            time.sleep(self._hang(timeout) if outcome == "timeout" else first_token)
+            raise self._error(outcome, timeout)
+        schedule = self._schedule(first_token, pieces, timeout)
+        for delay, piece in schedule:
+            time.sleep(delay)
+            yield piece
+        if len(schedule) < len(pieces):
+            time.sleep(max(0.0, timeout - sum(delay for delay, _ in schedule)))
+            raise self._error("timeout", timeout)
+
+    def generate(self, prompt: str, temperature: float = 0.1, max_tokens: int = 1000,
+                 timeout: Optional[float] = None) -> str:
+        """Generate the whole response (see generate_stream())."""
+        return "".join(self.generate_stream(prompt, temperature, max_tokens, timeout))
+
+    async def agenerate(self, prompt: str, temperature: float = 0.1, max_tokens: int = 1000,
+                        timeout: Optional[float] = None) -> str:
+        """Generate response, waiting with asyncio.sleep so no thread is held (see generate_stream())."""
+        outcome, first_token, pieces = self._plan(prompt, max_tokens)
+        if outcome != "ok":
+            await asyncio.sleep(self._hang(timeout) if outcome == "timeout" else first_token)
+            raise self._error(outcome, timeout)
+        schedule = self._schedule(first_token, pieces, timeout)
+        await asyncio.sleep(sum(delay for delay, _ in schedule))
+        if len(schedule) < len(pieces):
+            await asyncio.sleep(max(0.0, timeout - sum(delay for delay, _ in schedule)))
+            raise self._error("timeout", timeout)
+        return "".join(pieces)
+
+
+def serve(provider: Optional[LocalProvider] = None, host: str = "127.0.0.1", port: int = 8000) -> ThreadingHTTPServer:
+    """
+    Serve a LocalProvider as an OpenAI-compatible chat completions API.
+
+    Point LLM_PROVIDER=openai with OPENAI_BASE_URL=http://host:port/v1 at it
+    to exercise the real SDK and HTTP path. Injected 429s carry a
+    Retry-After header; injected 5xx and timeouts return 503 and 504.
+
+    Returns:
+        The server, not yet serving (call serve_forever())
+    """
+    provider = provider or LocalProvider()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+                self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+            max_tokens = body.get("max_tokens") or 1000
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            try:
+                if body.get("stream"):
+                    self._stream(completion_id, provider.generate_stream(prompt, max_tokens=max_tokens))
+                else:
+                    text = provider.generate(prompt, max_tokens=max_tokens)
+                    self._send_json(200, {
+                        "id": completion_id,
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": provider.model,
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                                     "finish_reason": "stop"}],
+                    })
+            except RateLimitError as e:
+                self._send_json(429, {"error": {"message": str(e), "type": "rate_limit_exceeded"}},
+                                {"Retry-After": str(e.retry_after)})
+            except RetryableError as e:
+                self._send_json(504 if "timed out" in str(e) else 503, {"error": {"message": str(e)}})
+
+        def _stream(self, completion_id, pieces):
+            # Errors are drawn before the first token, so they still get a proper status
+            first = next(pieces, None)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": provider.model}
+            for piece in itertools.chain([first] if first is not None else [], pieces):
+                self._event(dict(chunk, choices=[{"index": 0, "delta": {"content": piece}, "finish_reason": None}]))
+            self._event(dict(chunk, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def _event(self, data):
+            self.wfile.write(f"data: {json.dumps(data)}\n\n".encode())
+            self.wfile.flush()
+
+        def _send_json(self, status, data, headers=None):
+            payload = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+if __name__ == "__main__":
+    # Serve the stand-in: python src/local_llm.py [port]
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else int(os.getenv("LOCAL_LLM_PORT", "8000"))
+    server = serve(port=port)
+    print(f"Local LLM serving at http://127.0.0.1:{port}/v1 (set OPENAI_BASE_URL to this)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
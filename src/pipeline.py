@@ -6,28 +6,34 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.data_loader import DataLoader
 from src.vector_store import VectorStore
+from src.http_cache import HttpCache
+from src.ingestion import IncrementalIngestor
+# Import embeddings the same way vector_store does so both share one model registry
+from embeddings import warmup_embedding_model
 
-def main():
+def main(full_rebuild=False):
     print("Starting RAG Pipeline...")
     
-    # 1. Clear existing DB (optional, for clean build)
+    # 0. Load the shared embedding model once up front
+    stats = warmup_embedding_model()
+    print(f"Embedding model ready in {stats['load_seconds']:.2f}s")
+    
+    # 1. Open the existing DB (pass --full to rebuild it from scratch)
     vector_store = VectorStore()
-    vector_store.clear()
     
-    # 2. Load and Process Data
-    loader = DataLoader()
+    # 2. Load data and re-embed only sources whose content changed
+    loader = DataLoader(cache=HttpCache(), pdf_workers=os.cpu_count() or 1)
     print("Loading data from URLs...")
-    documents = loader.load_and_process_all()
+    try:
+        summary = IncrementalIngestor(loader, vector_store).run(full_rebuild=full_rebuild)
+    finally:
+        loader.close()
     
-    if not documents:
+    if vector_store.get_db() is None:
         print("No documents were processed. Exiting.")
         return
 
-    # 3. Store in Vector DB
-    print(f"Storing {len(documents)} document chunks in Vector DB...")
-    vector_store.add_documents(documents)
-    
-    print("Pipeline completed successfully!")
+    print(f"Pipeline completed successfully! (+{summary['chunks_added']} / -{summary['chunks_deleted']} chunks)")
 
 if __name__ == "__main__":
-    main()
+    main(full_rebuild="--full" in sys.argv)
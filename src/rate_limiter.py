@@ -0,0 +1,319 @@
+"""
+Client-side rate limiting for LLM calls.
+A token bucket paces requests to a provider's requests-per-minute quota and
+an adaptive concurrency limit backs off when the provider throttles us, so
+bursts queue up on our side instead of being rejected with a 429.
+"""
+import asyncio
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+    Callers that find the bucket empty reserve a future token and sleep until
+    it is due, so waiting callers are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Initialize the bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Largest burst allowed (defaults to one second's worth, at least 1)
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute: float, capacity: Optional[float] = None) -> "TokenBucket":
+        """Bucket allowing requests_per_minute acquisitions per minute."""
+        return cls(requests_per_minute / 60.0, capacity)
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self, tokens: float, timeout: Optional[float]) -> float:
+        """Take tokens now, returning how long until they are due."""
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = (tokens - self._tokens) / self.rate if self._tokens < tokens else 0.0
+            if timeout is not None and wait > timeout:
+                raise TimeoutError(f"rate limit wait of {wait:.1f}s exceeds {timeout:.1f}s")
+            self._tokens -= tokens
+        return wait
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> float:
+        """
+        Take tokens, waiting until the bucket has them.
+
+        Args:
+            tokens: Tokens to take
+            timeout: Longest acceptable wait; TimeoutError (taking nothing) if it would be longer
+
+        Returns:
+            Seconds spent waiting
+        """
+        wait = self._reserve(tokens, timeout)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> float:
+        """Take tokens like acquire(), sleeping on the event loop instead of the thread."""
+        wait = self._reserve(tokens, timeout)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class AdaptiveRateLimiter:
+    """
+    Client-side limiter for one LLM provider/model.
+
+    Requests wait for a concurrency slot and then for a token from the
+    requests-per-minute bucket, so bursts queue instead of failing. The
+    concurrency limit adapts AIMD-style: it grows by about one slot per
+    window of successful calls and halves whenever the provider throttles us,
+    and a retry-after hint holds back every queued call for that long.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, max_concurrency: int = 8,
+                 min_concurrency: int = 1):
+        """
+        Initialize the limiter.
+
+        Args:
+            requests_per_minute: Pace of calls (None or 0 = no pacing)
+            max_concurrency: Upper bound for calls in flight
+            min_concurrency: Lower bound the limit never shrinks below
+        """
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.concurrency_limit = float(max_concurrency)
+        self.bucket = TokenBucket.per_minute(requests_per_minute, capacity=max_concurrency) if requests_per_minute else None
+        self.in_flight = 0
+        self.queued = 0
+        self._paused_until = 0.0
+        self.stats = {"requests": 0, "throttled": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+        self._cond = threading.Condition()
+        # (event loop, future) of async callers waiting for a slot
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def _slot_freed(self):
+        """Wake waiters after a slot is given back (call with the condition held)."""
+        self._cond.notify_all()
+        for loop, waiter in self._async_waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # Loop already closed; its caller is gone
+                pass
+        self._async_waiters.clear()
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """
+        Wait for a slot and a token.
+
+        Args:
+            timeout: Longest acceptable wait; TimeoutError (holding no slot) if it would be longer
+
+        Returns:
+            Seconds spent waiting
+        """
+        start = time.monotonic()
+        deadline = start + timeout if timeout is not None else None
+        with self._cond:
+            self.queued += 1
+            try:
+                while self.in_flight >= int(self.concurrency_limit):
+                    remaining = deadline - time.monotonic() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"no LLM slot free within {timeout:.1f}s")
+                    self._cond.wait(remaining)
+            except TimeoutError:
+                self.queued -= 1
+                raise
+            self.in_flight += 1
+        try:
+            pause = self._paused_until - time.monotonic()
+            if deadline is not None and pause > deadline - time.monotonic():
+                raise TimeoutError(f"provider asked to wait {pause:.1f}s, longer than {timeout:.1f}s")
+            if pause > 0:
+                time.sleep(pause)
+            if self.bucket is not None:
+                self.bucket.acquire(timeout=deadline - time.monotonic() if deadline is not None else None)
+        except TimeoutError:
+            with self._cond:
+                self.in_flight -= 1
+                self._slot_freed()
+            raise
+        finally:
+            waited = self._record_wait(start)
+        return waited
+
+    async def aacquire(self, timeout: Optional[float] = None) -> float:
+        """
+        Wait for a slot and a token on the event loop (see acquire()).
+
+        Queued callers take no thread, and a caller that times out or is
+        cancelled while waiting never keeps a slot.
+        """
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        deadline = start + timeout if timeout is not None else None
+        with self._cond:
+            self.queued += 1
+        acquired = False
+        try:
+            while True:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                with self._cond:
+                    if self.in_flight < int(self.concurrency_limit):
+                        self.in_flight += 1
+                        acquired = True
+                        break
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"no LLM slot free within {timeout:.1f}s")
+                    waiter = loop.create_future()
+                    self._async_waiters.append((loop, waiter))
+                try:
+                    await asyncio.wait_for(waiter, remaining)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    with self._cond:
+                        if (loop, waiter) in self._async_waiters:
+                            self._async_waiters.remove((loop, waiter))
+
+            pause = self._paused_until - time.monotonic()
+            if deadline is not None and pause > deadline - time.monotonic():
+                raise TimeoutError(f"provider asked to wait {pause:.1f}s, longer than {timeout:.1f}s")
+            if pause > 0:
+                await asyncio.sleep(pause)
+            if self.bucket is not None:
+                await self.bucket.aacquire(timeout=deadline - time.monotonic() if deadline is not None else None)
+        except BaseException:
+            # Timed out or cancelled: never keep a slot that won't be used
+            if not acquired:
+                with self._cond:
+                    self.queued -= 1
+                raise
+            with self._cond:
+                self.in_flight -= 1
+                self._slot_freed()
+            self._record_wait(start)
+            raise
+        return self._record_wait(start)
+
+    def _record_wait(self, start: float) -> float:
+        """Leave the queue and record the wait of a caller that got a slot."""
+        waited = time.monotonic() - start
+        with self._cond:
+            self.queued -= 1
+            self.stats["requests"] += 1
+            self.stats["wait_seconds"] += waited
+            self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], waited)
+        return waited
+
+    def release(self, throttled: bool = False, retry_after: Optional[float] = None):
+        """
+        Give back a slot after a call.
+
+        Args:
+            throttled: The provider rejected the call for rate or quota reasons
+            retry_after: Seconds the provider asked us to wait, if it said
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.stats["throttled"] += 1
+                self.concurrency_limit = max(float(self.min_concurrency), self.concurrency_limit / 2)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            else:
+                self.concurrency_limit = min(float(self.max_concurrency),
+                                             self.concurrency_limit + 1 / self.concurrency_limit)
+            self._slot_freed()
+
+    def metrics(self) -> Dict:
+        """Queue depth, calls in flight, current concurrency limit and wait times."""
+        with self._cond:
+            requests = self.stats["requests"]
+            return {
+                "queue_depth": self.queued,
+                "in_flight": self.in_flight,
+                "concurrency_limit": int(self.concurrency_limit),
+                "requests": requests,
+                "throttled": self.stats["throttled"],
+                "avg_wait_seconds": self.stats["wait_seconds"] / requests if requests else 0.0,
+                "max_wait_seconds": self.stats["max_wait_seconds"],
+            }
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+# Free-tier requests per minute by provider, used when no *_REQUESTS_PER_MINUTE env var is set
+DEFAULT_REQUESTS_PER_MINUTE = {"gemini": 60}
+
+_limiters: Dict[Tuple[str, str], AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _env_name(*parts: str) -> str:
+    """Env var name for parts, e.g. ("gemini-2.5-flash", "MAX_CONCURRENCY") -> GEMINI_2_5_FLASH_MAX_CONCURRENCY."""
+    return re.sub(r"[^A-Z0-9]+", "_", "_".join(parts).upper())
+
+
+def _limit_setting(provider: str, model: str, setting: str) -> Optional[str]:
+    """
+    The most specific env value for a limit setting: <PROVIDER>_<MODEL>_<SETTING>,
+    then <PROVIDER>_<SETTING>, then LLM_<SETTING>.
+    """
+    for name in (_env_name(provider, model, setting), _env_name(provider, setting), _env_name("LLM", setting)):
+        value = os.getenv(name)
+        if value:
+            return value
+    return None
+
+
+def get_rate_limiter(provider: str, model: str, requests_per_minute: Optional[float] = None,
+                     max_concurrency: Optional[int] = None) -> AdaptiveRateLimiter:
+    """
+    Return the process-wide limiter for a provider/model, creating it on first use.
+
+    Limits not passed in are read from the environment, most specific first:
+    e.g. GEMINI_GEMINI_2_5_FLASH_REQUESTS_PER_MINUTE, then GEMINI_REQUESTS_PER_MINUTE,
+    then LLM_REQUESTS_PER_MINUTE (likewise for *_MAX_CONCURRENCY).
+
+    Args:
+        provider: Provider name, e.g. "gemini"
+        model: Model name
+        requests_per_minute: Pace for a new limiter (defaults to the env vars above,
+                             then the provider's free-tier limit)
+        max_concurrency: Concurrency cap for a new limiter (defaults to the env vars above, then 8)
+    """
+    key = (provider, model)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            if requests_per_minute is None:
+                env_rpm = _limit_setting(provider, model, "REQUESTS_PER_MINUTE")
+                requests_per_minute = float(env_rpm) if env_rpm else DEFAULT_REQUESTS_PER_MINUTE.get(provider)
+            max_concurrency = max_concurrency or int(_limit_setting(provider, model, "MAX_CONCURRENCY") or 8)
+            limiter = _limiters[key] = AdaptiveRateLimiter(requests_per_minute, max_concurrency)
+        return limiter
@@ -0,0 +1,111 @@
+"""
+Cross-encoder reranking of retrieved chunks.
+A small CPU cross-encoder scores every (question, chunk) pair in one
+batched forward pass. Reranking runs under a latency budget: if it isn't
+done in time, the retriever keeps the original order.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+_models: Dict[Tuple[str, str], object] = {}
+_models_lock = threading.Lock()
+
+
+def get_cross_encoder(model_name: str = DEFAULT_RERANK_MODEL, device: str = "cpu"):
+    """Return the process-wide cross-encoder for (model name, device), loading it once."""
+    key = (model_name, device)
+    with _models_lock:
+        if key not in _models:
+            from sentence_transformers import CrossEncoder
+            start = time.perf_counter()
+            _models[key] = CrossEncoder(model_name, device=device)
+            print(f"Loaded reranker {model_name} on {device} in {time.perf_counter() - start:.2f}s")
+        return _models[key]
+
+
+class CrossEncoderReranker:
+    """Reorders (document, score) results by cross-encoder relevance within a time budget."""
+
+    def __init__(self, model_name: Optional[str] = None, device: Optional[str] = None,
+                 budget_seconds: Optional[float] = None, model=None):
+        """
+        Initialize the reranker.
+
+        Args:
+            model_name: Cross-encoder to load (defaults to RERANK_MODEL env var)
+            device: Torch device (defaults to EMBEDDING_DEVICE env var, then cpu)
+            budget_seconds: Time allowed per rerank before falling back to the original
+                            order (defaults to RERANK_BUDGET_MS env var, 300 ms)
+            model: Preloaded model with a predict(pairs) method (loads model_name if None)
+        """
+        self.model_name = model_name or DEFAULT_RERANK_MODEL
+        self.device = device or os.getenv("EMBEDDING_DEVICE", "cpu")
+        self.budget_seconds = budget_seconds if budget_seconds is not None else float(os.getenv("RERANK_BUDGET_MS", "300")) / 1000
+        self._model = model
+        # One worker: concurrent reranks queue within their budget, and one that
+        # overran it finishes in the background
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        # Rerank that timed out and is still holding the worker
+        self._overrun = None
+        self._lock = threading.Lock()
+        self.stats = {"reranked": 0, "over_budget": 0, "busy": 0, "errors": 0}
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = get_cross_encoder(self.model_name, self.device)
+        return self._model
+
+    def warmup(self):
+        """Load the model and run one prediction so the first rerank fits the budget."""
+        self.model.predict([("warmup", "warmup")])
+
+    def _score(self, query: str, texts: List[str]):
+        from torch.nn import Sigmoid
+        # Every pair in a single forward pass; sigmoid keeps scores in 0-1 like retrieval relevance
+        return self.model.predict([(query, text) for text in texts], batch_size=len(texts), activation_fn=Sigmoid())
+
+    def rerank(self, query: str, results: List[Tuple], k: int) -> List[Tuple]:
+        """
+        Rerank retrieved chunks.
+
+        Args:
+            query: The user's question
+            results: (document, score) tuples, best first
+            k: Number of results to return
+
+        Returns:
+            Top k (document, cross-encoder score) tuples, or the first k of the
+            original results if the budget is exceeded or scoring fails
+        """
+        if len(results) <= 1:
+            return results[:k]
+        with self._lock:
+            if self._overrun is not None and not self._overrun.done():
+                # A previous rerank is still over budget; don't queue behind it
+                self.stats["busy"] += 1
+                return results[:k]
+            future = self._executor.submit(self._score, query, [doc.page_content for doc, _ in results])
+        try:
+            scores = future.result(timeout=self.budget_seconds)
+        except TimeoutError:
+            # Drop it if it never started; otherwise skip reranking until it finishes
+            if not future.cancel():
+                with self._lock:
+                    self._overrun = future
+            self.stats["over_budget"] += 1
+            print(f"Rerank exceeded {self.budget_seconds * 1000:.0f} ms budget; keeping retrieval order")
+            return results[:k]
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Rerank failed: {e}")
+            return results[:k]
+
+        self.stats["reranked"] += 1
+        order = sorted(range(len(results)), key=lambda i: float(scores[i]), reverse=True)
+        return [(results[i][0], float(scores[i])) for i in order[:k]]
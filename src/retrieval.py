@@ -1,37 +1,184 @@
+import os
+import asyncio
 from vector_store import VectorStore
+from scheme_matcher import SchemeMatcher, GENERAL_SCHEME
+from reranker import CrossEncoderReranker
+from context_packing import ContextPacker
 
 class Retriever:
-    def __init__(self, k=3):
+    def __init__(self, k=3, scheme_matcher=None, mode=None, dense_weight=None, lexical_weight=None, rrf_k=60,
+                 reranker=None, max_context_tokens=None):
         """
         Initialize the retriever.
         
         Args:
             k: Number of top documents to retrieve
+            scheme_matcher: Finds schemes named in a question (defaults to one built from official-urls.csv)
+            mode: "dense" (embeddings only) or "hybrid" (embeddings fused with BM25);
+                  defaults to the RETRIEVAL_MODE env var, then "dense"
+            dense_weight: Weight of the embedding ranking in hybrid mode (HYBRID_DENSE_WEIGHT, 1.0)
+            lexical_weight: Weight of the BM25 ranking in hybrid mode (HYBRID_LEXICAL_WEIGHT, 1.0)
+            rrf_k: Reciprocal rank fusion constant; larger values flatten rank differences
+            reranker: CrossEncoderReranker applied to the candidates; defaults to one
+                      when the RERANK env var is set, otherwise no reranking
+            max_context_tokens: Token budget for format_context (defaults to CONTEXT_MAX_TOKENS env var, 1500)
         """
         self.vector_store = VectorStore()
         self.k = k
+        self.scheme_matcher = scheme_matcher or SchemeMatcher()
+        self.mode = (mode or os.getenv("RETRIEVAL_MODE", "dense")).lower()
+        self.dense_weight = dense_weight if dense_weight is not None else float(os.getenv("HYBRID_DENSE_WEIGHT", "1.0"))
+        self.lexical_weight = lexical_weight if lexical_weight is not None else float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+        self.rrf_k = rrf_k
+        # Each ranking contributes this many times k candidates to the fusion
+        self.hybrid_candidates = 4
+        if reranker is None and os.getenv("RERANK", "0").lower() in ("1", "true", "yes"):
+            reranker = CrossEncoderReranker()
+        self.reranker = reranker
+        # Candidates fetched per returned document when reranking
+        self.rerank_candidates = int(os.getenv("RERANK_CANDIDATES", "4"))
+        self.packer = ContextPacker(max_tokens=max_context_tokens)
+        # Executor for the async methods' embedding and search work (None = the event loop's default)
+        self.executor = None
     
-    def retrieve(self, query: str, k: int = None):
+    def retrieve(self, query: str, k: int = None, schemes=None):
         """
         Retrieve relevant documents for a query.
         
+        When the question names schemes (or schemes is given), the search is
+        restricted to those schemes plus the general SEBI/AMFI resources.
+        
         Args:
             query: The user's question
             k: Number of documents to retrieve (overrides default)
+            schemes: Scheme names to search (overrides recognition)
             
         Returns:
             List of tuples (document, relevance_score)
         """
         k = k or self.k
-        results = self.vector_store.query(query, k=k)
+        # Over-fetch so the reranker has candidates to promote
+        fetch_k = k * self.rerank_candidates if self.reranker else k
+        schemes = schemes if schemes is not None else self.scheme_matcher.match(query)
+        results = []
+        if schemes:
+            results = self._search(query, fetch_k, schemes=[*schemes, GENERAL_SCHEME])
+        if not results:
+            # Nothing recognized (or nothing indexed for it): search everything
+            results = self._search(query, fetch_k)
+        if self.reranker:
+            results = self.reranker.rerank(query, results, k)
+        return results
+    
+    def retrieve_batch(self, queries, k: int = None):
+        """
+        retrieve() for many queries at once.
+        
+        All queries are embedded in one model call, and queries naming the
+        same schemes share one stacked FAISS search.
+        
+        Args:
+            queries: The users' questions
+            k: Number of documents to retrieve per query (overrides default)
+            
+        Returns:
+            One list of (document, relevance_score) tuples per query
+        """
+        k = k or self.k
+        fetch_k = k * self.rerank_candidates if self.reranker else k
+        if not queries:
+            return []
+        self.embed_queries(queries)
+        
+        results = [[] for _ in queries]
+        by_schemes = {}
+        for i, query in enumerate(queries):
+            schemes = self.scheme_matcher.match(query)
+            if schemes:
+                by_schemes.setdefault(tuple(schemes), []).append(i)
+        for schemes, indices in by_schemes.items():
+            found = self._search_batch([queries[i] for i in indices], fetch_k, schemes=[*schemes, GENERAL_SCHEME])
+            for i, query_results in zip(indices, found):
+                results[i] = query_results
+        
+        # Nothing recognized (or nothing indexed for it): search everything
+        unfiltered = [i for i, query_results in enumerate(results) if not query_results]
+        if unfiltered:
+            found = self._search_batch([queries[i] for i in unfiltered], fetch_k)
+            for i, query_results in zip(unfiltered, found):
+                results[i] = query_results
+        
+        if self.reranker:
+            results = [self.reranker.rerank(query, query_results, k) for query, query_results in zip(queries, results)]
         return results
     
-    def format_context(self, results):
+    def embed_query(self, query: str):
+        """Embedding of the query (served from the query cache after retrieval)."""
+        return self.vector_store.embedding_function.embed_query(query)
+    
+    def embed_queries(self, queries):
+        """Embed many queries in one model call, filling the query cache for retrieve()."""
+        return self.vector_store.embedding_function.embed_queries(queries)
+    
+    @property
+    def index_version(self):
+        """Published version of the index being searched."""
+        return self.vector_store.version
+    
+    def _search(self, query, k, **filters):
+        """Run the configured search mode."""
+        if self.mode != "hybrid":
+            return self.vector_store.query(query, k=k, **filters)
+        candidates = k * self.hybrid_candidates
+        dense = self.vector_store.query(query, k=candidates, **filters)
+        lexical = self.vector_store.lexical_query(query, k=candidates, **filters)
+        return self.fuse(dense, lexical, k)
+    
+    def _search_batch(self, queries, k, **filters):
+        """_search() for many queries, with one stacked dense search."""
+        if self.mode != "hybrid":
+            return self.vector_store.query_batch(queries, k=k, **filters)
+        candidates = k * self.hybrid_candidates
+        dense = self.vector_store.query_batch(queries, k=candidates, **filters)
+        return [
+            self.fuse(query_dense, self.vector_store.lexical_query(query, k=candidates, **filters), k)
+            for query, query_dense in zip(queries, dense)
+        ]
+    
+    def fuse(self, dense, lexical, k):
+        """
+        Combine two rankings with weighted reciprocal rank fusion.
+        
+        Args:
+            dense: (document, score) tuples from the embedding search, best first
+            lexical: (document, score) tuples from the BM25 search, best first
+            k: Number of documents to return
+            
+        Returns:
+            List of (document, score) tuples; scores are scaled so a document
+            ranked first by both searches scores 1.0
+        """
+        fused = {}
+        for weight, ranking in ((self.dense_weight, dense), (self.lexical_weight, lexical)):
+            for rank, (doc, _) in enumerate(ranking, 1):
+                key = doc.id or (doc.metadata.get('source'), doc.page_content)
+                entry = fused.setdefault(key, [doc, 0.0])
+                entry[1] += weight / (self.rrf_k + rank)
+        
+        best = (self.dense_weight + self.lexical_weight) / (self.rrf_k + 1)
+        ranked = sorted(fused.values(), key=lambda entry: entry[1], reverse=True)[:k]
+        return [(doc, score / best if best else 0.0) for doc, score in ranked]
+    
+    def format_context(self, results, max_tokens=None):
         """
         Format retrieved documents into context for LLM.
         
+        Neighbouring chunks of one source are merged, near-duplicates dropped
+        and passages added in relevance order until the token budget is full.
+        
         Args:
             results: List of (document, score) tuples from retrieve()
+            max_tokens: Token budget for the passages (overrides the default)
             
         Returns:
             Formatted string with context and sources
@@ -42,9 +189,10 @@ class Retriever:
         context_parts = []
         sources = []
         
-        for i, (doc, score) in enumerate(results, 1):
+        for i, passage in enumerate(self.packer.pack(results, max_tokens), 1):
+            doc, score = passage["doc"], passage["score"]
             # Extract content and metadata
-            content = doc.page_content
+            content = passage["text"]
             source_url = doc.metadata.get('source', 'Unknown')
             scheme = doc.metadata.get('scheme', 'General')
             description = doc.metadata.get('description', '')
@@ -54,6 +202,7 @@ class Retriever:
             
             # Store source info
             sources.append({
+                'chunk_id': doc.id,
                 'url': source_url,
                 'scheme': scheme,
                 'description': description,
@@ -76,6 +225,25 @@ class Retriever:
         """
         results = self.retrieve(query, k)
         return self.format_context(results)
+    
+    def retrieve_and_format_batch(self, queries, k: int = None):
+        """
+        retrieve_and_format() for many queries, retrieved with retrieve_batch().
+        
+        Returns:
+            One (formatted_context, sources_list) tuple per query
+        """
+        return [self.format_context(results) for results in self.retrieve_batch(queries, k)]
+    
+    async def aretrieve(self, query: str, k: int = None, schemes=None):
+        """Async retrieve(): embedding and search run in self.executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: self.retrieve(query, k, schemes))
+    
+    async def aretrieve_and_format(self, query: str, k: int = None):
+        """Async retrieve_and_format(): embedding, search and packing run in self.executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: self.retrieve_and_format(query, k))
 
 if __name__ == "__main__":
     # Test the retriever
@@ -0,0 +1,111 @@
+"""
+Scheme entity recognition.
+Finds the schemes a question is about, including short names and former
+names ("HDFC Top 100" is now HDFC Large Cap Fund), with one precompiled
+regex so retrieval can filter the vector search to those schemes.
+"""
+import csv
+import os
+import re
+from typing import Dict, Iterable, List, Optional
+
+# Get the project root directory (parent of src)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+URLS_CSV_PATH = os.path.join(PROJECT_ROOT, "official-urls.csv")
+
+# Rows that aren't a scheme
+GENERAL_SCHEME = "General Resources"
+
+# Aliases that can't be derived from the scheme name or the CSV description.
+# Spaces in aliases also match hyphens or nothing ("Tax Saver" finds "TaxSaver").
+KNOWN_ALIASES = {
+    "HDFC Large Cap Fund": ["Top 100"],
+    "HDFC ELSS Tax Saver Fund": ["ELSS", "Tax Saver", "Tax Saving Fund"],
+    "HDFC Balanced Advantage Fund": ["BAF", "HDFC Prudence Fund", "HDFC Growth Fund"],
+    "HDFC Flexi Cap Fund": ["HDFC Equity Fund"],
+}
+
+_FORMERLY = re.compile(r"formerly\s+(?:known\s+as\s+)?([^)]+?)\s*(?:\)|$)", re.IGNORECASE)
+
+
+def scheme_aliases(scheme: str) -> List[str]:
+    """Name variants derived from a scheme name: with and without "HDFC" and "Fund"."""
+    names = {scheme}
+    base = re.sub(r"\s+Fund$", "", scheme)
+    names.add(base)
+    for name in list(names):
+        if name.startswith("HDFC "):
+            names.add(name[len("HDFC "):])
+    return sorted(names)
+
+
+class SchemeMatcher:
+    """Matches scheme names and aliases in a question."""
+
+    def __init__(self, urls_csv_path: Optional[str] = None, aliases: Optional[Dict[str, Iterable[str]]] = None):
+        """
+        Build the matcher.
+
+        Args:
+            urls_csv_path: CSV with scheme and description columns (defaults to official-urls.csv)
+            aliases: Extra scheme -> aliases (defaults to KNOWN_ALIASES)
+        """
+        self.urls_csv_path = urls_csv_path or URLS_CSV_PATH
+        self.alias_to_scheme: Dict[str, str] = {}
+        # Lookup by alias with case, spaces and hyphens ignored ("Flexi-cap" == "Flexi Cap")
+        self._keys: Dict[str, str] = {}
+        rows = []
+        if os.path.exists(self.urls_csv_path):
+            with open(self.urls_csv_path, "r", encoding="utf-8", newline="") as f:
+                rows = list(csv.DictReader(f))
+
+        schemes = []
+        for row in rows:
+            scheme = (row.get("scheme") or "").strip()
+            if not scheme or scheme == GENERAL_SCHEME:
+                continue
+            if scheme not in schemes:
+                schemes.append(scheme)
+            for former in _FORMERLY.findall(row.get("description") or ""):
+                for alias in scheme_aliases(former.strip()):
+                    self._add_alias(alias, scheme)
+        self.schemes = schemes
+
+        for scheme in schemes:
+            for alias in scheme_aliases(scheme):
+                self._add_alias(alias, scheme)
+        for scheme, extra in (KNOWN_ALIASES if aliases is None else aliases).items():
+            if scheme in schemes:
+                for alias in extra:
+                    self._add_alias(alias, scheme)
+
+        # Longest alias first so "HDFC Large Cap Fund" wins over "Large Cap"
+        alternation = "|".join(
+            re.escape(alias).replace(r"\ ", r"[\s-]*")
+            for alias in sorted(self.alias_to_scheme, key=len, reverse=True)
+        )
+        self._pattern = re.compile(rf"(?<!\w)(?:{alternation})(?!\w)", re.IGNORECASE) if alternation else None
+
+    @staticmethod
+    def _key(alias: str) -> str:
+        return re.sub(r"[\s-]+", "", alias).lower()
+
+    def _add_alias(self, alias: str, scheme: str):
+        self.alias_to_scheme.setdefault(alias, scheme)
+        self._keys.setdefault(self._key(alias), scheme)
+
+    def match(self, question: str) -> List[str]:
+        """
+        Find the schemes mentioned in a question.
+
+        Returns:
+            Scheme names in order of first mention (empty if none)
+        """
+        if self._pattern is None:
+            return []
+        found = []
+        for m in self._pattern.finditer(question):
+            scheme = self._keys.get(self._key(m.group(0)))
+            if scheme and scheme not in found:
+                found.append(scheme)
+        return found
@@ -0,0 +1,177 @@
+"""
+Single-flight coalescing of identical concurrent calls.
+When many callers ask for the same key at once, one of them (the leader)
+computes the result and the others wait for it and share it, instead of
+each repeating the same work. A leader that produces its result in steps can
+publish them, so followers see each step as it happens.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+
+class Flight:
+    """One in-flight computation that followers can wait on."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._cond = threading.Condition()
+        self._result = None
+        self._error: Optional[BaseException] = None
+        # Steps the leader published, in order
+        self._events: List[Any] = []
+        # (event loop, future) of async followers
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self.followers = 0
+
+    def _outcome(self) -> Any:
+        if isinstance(self._error, Exception):
+            raise self._error
+        if self._error is not None:
+            # The leader was cancelled or closed (GeneratorExit); that isn't the follower's to re-raise
+            raise RuntimeError("the identical in-flight call was abandoned") from self._error
+        return self._result
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        """
+        Wait for the leader's result.
+
+        Args:
+            timeout: Longest wait in seconds (None = until the leader finishes)
+
+        Returns:
+            The leader's result; the leader's exception is raised instead if it
+            failed, and TimeoutError if it didn't finish in time
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError("the identical in-flight call did not finish in time")
+        return self._outcome()
+
+    async def await_result(self, timeout: Optional[float] = None) -> Any:
+        """Like wait(), but waits on the event loop without holding a thread."""
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if self._done.is_set():
+                return self._outcome()
+            waiter = (loop, loop.create_future())
+            self._async_waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError("the identical in-flight call did not finish in time") from None
+        finally:
+            with self._cond:
+                if waiter in self._async_waiters:
+                    self._async_waiters.remove(waiter)
+        return self._outcome()
+
+    def publish(self, event: Any):
+        """Leader: make one step of the computation visible to followers."""
+        with self._cond:
+            self._events.append(event)
+            self._cond.notify_all()
+
+    def events(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Yield the leader's published steps, from the first, as they happen.
+
+        Stops once the leader finishes; wait(0) then gives its result. Raises
+        TimeoutError if the leader doesn't finish within timeout seconds.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        seen = 0
+        while True:
+            with self._cond:
+                while seen == len(self._events) and not self._done.is_set():
+                    remaining = deadline - time.monotonic() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("the identical in-flight call did not finish in time")
+                    self._cond.wait(remaining)
+                new, seen = self._events[seen:], len(self._events)
+                done = self._done.is_set()
+            yield from new
+            if done and not new:
+                return
+
+    def _land(self, result: Any, error: Optional[BaseException]):
+        with self._cond:
+            self._result = result
+            self._error = error
+            self._done.set()
+            self._cond.notify_all()
+            for loop, future in self._async_waiters:
+                try:
+                    loop.call_soon_threadsafe(_wake, future)
+                except RuntimeError:
+                    # Loop already closed; its follower is gone
+                    pass
+            self._async_waiters.clear()
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class SingleFlight:
+    """Thread-safe registry of in-flight computations by key."""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, Flight] = {}
+        self._lock = threading.Lock()
+        self.stats = {"leaders": 0, "coalesced": 0}
+
+    def begin(self, key: Hashable) -> Tuple[Flight, bool]:
+        """
+        Join the flight for key, starting one if none is in the air.
+
+        Returns:
+            (flight, True) for the leader, who must call finish() when done,
+            or (flight, False) for a follower, who waits on flight
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self.stats["coalesced"] += 1
+                return flight, False
+            flight = self._flights[key] = Flight()
+            self.stats["leaders"] += 1
+            return flight, True
+
+    def finish(self, key: Hashable, flight: Flight, result: Any = None, error: Optional[BaseException] = None):
+        """Land the leader's flight: publish its result (or error) and let new calls start afresh."""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight._land(result, error)
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """
+        Run fn() once for all concurrent callers with the same key.
+
+        A follower whose leader fails or outlasts timeout runs fn() itself,
+        so a coalesced call never does worse than an uncoalesced one.
+
+        Returns:
+            (result, shared): shared is True when the result came from another caller
+        """
+        flight, leader = self.begin(key)
+        if not leader:
+            try:
+                return flight.wait(timeout), True
+            except Exception:
+                return fn(), False
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, flight, error=e)
+            raise
+        self.finish(key, flight, result=result)
+        return result, False
+
+    def in_flight(self) -> int:
+        """Number of keys currently being computed."""
+        with self._lock:
+            return len(self._flights)
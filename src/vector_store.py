@@ -1,68 +1,510 @@
+import json
 import os
-import pickle
+import shutil
+import threading
+import time
+import weakref
+from urllib.parse import unquote, urlparse
+import numpy as np
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.faiss import dependable_faiss_import
 from langchain_core.documents import Document
 from embeddings import get_embedding_function
+from embedding_cache import CachedEmbeddings
+from chunk_store import ChunkStore
+from bm25 import BM25Index
 
 # Get the project root directory (parent of src)
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 FAISS_PATH = os.path.join(PROJECT_ROOT, "faiss_index")
 
+# Published index versions live in faiss_index/versions/<version>/ and
+# faiss_index/CURRENT names the live one. Replacing CURRENT is atomic, so
+# readers always see either the old or the new version, never a partial one.
+VERSIONS_DIR = "versions"
+CURRENT_FILE = "CURRENT"
+INDEX_FILE = "index.faiss"
+# Row positions per (field, value) filter group, written with each version:
+# the JSON lists [field, value, start, end] slices into the int64 rows array
+GROUPS_FILE = "filter_groups.json"
+GROUP_ROWS_FILE = "filter_groups.rows.npy"
+
+# Hosts whose documents form their own source type regardless of format
+SOURCE_TYPE_HOSTS = {"sebi.gov.in": "SEBI", "amfiindia.com": "AMFI", "nism.ac.in": "NISM"}
+
+def source_type(metadata):
+    """Classify a chunk's source as KIM, SID, SEBI, AMFI, NISM or WEB."""
+    if metadata.get("source_type"):
+        return metadata["source_type"]
+    url = urlparse(metadata.get("source", ""))
+    host = url.netloc.lower()
+    for suffix, kind in SOURCE_TYPE_HOSTS.items():
+        if host == suffix or host.endswith("." + suffix):
+            return kind
+    parts = unquote(url.path).upper().split("/")
+    filename = parts[-1]
+    for kind in ("KIM", "SID"):
+        if kind in parts or filename.startswith(kind):
+            return kind
+    return "WEB"
+
+def _group_keys(metadata):
+    """Filter groups a chunk belongs to."""
+    return (("scheme", metadata.get("scheme")), ("source_type", source_type(metadata)))
+
+def _write_groups(path, groups):
+    """Save filter groups as one concatenated rows array plus a JSON slice table."""
+    table, start = [], 0
+    for (field, value), rows in groups.items():
+        table.append([field, value, start, start + len(rows)])
+        start += len(rows)
+    rows = np.concatenate(list(groups.values())) if groups else np.empty(0, dtype=np.int64)
+    np.save(os.path.join(path, GROUP_ROWS_FILE), rows.astype(np.int64, copy=False))
+    with open(os.path.join(path, GROUPS_FILE), "w", encoding="utf-8") as f:
+        json.dump(table, f, ensure_ascii=False)
+
+def _load_groups(path):
+    """Memory-map filter groups saved with a version, or None if it has none."""
+    if not os.path.exists(os.path.join(path, GROUPS_FILE)):
+        return None
+    rows = np.load(os.path.join(path, GROUP_ROWS_FILE), mmap_mode="r")
+    with open(os.path.join(path, GROUPS_FILE), "r", encoding="utf-8") as f:
+        return {(field, value): rows[start:end] for field, value, start, end in json.load(f)}
+
+def _as_set(value):
+    if value is None:
+        return None
+    return {value} if isinstance(value, str) else set(value)
+
 class VectorStore:
-    def __init__(self):
+    def __init__(self, hot_reload=True, reload_interval=5.0, keep_versions=3):
         self.faiss_path = FAISS_PATH
-        self.embedding_function = get_embedding_function()
+        # Chunk vectors are looked up in the persistent cache before the model runs
+        self.embedding_function = CachedEmbeddings(get_embedding_function())
         self._db = None
+        # Hot reload: get_db() checks CURRENT for a newer version every reload_interval seconds
+        self.hot_reload = hot_reload
+        self.reload_interval = reload_interval
+        self.keep_versions = keep_versions
+        self.version = None
+        self._fresh = False
+        # Set while added or deleted chunks haven't been saved yet
+        self._dirty = False
+        # Version written by save(publish=False) and not yet published
+        self._unpublished = None
+        self._last_reload_check = 0.0
+        self._reload_lock = threading.Lock()
+        self._reload_listeners = []
+        # {(field, value): FAISS row positions} per loaded FAISS index, for filtered search
+        self._filter_groups = weakref.WeakKeyDictionary()
+        # BM25 index per loaded FAISS index (saved alongside it, or built on first use)
+        self._lexical = weakref.WeakKeyDictionary()
+        
+    def current_version(self):
+        """Return the published version named by CURRENT, or None."""
+        try:
+            with open(os.path.join(self.faiss_path, CURRENT_FILE), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+    
+    def _version_path(self, version):
+        return os.path.join(self.faiss_path, VERSIONS_DIR, version)
+    
+    def _load(self):
+        """Load the live index from disk, returning (db, version) or (None, None)."""
+        version = self.current_version()
+        if version is not None:
+            path = self._version_path(version)
+        elif os.path.exists(os.path.join(self.faiss_path, INDEX_FILE)):
+            # Index saved before versioned publishing
+            path = self.faiss_path
+        else:
+            return None, None
+        return self._read_index(path), version
+    
+    def _read_index(self, path):
+        """Open the FAISS index and its memory-mapped chunk store."""
+        if not ChunkStore.exists(path):
+            # Index saved with LangChain's pickled docstore; the next save rewrites it
+            print(f"Loading legacy pickle docstore from {path}; re-run ingestion to convert it")
+            return FAISS.load_local(
+                path,
+                self.embedding_function,
+                allow_dangerous_deserialization=True
+            )
+        faiss = dependable_faiss_import()
+        index = faiss.read_index(os.path.join(path, INDEX_FILE))
+        docstore = ChunkStore(path)
+        db = FAISS(self.embedding_function, index, docstore, dict(enumerate(docstore.ids)))
+        if BM25Index.exists(path):
+            self._lexical[db] = BM25Index.load(path)
+        groups = _load_groups(path)
+        if groups is not None:
+            self._filter_groups[db] = groups
+        return db
         
     def get_db(self):
-        """Get or create the FAISS database."""
+        """Get or create the FAISS database, picking up newly published versions."""
         if self._db is not None:
+            if self.hot_reload:
+                self._maybe_reload()
             return self._db
+        if self._fresh:
+            # reset() was called: build a new index instead of loading the published one
+            return None
             
-        if os.path.exists(self.faiss_path):
-            # Load existing index
-            self._db = FAISS.load_local(
-                self.faiss_path,
-                self.embedding_function,
-                allow_dangerous_deserialization=True
-            )
+        with self._reload_lock:
+            if self._db is None and os.path.exists(self.faiss_path):
+                # Load existing index
+                self._db, self.version = self._load()
         return self._db
+    
+    def _maybe_reload(self):
+        """Swap in a newer published version, if any, without blocking readers."""
+        now = time.monotonic()
+        if now - self._last_reload_check < self.reload_interval:
+            return
+        self._last_reload_check = now
+        if self._dirty or self._fresh:
+            # Unsaved local changes would be lost by swapping in another version
+            return
+        if self.current_version() in (None, self.version):
+            return
+        # Only one caller loads; everyone else keeps querying the current index
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            old_version, new_version = self.version, self.current_version()
+            if new_version in (None, old_version):
+                return
+            try:
+                db, new_version = self._load()
+            except Exception as e:
+                print(f"Hot reload of index version {new_version} failed: {e}")
+                return
+            # Single reference swap: in-flight queries finish on the old index
+            self._db, self.version = db, new_version
+            print(f"Reloaded index version {new_version} (was {old_version})")
+        finally:
+            self._reload_lock.release()
+        for listener in list(self._reload_listeners):
+            listener(old_version, new_version)
+    
+    def reload(self):
+        """Check for a newer published version now instead of waiting for the interval."""
+        self._last_reload_check = 0.0
+        if self._db is None:
+            return self.get_db()
+        self._maybe_reload()
+        return self._db
+    
+    def add_reload_listener(self, callback):
+        """Register callback(old_version, new_version) to run after a hot reload."""
+        self._reload_listeners.append(callback)
 
-    def add_documents(self, documents: list[Document]):
-        """Add documents to the vector store."""
+    def add_documents(self, documents: list[Document], save: bool = True):
+        """Add documents to the vector store (and persist it unless save=False)."""
         if not documents:
             return 0
             
-        if self._db is None and os.path.exists(self.faiss_path):
-            # Load existing database
-            self._db = FAISS.load_local(
-                self.faiss_path,
-                self.embedding_function,
-                allow_dangerous_deserialization=True
-            )
-            # Add new documents
+        if self.get_db() is not None:
+            # Add new documents to the loaded (or already open) database
             self._db.add_documents(documents)
         else:
             # Create new database from documents
             self._db = FAISS.from_documents(documents, self.embedding_function)
+        self._filter_groups.pop(self._db, None)
+        self._lexical.pop(self._db, None)
+        self._dirty = True
         
         # Save the index
-        self._db.save_local(self.faiss_path)
+        if save:
+            self.save()
         print(f"Added {len(documents)} chunks to {self.faiss_path}")
         return len(documents)
     
+    def delete_documents(self, ids: list[str], save: bool = True):
+        """Delete chunks by ID from the vector store, ignoring unknown IDs."""
+        db = self.get_db()
+        if db is None or not ids:
+            return 0
+        
+        existing = set(db.index_to_docstore_id.values())
+        to_delete = [chunk_id for chunk_id in ids if chunk_id in existing]
+        if to_delete:
+            db.delete(to_delete)
+            self._filter_groups.pop(db, None)
+            self._lexical.pop(db, None)
+            self._dirty = True
+            if save:
+                self.save()
+            print(f"Deleted {len(to_delete)} chunks from {self.faiss_path}")
+        return len(to_delete)
+    
+    def save(self, publish: bool = True):
+        """
+        Write the in-memory index as a new version and publish it atomically.
+        
+        With publish=False the version is written (and the docstore switched to
+        its mapped files) without moving CURRENT; a later save() publishes it.
+        """
+        if self._db is None:
+            return None
+        if not self._dirty and self._unpublished is not None:
+            # Nothing changed since the last unpublished save: publish that version as is
+            version = self._unpublished
+            if publish:
+                self._publish(version)
+            return version
+        version = f"v{time.time_ns()}"
+        path = self._version_path(version)
+        os.makedirs(path, exist_ok=True)
+        faiss = dependable_faiss_import()
+        faiss.write_index(self._db.index, os.path.join(path, INDEX_FILE))
+        # Chunks are written in FAISS row order, so row i of the store is vector i
+        docstore, index_to_id = self._db.docstore, self._db.index_to_docstore_id
+        groups = {}
+
+        def chunks():
+            # Collect the filter groups in the same pass, so loading never decodes metadata
+            for row in range(self._db.index.ntotal):
+                doc = docstore.search(index_to_id[row])
+                for key in _group_keys(doc.metadata):
+                    groups.setdefault(key, []).append(row)
+                yield index_to_id[row], doc
+
+        ChunkStore.write(path, chunks())
+        groups = {key: np.asarray(rows, dtype=np.int64) for key, rows in groups.items()}
+        _write_groups(path, groups)
+        # Serve chunks from the mapped files from now on instead of holding Documents in memory
+        self._db.docstore = ChunkStore(path)
+        self._db.index_to_docstore_id = dict(enumerate(self._db.docstore.ids))
+        self._filter_groups[self._db] = groups
+        lexical = self._build_lexical(self._db)
+        lexical.save(path)
+        self._dirty = False
+        
+        if publish:
+            self._publish(version)
+        else:
+            self._unpublished = version
+        return version
+    
+    def _publish(self, version):
+        """Point CURRENT at a written version."""
+        # Write-then-rename: os.replace is atomic, so readers never see a half-written pointer
+        current_path = os.path.join(self.faiss_path, CURRENT_FILE)
+        tmp_path = f"{current_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_path, current_path)
+        
+        self.version = version
+        self._fresh = False
+        self._unpublished = None
+        self._prune_versions()
+    
+    def _prune_versions(self):
+        """Remove all but the newest keep_versions versions, never the live or pending one."""
+        versions_root = os.path.join(self.faiss_path, VERSIONS_DIR)
+        keep = {self.version, self._unpublished, self.current_version()}
+        for old in sorted(os.listdir(versions_root))[:-self.keep_versions]:
+            if old not in keep:
+                shutil.rmtree(os.path.join(versions_root, old), ignore_errors=True)
+    
+    def reset(self):
+        """
+        Start an empty index in memory without touching what's published.
+        The next published save() replaces the live version, so readers never see a gap.
+        """
+        self._db = None
+        self._fresh = True
+        self._dirty = False
+        self._unpublished = None
+    
     def clear(self):
         """Clear the existing database."""
         if os.path.exists(self.faiss_path):
-            import shutil
             shutil.rmtree(self.faiss_path)
             print(f"Cleared database at {self.faiss_path}")
         self._db = None
+        self.version = None
 
-    def query(self, query_text: str, k=3):
-        """Query the database for relevant documents."""
+    def _groups(self, db):
+        """FAISS row positions per scheme and source type, loaded with the index or built once."""
+        cached = self._filter_groups.get(db)
+        if cached is not None:
+            return cached
+        # Index saved without filter groups, or changed since it was saved
+        groups = {}
+        for row, chunk_id in db.index_to_docstore_id.items():
+            if isinstance(db.docstore, ChunkStore):
+                # Decode only the metadata column, not the chunk text
+                metadata = db.docstore.metadata(chunk_id) or {}
+            else:
+                metadata = db.docstore.search(chunk_id).metadata
+            for key in _group_keys(metadata):
+                groups.setdefault(key, []).append(row)
+        groups = {key: np.asarray(rows, dtype=np.int64) for key, rows in groups.items()}
+        self._filter_groups[db] = groups
+        return groups
+    
+    def filter_rows(self, schemes=None, source_types=None, db=None):
+        """
+        FAISS row positions of chunks matching the filters.
+        
+        Args:
+            schemes: Scheme name or list of names (None = any scheme)
+            source_types: Source type or list of types, e.g. "KIM" (None = any)
+            
+        Returns:
+            Sorted int64 array of row positions, or None when no filter is given
+        """
+        db = db or self.get_db()
+        if db is None or (schemes is None and source_types is None):
+            return None
+        groups = self._groups(db)
+        rows = None
+        for field, values in (("scheme", _as_set(schemes)), ("source_type", _as_set(source_types))):
+            if values is None:
+                continue
+            matched = [groups[(field, value)] for value in values if (field, value) in groups]
+            field_rows = np.unique(np.concatenate(matched)) if matched else np.empty(0, dtype=np.int64)
+            rows = field_rows if rows is None else np.intersect1d(rows, field_rows)
+        return rows
+    
+    def _search_rows(self, db, query_vectors, rows, k):
+        """
+        Search only the given rows for each query vector.
+        
+        Returns:
+            (distances, row positions) arrays with one row per query, best first;
+            positions of -1 mark missing results
+        """
+        faiss = dependable_faiss_import()
+        index = db.index
+        if isinstance(index, faiss.IndexFlat):
+            # Score just the subset against a zero-copy view of the stored vectors
+            vectors = faiss.rev_swig_ptr(index.get_xb(), index.ntotal * index.d).reshape(index.ntotal, index.d)
+            subset = vectors[rows]
+            if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+                distances = query_vectors @ subset.T
+                order = np.argsort(-distances, axis=1)[:, :k]
+            else:
+                # |x - q|^2 = |x|^2 - 2 x.q + |q|^2, without an (n, m, d) difference array
+                distances = (subset ** 2).sum(axis=1) - 2 * query_vectors @ subset.T
+                distances += (query_vectors ** 2).sum(axis=1, keepdims=True)
+                np.maximum(distances, 0, out=distances)
+                order = np.argsort(distances, axis=1)[:, :k]
+            return np.take_along_axis(distances, order, axis=1), rows[order]
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(rows))
+        return index.search(query_vectors, k, params=params)
+    
+    def _results(self, db, distances, found):
+        """(document, relevance_score) tuples for one query's search output."""
+        relevance = db._select_relevance_score_fn()
+        results = []
+        for distance, row in zip(distances, found):
+            if row < 0:
+                continue
+            doc = db.docstore.search(db.index_to_docstore_id[int(row)])
+            results.append((doc, relevance(float(distance))))
+        return results
+    
+    def _build_lexical(self, db):
+        """Build the BM25 index over the chunks in FAISS row order."""
+        texts = (db.docstore.search(db.index_to_docstore_id[i]).page_content for i in range(db.index.ntotal))
+        lexical = BM25Index.build(texts)
+        self._lexical[db] = lexical
+        return lexical
+    
+    def lexical_index(self, db=None):
+        """BM25 index of the loaded database (None if there is no database)."""
+        db = db or self.get_db()
+        if db is None:
+            return None
+        lexical = self._lexical.get(db)
+        if lexical is None:
+            # Indexes saved before BM25 was added, or edited since they were loaded
+            lexical = self._build_lexical(db)
+        return lexical
+    
+    def lexical_query(self, query_text: str, k=3, schemes=None, source_types=None):
+        """
+        Query the BM25 index, with the same filters as query().
+        
+        Returns:
+            List of (document, bm25_score) tuples, best first
+        """
         db = self.get_db()
         if db is None:
             return []
-        results = db.similarity_search_with_relevance_scores(query_text, k=k)
-        return results
+        rows = self.filter_rows(schemes, source_types, db=db)
+        if rows is not None and len(rows) == 0:
+            return []
+        hits = self.lexical_index(db).search(query_text, k, rows=rows)
+        return [(db.docstore.search(db.index_to_docstore_id[row]), score) for row, score in hits]
+    
+    def query(self, query_text: str, k=3, schemes=None, source_types=None):
+        """
+        Query the database for relevant documents.
+        
+        Args:
+            query_text: The user's question
+            k: Number of chunks to return
+            schemes: Only search chunks of these schemes (name or list)
+            source_types: Only search chunks from these source types, e.g. ["KIM", "SID"]
+            
+        Returns:
+            List of (document, relevance_score) tuples, best first
+        """
+        db = self.get_db()
+        if db is None:
+            return []
+        rows = self.filter_rows(schemes, source_types, db=db)
+        if rows is None:
+            results = db.similarity_search_with_relevance_scores(query_text, k=k)
+            return results
+        if len(rows) == 0:
+            return []
+        
+        query_vector = np.asarray([self.embedding_function.embed_query(query_text)], dtype=np.float32)
+        if db._normalize_L2:
+            query_vector /= np.linalg.norm(query_vector, axis=1, keepdims=True)
+        distances, found = self._search_rows(db, query_vector, rows, k)
+        return self._results(db, distances[0], found[0])
+    
+    def query_batch(self, query_texts: list[str], k=3, schemes=None, source_types=None):
+        """
+        Query the database for many questions at once.
+        
+        The questions are embedded in one model call and searched with a
+        single FAISS search over the stacked query matrix.
+        
+        Args:
+            query_texts: The questions
+            k: Number of chunks to return per question
+            schemes: Only search chunks of these schemes (name or list)
+            source_types: Only search chunks from these source types, e.g. ["KIM", "SID"]
+            
+        Returns:
+            One list of (document, relevance_score) tuples per question, best first
+        """
+        if not query_texts:
+            return []
+        db = self.get_db()
+        if db is None:
+            return [[] for _ in query_texts]
+        rows = self.filter_rows(schemes, source_types, db=db)
+        if rows is not None and len(rows) == 0:
+            return [[] for _ in query_texts]
+        
+        query_vectors = np.asarray(self.embedding_function.embed_queries(list(query_texts)), dtype=np.float32)
+        if db._normalize_L2:
+            query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+        if rows is None:
+            distances, found = db.index.search(query_vectors, k)
+        else:
+            distances, found = self._search_rows(db, query_vectors, rows, k)
+        return [self._results(db, d, f) for d, f in zip(distances, found)]
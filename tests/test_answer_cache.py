@@ -0,0 +1,77 @@
+"""
+Unit tests for answer_cache.py module.
+Tests similarity matching, source checks, expiry and invalidation.
+"""
+import os
+import sys
+import pytest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.answer_cache import SemanticAnswerCache
+
+
+SOURCES = ["chunk-1", "chunk-2"]
+
+
+class TestSemanticAnswerCache:
+    """Test suite for SemanticAnswerCache class."""
+
+    @pytest.fixture
+    def cache(self):
+        """Create a cache holding one answer."""
+        cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=60, max_entries=10)
+        cache.put([1.0, 0.0], SOURCES, {"answer": "1%"}, index_version="v1", k=3)
+        return cache
+
+    def test_similar_question_same_sources_hits(self, cache):
+        """Test a paraphrase retrieving the same sources gets the cached answer."""
+        result = cache.get([0.99, 0.05], SOURCES, index_version="v1", k=3)
+
+        assert result["answer"] == "1%"
+        assert result["cache_similarity"] > 0.9
+        assert cache.stats["hits"] == 1
+
+    def test_dissimilar_question_misses(self, cache):
+        """Test a question below the threshold is a miss."""
+        assert cache.get([0.5, 0.5], SOURCES, index_version="v1", k=3) is None
+        assert cache.hit_rate() == 0.0
+
+    def test_different_sources_or_settings_miss(self, cache):
+        """Test the same question with other sources, k or version is a miss."""
+        assert cache.get([1.0, 0.0], ["chunk-2", "chunk-1"], index_version="v1", k=3) is None
+        assert cache.get([1.0, 0.0], SOURCES, index_version="v2", k=3) is None
+        assert cache.get([1.0, 0.0], SOURCES, index_version="v1", k=5) is None
+
+    def test_expired_entries_dropped(self, cache):
+        """Test answers older than the TTL aren't served."""
+        cache.ttl_seconds = 0
+
+        assert cache.get([1.0, 0.0], SOURCES, index_version="v1", k=3) is None
+        assert cache.stats["expired"] == 1
+        assert len(cache) == 0
+
+    def test_invalidate_other_versions(self, cache):
+        """Test publishing a new index version drops older answers."""
+        cache.put([0.0, 1.0], SOURCES, {"answer": "new"}, index_version="v2", k=3)
+
+        cache.invalidate("v2")
+
+        assert len(cache) == 1
+        assert cache.get([0.0, 1.0], SOURCES, index_version="v2", k=3)["answer"] == "new"
+        assert cache.stats["invalidated"] == 1
+
+    def test_evicts_beyond_max_entries(self):
+        """Test the least recently used answers are evicted."""
+        cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=60, max_entries=2)
+        for i in range(3):
+            cache.put([1.0, float(i)], [f"chunk-{i}"], {"answer": str(i)})
+
+        assert len(cache) == 2
+        assert cache.get([1.0, 0.0], ["chunk-0"]) is None
+        assert cache.stats["evicted"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -4,14 +4,20 @@ Tests RAG integration and answer generation.
 """
 import os
 import sys
+import asyncio
+import threading
+import time
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
 from datetime import datetime
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.answer_generator import AnswerGenerator, get_answer_generator
+from src.answer_cache import SemanticAnswerCache
+# answer_generator imports its siblings by bare name, so match its exception classes
+from llm import CircuitOpenError
 
 
 class TestAnswerGenerator:
@@ -25,6 +31,9 @@ class TestAnswerGenerator:
             "[Source 1] Test context",
             [{"scheme": "Test Scheme", "url": "https://test.com", "relevance_score": 0.85}]
         )
+        retriever.retrieve_and_format_batch.side_effect = lambda questions, k=None: [
+            retriever.retrieve_and_format(question, k=k) for question in questions
+        ]
         return retriever
     
     @pytest.fixture
@@ -37,7 +46,7 @@ class TestAnswerGenerator:
     
     def test_init_default(self):
         """Test AnswerGenerator initialization with defaults."""
-        with patch('src.answer_generator.Retriever'), patch('src.answer_generator.LLM'):
+        with patch('src.answer_generator.Retriever'), patch('src.answer_generator.get_llm'):
             generator = AnswerGenerator()
             assert generator.k == 3
     
@@ -97,6 +106,28 @@ class TestAnswerGenerator:
         assert 'error' in result
         assert result['error'] == "API Error"
     
+    def test_generate_answer_falls_back_to_sources(self, mock_retriever, mock_llm):
+        """Test an unavailable LLM gives a sources-only answer instead of an error message."""
+        mock_llm.generate.side_effect = CircuitOpenError("gemini is failing")
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        
+        result = generator.generate_answer("Test question?")
+        
+        assert result['fallback'] is True
+        assert "https://test.com" in result['answer']
+        assert "Error generating answer" not in result['answer']
+        assert result['sources'][0]['url'] == "https://test.com"
+    
+    def test_generate_answer_propagates_deadline(self, mock_retriever, mock_llm):
+        """Test the caller's timeout reaches the LLM as an absolute deadline."""
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        
+        before = time.monotonic()
+        generator.generate_answer("Test question?", timeout=2.0)
+        
+        deadline = mock_llm.generate.call_args[1]['deadline']
+        assert before + 2.0 <= deadline <= time.monotonic() + 2.0
+    
     def test_generate_answer_custom_temperature(self, mock_retriever, mock_llm):
         """Test answer generation with custom temperature."""
         generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
@@ -170,6 +201,64 @@ class TestAnswerGenerator:
         assert all('answer' in r for r in results)
         assert mock_retriever.retrieve_and_format.call_count == 3
     
+    def test_answer_questions_retrieves_as_one_batch(self, mock_retriever, mock_llm):
+        """Test the batch retrieves every question in one call before answering."""
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        questions = ["What is the expense ratio?", "What is the exit load?"]
+        
+        generator.answer_questions(questions, k=4)
+        
+        mock_retriever.retrieve_and_format_batch.assert_called_once_with(questions, k=4)
+    
+    def test_answer_questions_concurrent_in_order(self, mock_retriever, mock_llm):
+        """Test LLM calls overlap up to the concurrency limit and results keep input order."""
+        lock = threading.Lock()
+        in_flight = {"now": 0, "max": 0}
+        
+        def generate(prompt, temperature=None, deadline=None):
+            with lock:
+                in_flight["now"] += 1
+                in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            time.sleep(0.02)
+            with lock:
+                in_flight["now"] -= 1
+            return f"Answer to {prompt}"
+        
+        mock_llm.create_prompt.side_effect = lambda question, context, sources: question
+        mock_llm.generate.side_effect = generate
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        questions = [f"Question {i}?" for i in range(8)]
+        
+        results = generator.answer_questions(questions, max_concurrency=3)
+        
+        assert [r['answer'] for r in results] == [f"Answer to Question {i}?" for i in range(8)]
+        assert in_flight["max"] == 3
+    
+    def test_answer_questions_per_item_errors(self, mock_retriever, mock_llm):
+        """Test one failing question doesn't fail the batch, even after batch retrieval fails."""
+        mock_retriever.retrieve_and_format_batch.side_effect = RuntimeError("batch search failed")
+        mock_retriever.retrieve_and_format.side_effect = [
+            RuntimeError("index unavailable"),
+            ("[Source 1] Test context", [{"scheme": "Test Scheme", "url": "https://test.com", "relevance_score": 0.85}]),
+        ]
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        
+        results = generator.answer_questions(["First?", "Second?"], max_concurrency=1)
+        
+        assert results[0]['error'] == "index unavailable"
+        assert results[0]['question'] == "First?"
+        assert results[1]['answer'] == "Generated answer with [Source 1] citation"
+    
+    def test_answer_questions_rate_limited(self, mock_retriever, mock_llm):
+        """Test LLM calls are paced to the requests-per-minute limit."""
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        
+        start = time.monotonic()
+        generator.answer_questions([f"Q{i}?" for i in range(4)], max_concurrency=2, requests_per_minute=1200)
+        
+        # A burst of 2, then two more 50 ms apart
+        assert time.monotonic() - start >= 0.09
+    
     def test_answer_questions_empty_list(self, mock_retriever, mock_llm):
         """Test answering empty question list."""
         generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
@@ -212,14 +301,325 @@ class TestAnswerGenerator:
         assert result['sources'][0]['description'] == 'Test description'
         assert result['sources'][0]['relevance_score'] == 0.95
     
+    def test_answer_cache_skips_llm_for_paraphrase(self, mock_retriever, mock_llm):
+        """Test a paraphrase with the same sources is answered from the cache."""
+        mock_retriever.embed_query.side_effect = [[1.0, 0.0], [0.99, 0.05]]
+        mock_retriever.index_version = "v1"
+        cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=60)
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm, answer_cache=cache)
+        
+        first = generator.generate_answer("What is the expense ratio?")
+        second = generator.generate_answer("Expense ratio?")
+        
+        mock_llm.generate.assert_called_once()
+        assert second['answer'] == first['answer']
+        assert second['question'] == "Expense ratio?"
+        assert second['cached'] is True
+        assert cache.hit_rate() == 0.5
+    
+    def test_answer_cache_not_filled_on_error(self, mock_retriever, mock_llm):
+        """Test failed generations aren't cached."""
+        mock_retriever.embed_query.return_value = [1.0, 0.0]
+        mock_retriever.index_version = "v1"
+        mock_llm.generate.side_effect = Exception("API Error")
+        cache = SemanticAnswerCache()
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm, answer_cache=cache)
+        
+        generator.generate_answer("Test?")
+        
+        assert len(cache) == 0
+    
+    def test_answer_cache_invalidated_on_reload(self, mock_retriever, mock_llm):
+        """Test a hot reload of the index clears answers from the old version."""
+        cache = SemanticAnswerCache()
+        cache.put([1.0], ["chunk"], {"answer": "old"}, index_version="v1")
+        AnswerGenerator(retriever=mock_retriever, llm=mock_llm, answer_cache=cache)
+        
+        listener = mock_retriever.vector_store.add_reload_listener.call_args[0][0]
+        listener("v1", "v2")
+        
+        assert len(cache) == 0
+    
+    def test_agenerate_answer_success(self, mock_retriever, mock_llm):
+        """Test the async path retrieves off the event loop and awaits the LLM."""
+        mock_retriever.aretrieve_and_format = AsyncMock(return_value=mock_retriever.retrieve_and_format.return_value)
+        mock_llm.agenerate = AsyncMock(return_value="Async answer [Source 1]")
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        
+        result = asyncio.run(generator.agenerate_answer("Test question?", temperature=0.5))
+        
+        assert result['answer'] == "Async answer [Source 1]"
+        assert result['retrieved_docs'] == 1
+        mock_retriever.aretrieve_and_format.assert_awaited_once_with("Test question?", k=3)
+        mock_llm.agenerate.assert_awaited_once_with("Test prompt", temperature=0.5, deadline=None)
+        mock_llm.generate.assert_not_called()
+    
+    def test_agenerate_answer_llm_error(self, mock_retriever, mock_llm):
+        """Test async LLM errors are returned in the result like sync ones."""
+        mock_retriever.aretrieve_and_format = AsyncMock(return_value=mock_retriever.retrieve_and_format.return_value)
+        mock_llm.agenerate = AsyncMock(side_effect=Exception("API Error"))
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        
+        result = asyncio.run(generator.agenerate_answer("Test question?"))
+        
+        assert result['error'] == "API Error"
+        assert "Error generating answer" in result['answer']
+    
+    def test_agenerate_answer_concurrent(self, mock_retriever, mock_llm):
+        """Test concurrent questions wait on the LLM together rather than in turn."""
+        mock_retriever.aretrieve_and_format = AsyncMock(return_value=mock_retriever.retrieve_and_format.return_value)
+        in_flight = {"now": 0, "max": 0}
+        
+        async def agenerate(prompt, temperature=None, deadline=None):
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            await asyncio.sleep(0.01)
+            in_flight["now"] -= 1
+            return "Answer"
+        
+        mock_llm.agenerate = agenerate
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        
+        async def run():
+            return await asyncio.gather(*(generator.agenerate_answer(f"Question {i}?") for i in range(5)))
+        
+        results = asyncio.run(run())
+        
+        assert [r['question'] for r in results] == [f"Question {i}?" for i in range(5)]
+        assert in_flight["max"] == 5
+    
+    def test_identical_concurrent_questions_coalesced(self, mock_retriever, mock_llm):
+        """Test duplicate questions in flight share one retrieval and one LLM call."""
+        def slow_generate(prompt, temperature=None, deadline=None):
+            time.sleep(0.1)
+            return "Shared answer"
+        
+        mock_llm.generate.side_effect = slow_generate
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        questions = ["What is the exit load?", "what is  the exit load?", "WHAT IS THE EXIT LOAD?"]
+        results = [None] * len(questions)
+        barrier = threading.Barrier(len(questions))
+        
+        def ask(i):
+            barrier.wait()
+            results[i] = generator.generate_answer(questions[i])
+        
+        threads = [threading.Thread(target=ask, args=(i,)) for i in range(len(questions))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert mock_retriever.retrieve_and_format.call_count == 1
+        assert mock_llm.generate.call_count == 1
+        assert [r['answer'] for r in results] == ["Shared answer"] * 3
+        assert [r['question'] for r in results] == questions
+        assert sum(bool(r.get('coalesced')) for r in results) == 2
+    
+    def test_questions_with_different_k_not_coalesced(self, mock_retriever, mock_llm):
+        """Test the single-flight key includes k and temperature."""
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        
+        assert generator._flight_key("Test question?", None, None) == generator._flight_key(" test QUESTION? ", 3, None)
+        assert generator._flight_key("Test question?", 5, None) != generator._flight_key("Test question?", 3, None)
+        assert generator._flight_key("Test question?", 3, 0.1) != generator._flight_key("Test question?", 3, 0.5)
+    
+    def test_stream_follower_shares_answer(self, mock_retriever, mock_llm):
+        """Test a stream asking a question already in flight gets that answer in one token."""
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        key = generator._flight_key("Test question?", None, None)
+        flight, _ = generator.single_flight.begin(key)
+        leader_result = {"question": "Test question?", "answer": "Shared answer",
+                         "sources": [{"url": "https://test.com"}], "retrieved_docs": 1}
+        threading.Timer(0.05, generator.single_flight.finish, args=(key, flight, leader_result)).start()
+        
+        events = list(generator.generate_answer_stream("test question?"))
+        
+        assert [e['type'] for e in events] == ["sources", "token", "done"]
+        assert events[1]['text'] == "Shared answer"
+        assert events[-1]['result']['coalesced'] is True
+        assert events[-1]['result']['question'] == "test question?"
+        mock_retriever.retrieve_and_format.assert_not_called()
+        mock_llm.generate_stream.assert_not_called()
+    
+    def test_stream_follower_relays_tokens_as_they_arrive(self, mock_retriever, mock_llm):
+        """Test a stream following another stream sees each token before the leader finishes."""
+        release = threading.Event()
+        
+        def generate_stream(prompt, temperature=None, deadline=None):
+            yield "Generated "
+            release.wait(5)
+            yield "answer"
+        
+        mock_llm.generate_stream.side_effect = generate_stream
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        leader_events = []
+        leader = threading.Thread(target=lambda: leader_events.extend(generator.generate_answer_stream("Test question?")))
+        leader.start()
+        while generator.single_flight.in_flight() == 0:
+            time.sleep(0.001)
+        
+        follower_events = []
+        for event in generator.generate_answer_stream("test question?"):
+            follower_events.append(event)
+            if event["type"] == "token":
+                # The first token arrives while the leader is still generating
+                release.set()
+        leader.join(5)
+        
+        assert [e['type'] for e in follower_events] == ["sources", "token", "token", "done"]
+        assert [e['text'] for e in follower_events if e['type'] == "token"] == ["Generated ", "answer"]
+        assert follower_events[-1]['result']['coalesced'] is True
+        assert follower_events[-1]['result']['answer'] == leader_events[-1]['result']['answer']
+        mock_llm.generate_stream.assert_called_once()
+    
+    def test_stream_follower_of_interrupted_leader(self, mock_retriever, mock_llm):
+        """Test a follower that already relayed tokens ends with an error rather than a second answer."""
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        key = generator._flight_key("Test question?", None, None)
+        flight, _ = generator.single_flight.begin(key)
+        flight.publish({"type": "sources", "sources": [{"url": "https://test.com"}]})
+        flight.publish({"type": "token", "text": "Partial "})
+        threading.Timer(0.05, generator.single_flight.finish, args=(key, flight, None, GeneratorExit())).start()
+        
+        events = list(generator.generate_answer_stream("Test question?"))
+        
+        assert [e['type'] for e in events] == ["sources", "token", "token", "done"]
+        assert 'interrupted' in events[2]['text']
+        assert 'error' in events[-1]['result']
+        mock_llm.generate_stream.assert_not_called()
+    
+    def test_abandoned_stream_releases_followers(self, mock_retriever, mock_llm):
+        """Test a stream closed before its answer is done lets waiting callers answer themselves."""
+        mock_llm.generate_stream.return_value = iter(["Generated ", "answer"])
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        
+        stream = generator.generate_answer_stream("Test question?")
+        next(stream)
+        stream.close()
+        
+        assert generator.single_flight.in_flight() == 0
+        assert generator.generate_answer("Test question?")['answer'] == "Generated answer with [Source 1] citation"
+    
+    def test_agenerate_answer_coalesced(self, mock_retriever, mock_llm):
+        """Test duplicate async questions share one LLM call."""
+        mock_retriever.aretrieve_and_format = AsyncMock(return_value=mock_retriever.retrieve_and_format.return_value)
+        
+        async def agenerate(prompt, temperature=None, deadline=None):
+            await asyncio.sleep(0.05)
+            return "Shared answer"
+        
+        mock_llm.agenerate = Mock(side_effect=agenerate)
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        
+        async def run():
+            return await asyncio.gather(*(generator.agenerate_answer("Test question?") for _ in range(3)))
+        
+        results = asyncio.run(run())
+        
+        assert mock_llm.agenerate.call_count == 1
+        assert [r['answer'] for r in results] == ["Shared answer"] * 3
+    
+    def test_many_async_followers_take_no_threads(self, mock_retriever, mock_llm):
+        """Test 40 identical async questions share one answer without a thread per waiting follower."""
+        mock_retriever.aretrieve_and_format = AsyncMock(return_value=mock_retriever.retrieve_and_format.return_value)
+        threads = []
+        
+        async def agenerate(prompt, temperature=None, deadline=None):
+            await asyncio.sleep(0.05)
+            threads.append(threading.active_count())
+            return "Shared answer"
+        
+        mock_llm.agenerate = Mock(side_effect=agenerate)
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        threads_before = threading.active_count()
+        
+        async def run():
+            return await asyncio.gather(*(generator.agenerate_answer("Test question?") for _ in range(40)))
+        
+        results = asyncio.run(asyncio.wait_for(run(), 5))
+        
+        assert mock_llm.agenerate.call_count == 1
+        assert [r['answer'] for r in results] == ["Shared answer"] * 40
+        assert sum(bool(r.get('coalesced')) for r in results) == 39
+        assert threads == [threads_before]
+    
+    def test_generate_answer_stream(self, mock_retriever, mock_llm):
+        """Test sources come first, then tokens, then the full result."""
+        mock_llm.generate_stream.return_value = iter(["Generated ", "answer"])
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        
+        events = list(generator.generate_answer_stream("Test question?", temperature=0.5))
+        
+        assert [e['type'] for e in events] == ["sources", "token", "token", "done"]
+        assert events[0]['sources'][0]['url'] == "https://test.com"
+        assert events[-1]['result']['answer'] == "Generated answer"
+        assert events[-1]['result']['retrieved_docs'] == 1
+        mock_llm.generate_stream.assert_called_once_with("Test prompt", temperature=0.5, deadline=None)
+    
+    def test_generate_answer_stream_error(self, mock_retriever, mock_llm):
+        """Test an LLM failure mid-stream ends with an error result."""
+        def failing_stream(prompt, temperature=None, deadline=None):
+            yield "Partial "
+            raise RuntimeError("API Error")
+        
+        mock_llm.generate_stream.side_effect = failing_stream
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        
+        events = list(generator.generate_answer_stream("Test question?"))
+        
+        assert events[-1]['type'] == "done"
+        assert events[-1]['result']['error'] == "API Error"
+        assert events[-2]['text'] == "\n\nError generating answer: API Error"
+    
+    def test_generate_answer_stream_error_before_first_token(self, mock_retriever, mock_llm):
+        """Test a non-retryable failure before any token still streams the error answer."""
+        mock_llm.generate_stream.side_effect = RuntimeError("Invalid API key")
+        generator = AnswerGenerator(retriever=mock_retriever, llm=mock_llm)
+        
+        events = list(generator.generate_answer_stream("Test question?"))
+        
+        assert [e['type'] for e in events] == ["sources", "token", "done"]
+        assert events[1]['text'] == "Error generating answer: Invalid API key"
+        assert events[-1]['result']['error'] == "Invalid API key"
+        assert 'fallback' not in events[-1]['result']
+    
+    def test_generate_answer_stream_uses_answer_cache(self, mock_retriever, mock_llm):
+        """Test a streamed answer is cached and a paraphrase is streamed from the cache."""
+        mock_retriever.embed_query.side_effect = [[1.0, 0.0], [0.99, 0.05]]
+        mock_retriever.index_version = "v1"
+        mock_llm.generate_stream.return_value = iter(["Cached ", "answer"])
+        generator = AnswerGenerator(
+            retriever=mock_retriever, llm=mock_llm, answer_cache=SemanticAnswerCache(threshold=0.9)
+        )
+        
+        list(generator.generate_answer_stream("What is the exit load?"))
+        events = list(generator.generate_answer_stream("Exit load?"))
+        
+        mock_llm.generate_stream.assert_called_once()
+        assert [e['type'] for e in events] == ["sources", "token", "done"]
+        assert events[1]['text'] == "Cached answer"
+        assert events[-1]['result']['cached'] is True
+    
     @patch('src.answer_generator.Retriever')
-    @patch('src.answer_generator.LLM')
+    @patch('src.answer_generator.get_llm')
     def test_get_answer_generator(self, mock_llm_class, mock_retriever_class):
         """Test get_answer_generator helper function."""
         generator = get_answer_generator(k=5)
         
         assert isinstance(generator, AnswerGenerator)
         assert generator.k == 5
+    
+    @patch('src.answer_generator.Retriever')
+    @patch('src.answer_generator.get_llm')
+    def test_get_answer_generator_shares_answer_cache(self, mock_llm_class, mock_retriever_class):
+        """Test every generator (one per Streamlit session) uses one process-wide answer cache."""
+        with patch.dict(os.environ, {"ANSWER_CACHE": "1"}):
+            first = get_answer_generator()
+            second = get_answer_generator()
+        
+        assert first.answer_cache is not None
+        assert first.answer_cache is second.answer_cache
 
 
 if __name__ == "__main__":
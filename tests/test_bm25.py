@@ -0,0 +1,82 @@
+"""
+Unit tests for bm25.py module.
+Tests tokenization, BM25 ranking, filtering and persistence.
+"""
+import os
+import sys
+import time
+import pytest
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.bm25 import BM25Index, tokenize
+
+
+CHUNKS = [
+    "The TER of the scheme is 1.05% for the direct plan",
+    "Exit load 1% if redeemed within 1 year",
+    "Benchmark: NIFTY 500 TRI",
+    "Minimum SIP amount is Rs. 100",
+]
+
+
+class TestBM25Index:
+    """Test suite for BM25Index class."""
+
+    @pytest.fixture
+    def index(self):
+        """Index the sample chunks."""
+        return BM25Index.build(CHUNKS)
+
+    def test_tokenize_keeps_numbers_and_percentages(self):
+        """Test percentages, decimals and codes survive tokenization."""
+        assert tokenize("TER 1.05%, ISIN INF179K01BE2") == ["ter", "1.05%", "isin", "inf179k01be2"]
+
+    def test_exact_terms_rank_first(self, index):
+        """Test chunks containing the rare query terms rank first."""
+        assert index.search("What is the TER?", k=1)[0][0] == 0
+        assert index.search("NIFTY 500 TRI benchmark", k=1)[0][0] == 2
+        assert index.search("exit load 1%", k=1)[0][0] == 1
+
+    def test_only_matching_chunks_returned(self, index):
+        """Test chunks without any query term are left out."""
+        assert index.search("riskometer", k=3) == []
+
+    def test_rows_filter(self, index):
+        """Test search is limited to the given rows."""
+        hits = index.search("1%", k=4, rows=np.array([0, 2, 3]))
+
+        assert [row for row, _ in hits] == []
+        assert [row for row, _ in index.search("the", k=4, rows=np.array([0, 2]))] == [0]
+
+    def test_save_and_load(self, index, tmp_path):
+        """Test a reloaded index returns the same scores."""
+        index.save(str(tmp_path))
+
+        assert BM25Index.exists(str(tmp_path))
+        loaded = BM25Index.load(str(tmp_path))
+        assert np.allclose(loaded.scores("exit load 1%"), index.scores("exit load 1%"))
+
+    def test_empty_index(self, tmp_path):
+        """Test an empty index can be built, saved and searched."""
+        index = BM25Index.build([])
+        index.save(str(tmp_path))
+
+        assert BM25Index.load(str(tmp_path)).search("ter", k=3) == []
+
+    def test_scores_thousands_of_chunks_quickly(self):
+        """Test a query over 5000 chunks takes well under a millisecond."""
+        rng = np.random.default_rng(0)
+        words = [f"w{i}" for i in range(2000)]
+        index = BM25Index.build(" ".join(rng.choice(words, 150)) for _ in range(5000))
+
+        start = time.perf_counter()
+        for _ in range(100):
+            index.search("w1 w2 w3 exit load", k=10)
+        assert (time.perf_counter() - start) / 100 < 0.001
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -93,6 +93,13 @@ def test_chatbot():
     failed_tests = 0
     results = []
     
+    # Answer every question routed to the RAG pipeline up front, as one concurrent batch
+    rag_questions = [
+        question for prompts in TEST_PROMPTS.values() for question in prompts
+        if question and not guardrails.is_greeting(question) and not guardrails.is_advice_seeking(question)
+    ]
+    rag_answers = dict(zip(rag_questions, answer_generator.answer_questions(rag_questions)))
+    
     # Run tests
     for category, prompts in TEST_PROMPTS.items():
         print_separator("-")
@@ -122,7 +129,7 @@ def test_chatbot():
                     _, response = guardrails.check_and_respond(question)
                     route = "ADVICE_BLOCKED"
                 else:
-                    response = answer_generator.generate_answer(question)
+                    response = rag_answers[question]
                     route = "RAG_PIPELINE"
                 
                 # Check response
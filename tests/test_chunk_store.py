@@ -0,0 +1,83 @@
+"""
+Unit tests for chunk_store.py module.
+Tests writing, memory-mapped lookups and in-memory edits of the chunk store.
+"""
+import os
+import sys
+import pytest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.chunk_store import ChunkStore
+from langchain_core.documents import Document
+
+
+def make_chunks(count):
+    """Create (id, Document) pairs with distinct text and metadata."""
+    return [
+        (f"chunk-{i}", Document(page_content=f"Exit load ₹{i} — row {i}", metadata={"source": f"u{i}", "page": i}))
+        for i in range(count)
+    ]
+
+
+class TestChunkStore:
+    """Test suite for ChunkStore class."""
+
+    @pytest.fixture
+    def store_path(self, tmp_path):
+        """Write a three-chunk store and return its directory."""
+        path = str(tmp_path / "v1")
+        assert ChunkStore.write(path, make_chunks(3)) == 3
+        return path
+
+    def test_roundtrip(self, store_path):
+        """Test stored chunks decode back to the same text, metadata and ID."""
+        store = ChunkStore(store_path)
+
+        doc = store.search("chunk-1")
+
+        assert store.ids == ["chunk-0", "chunk-1", "chunk-2"]
+        assert doc.id == "chunk-1"
+        assert doc.page_content == "Exit load ₹1 — row 1"
+        assert doc.metadata == {"source": "u1", "page": 1}
+        assert len(store) == 3
+
+    def test_exists(self, store_path, tmp_path):
+        """Test a directory without chunk files isn't mistaken for a store."""
+        assert ChunkStore.exists(store_path)
+        assert not ChunkStore.exists(str(tmp_path))
+
+    def test_missing_id(self, store_path):
+        """Test unknown IDs return a message instead of a Document."""
+        assert not isinstance(ChunkStore(store_path).search("nope"), Document)
+
+    def test_add_and_delete_in_memory(self, store_path):
+        """Test edits overlay the mapped files without modifying them."""
+        store = ChunkStore(store_path)
+        store.add({"chunk-9": Document(page_content="new", metadata={})})
+        store.delete(["chunk-0", "chunk-9"])
+
+        assert not isinstance(store.search("chunk-0"), Document)
+        assert "chunk-9" not in store
+        assert len(store) == 2
+        assert ChunkStore(store_path).search("chunk-0").page_content == "Exit load ₹0 — row 0"
+
+    def test_add_existing_id_raises(self, store_path):
+        """Test adding an ID that is already stored is rejected."""
+        with pytest.raises(ValueError):
+            ChunkStore(store_path).add({"chunk-0": Document(page_content="dup")})
+
+    def test_empty_store(self, tmp_path):
+        """Test an empty store can be written and opened."""
+        path = str(tmp_path / "empty")
+        ChunkStore.write(path, [])
+
+        store = ChunkStore(path)
+
+        assert len(store) == 0
+        assert store.ids == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
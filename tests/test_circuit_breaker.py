@@ -0,0 +1,104 @@
+"""
+Unit tests for circuit_breaker.py module.
+Tests the closed / open / half-open transitions.
+"""
+import os
+import sys
+import time
+import pytest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.circuit_breaker import CircuitBreaker, get_circuit_breaker
+
+
+class TestCircuitBreaker:
+    """Test suite for CircuitBreaker class."""
+
+    def test_opens_after_consecutive_failures(self):
+        """Test the circuit opens at the failure threshold and then short-circuits calls."""
+        breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60)
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.allow()
+
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow()
+        assert breaker.stats == {"opened": 1, "short_circuited": 1}
+        assert 59 < breaker.retry_in() <= 60
+
+    def test_success_resets_failure_count(self):
+        """Test failures must be consecutive to open the circuit."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_after_reset_then_closes_on_success(self):
+        """Test trial calls are allowed after the cool-down and a success closes the circuit."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.02)
+        breaker.record_failure()
+        time.sleep(0.03)
+
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_allows_a_single_trial(self):
+        """Test half-open lets one trial through and short-circuits the rest until it resolves."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+
+        assert breaker.allow()
+        assert not breaker.allow()
+        assert not breaker.allow()
+        assert breaker.stats["short_circuited"] == 2
+        assert 0 < breaker.retry_in() <= 0.05
+
+        # A trial that ends without a verdict lets the next caller try
+        breaker.release_trial()
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.allow() and breaker.allow()
+
+    def test_unreported_trial_expires(self):
+        """Test a trial that never reports back doesn't keep the circuit shut forever."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.02)
+        breaker.record_failure()
+        time.sleep(0.03)
+        assert breaker.allow()
+        assert not breaker.allow()
+
+        time.sleep(0.03)
+
+        assert breaker.allow()
+
+    def test_failed_trial_reopens(self):
+        """Test a failure while half-open opens the circuit again at once."""
+        breaker = CircuitBreaker(failure_threshold=5, reset_seconds=0.02)
+        for _ in range(5):
+            breaker.record_failure()
+        time.sleep(0.03)
+
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.stats["opened"] == 2
+
+    def test_shared_per_provider_and_model(self):
+        """Test one breaker is shared by every caller of a provider/model."""
+        breaker = get_circuit_breaker("test-provider", "model-a")
+
+        assert get_circuit_breaker("test-provider", "model-a") is breaker
+        assert get_circuit_breaker("test-provider", "model-b") is not breaker
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,46 @@
+"""
+Unit tests for cli.py module.
+Tests how streamed answers are printed in the terminal.
+"""
+import os
+import sys
+from unittest.mock import Mock
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.cli import stream_response
+
+
+class TestStreamResponse:
+    """Test suite for stream_response."""
+
+    def test_prints_streamed_tokens(self, capsys):
+        """Test tokens are printed as they arrive, followed by the sources."""
+        generator = Mock()
+        result = {"answer": "Hello world", "sources": [{"title": "Doc", "url": "https://test.com"}]}
+        generator.generate_answer_stream.return_value = iter([
+            {"type": "sources", "sources": result["sources"]},
+            {"type": "token", "text": "Hello "},
+            {"type": "token", "text": "world"},
+            {"type": "done", "result": result},
+        ])
+
+        assert stream_response(generator, "Question?", Mock()) is result
+
+        out = capsys.readouterr().out
+        assert out.count("Hello world") == 1
+        assert "SOURCES (1)" in out
+
+    def test_prints_answer_when_nothing_streamed(self, capsys):
+        """Test an answer that arrives only in the final result is still shown."""
+        generator = Mock()
+        result = {"answer": "Error generating answer: Invalid API key", "sources": [], "error": "Invalid API key"}
+        generator.generate_answer_stream.return_value = iter([
+            {"type": "sources", "sources": []},
+            {"type": "done", "result": result},
+        ])
+
+        stream_response(generator, "Question?", Mock())
+
+        assert "Error generating answer: Invalid API key" in capsys.readouterr().out
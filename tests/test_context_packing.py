@@ -0,0 +1,99 @@
+"""
+Unit tests for context_packing.py module.
+Tests chunk merging, near-duplicate removal and the token budget.
+"""
+import os
+import sys
+import pytest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.context_packing import ContextPacker, count_tokens, overlap_length
+from langchain_core.documents import Document
+
+
+def chunk(source, position, text, chunk_id=True):
+    """Create a chunk with an ID recording its position in the source."""
+    return Document(
+        id=f"{source}-0123456789ab-{position:05d}" if chunk_id else None,
+        page_content=text,
+        metadata={"source": source, "scheme": "HDFC Flexi Cap Fund"}
+    )
+
+
+class TestContextPacker:
+    """Test suite for ContextPacker class."""
+
+    def test_overlap_length(self):
+        """Test the repeated text between consecutive chunks is found."""
+        assert overlap_length("exit load is 1% within a year", "within a year of allotment") == len("within a year")
+        assert overlap_length("abc", "xyz") == 0
+
+    def test_merges_adjacent_chunks_without_repeating_overlap(self):
+        """Test consecutive chunks of one source become one passage."""
+        first = chunk("kim.pdf", 3, "Exit load: 1% if redeemed within 1 year from allotment.")
+        second = chunk("kim.pdf", 4, "within 1 year from allotment. No exit load after 1 year.")
+
+        passages = ContextPacker(max_tokens=500).pack([(second, 0.9), (first, 0.7)])
+
+        assert len(passages) == 1
+        assert passages[0]["text"] == (
+            "Exit load: 1% if redeemed within 1 year from allotment. No exit load after 1 year."
+        )
+        assert passages[0]["score"] == 0.9
+
+    def test_merges_overlapping_chunks_without_ids(self):
+        """Test overlapping text merges chunks even without position IDs."""
+        first = chunk("page", 0, "The minimum SIP amount is Rs. 100 per instalment", chunk_id=False)
+        second = chunk("page", 1, "SIP amount is Rs. 100 per instalment for all plans", chunk_id=False)
+
+        passages = ContextPacker(max_tokens=500).pack([(first, 0.8), (second, 0.6)])
+
+        assert [p["text"] for p in passages] == ["The minimum SIP amount is Rs. 100 per instalment for all plans"]
+
+    def test_keeps_distant_chunks_separate(self):
+        """Test non-adjacent chunks of one source stay separate passages in relevance order."""
+        far = chunk("sid.pdf", 10, "Benchmark is NIFTY 500 TRI.")
+        near = chunk("sid.pdf", 2, "Riskometer shows very high risk.")
+
+        passages = ContextPacker(max_tokens=500).pack([(far, 0.9), (near, 0.5)])
+
+        assert [p["text"] for p in passages] == ["Benchmark is NIFTY 500 TRI.", "Riskometer shows very high risk."]
+
+    def test_drops_near_duplicates(self):
+        """Test the same passage from another source is dropped."""
+        text = "The expense ratio of the direct plan is 0.75% per annum as of November."
+        original = chunk("kim.pdf", 1, text)
+        copy = chunk("factsheet.pdf", 7, text + " Source: AMC.")
+
+        passages = ContextPacker(max_tokens=500).pack([(original, 0.9), (copy, 0.8)])
+
+        assert [p["doc"].metadata["source"] for p in passages] == ["kim.pdf"]
+
+    def test_respects_token_budget(self):
+        """Test passages stop at the budget and the last one is truncated to fit."""
+        results = [
+            (chunk(f"source-{i}", 0, " ".join(f"fact{i}x{j}" for j in range(100))), 1.0 - i / 10)
+            for i in range(3)
+        ]
+        budget = count_tokens(results[0][0].page_content) + 60
+
+        passages = ContextPacker(max_tokens=budget, min_tokens=50).pack(results)
+
+        assert len(passages) == 2
+        assert sum(p["tokens"] for p in passages) <= budget
+        assert results[1][0].page_content.startswith(passages[1]["text"])
+
+    def test_skips_remainder_too_small_to_use(self):
+        """Test a tiny leftover budget isn't filled with a fragment."""
+        results = [(chunk("a", 0, "word " * 100), 0.9), (chunk("b", 0, "other " * 100), 0.8)]
+        budget = count_tokens(results[0][0].page_content) + 5
+
+        passages = ContextPacker(max_tokens=budget, min_tokens=50).pack(results)
+
+        assert len(passages) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -4,6 +4,9 @@ Tests document loading, chunking, and metadata handling.
 """
 import os
 import sys
+import time
+import threading
+import multiprocessing
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from io import BytesIO
@@ -11,7 +14,30 @@ from io import BytesIO
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.data_loader import DataLoader
+from src.data_loader import DataLoader, extract_pdf_pages
+
+
+def make_pdf(page_texts):
+    """Build a minimal PDF with one line of text per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(len(page_texts)))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(page_texts)} >>")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for i, text in enumerate(page_texts):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {5 + 2 * i} 0 R /Resources << /Font << /F1 3 0 R >> >> >>")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for n, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{n} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for off in offsets:
+        out += f"{off:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
 
 
 class TestDataLoader:
@@ -88,6 +114,75 @@ Scheme1,https://example.com,Test,2026-02-10"""
         
         assert content == ""
     
+    def test_extract_pdf_pages(self):
+        """Test page-by-page PDF extraction."""
+        result = extract_pdf_pages(make_pdf(["Page one", "Page two"]))
+        
+        assert result["text"] == "Page one\nPage two\n"
+        assert result["pages"] == 2
+        assert not result["truncated"]
+    
+    def test_extract_pdf_pages_page_limit(self):
+        """Test extraction stops at the page limit."""
+        result = extract_pdf_pages(make_pdf(["One", "Two", "Three"]), max_pages=2)
+        
+        assert "Three" not in result["text"]
+        assert result["pages"] == 2
+        assert result["total_pages"] == 3
+        assert result["truncated"]
+    
+    def test_extract_pdf_pages_deadline(self):
+        """Test extraction stops once the time budget is spent."""
+        result = extract_pdf_pages(make_pdf(["One", "Two"]), deadline_seconds=-1)
+        
+        assert result["pages"] == 0
+        assert result["truncated"]
+    
+    def test_extract_pdf_text_in_process_pool(self):
+        """Test PDF extraction in worker processes matches in-thread extraction."""
+        content = make_pdf(["Exit load 1%", "Lock-in 3 years"])
+        loader = DataLoader(pdf_workers=2)
+        try:
+            text = loader.extract_pdf_text(content, "https://example.com/kim.pdf")
+        finally:
+            loader.close()
+        
+        assert text == DataLoader().extract_pdf_text(content)
+    
+    @pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="patch must reach the worker via fork")
+    def test_pdf_timeout_only_fails_its_own_document(self):
+        """Test a hung PDF is killed alone and a PDF queued behind it still gets its full budget."""
+        content = make_pdf(["Exit load 1%"])
+        real_extract = extract_pdf_pages
+        
+        def extract(data, *args):
+            if data == b"hang":
+                time.sleep(30)
+            return real_extract(data, *args)
+        
+        loader = DataLoader(pdf_workers=1)
+        loader.pdf_timeout, loader.pdf_grace_seconds = 0.5, 0.0
+        outcomes = {}
+        
+        def run(name, data):
+            try:
+                outcomes[name] = loader.extract_pdf_text(data)
+            except Exception as e:
+                outcomes[name] = e
+        
+        with patch('src.data_loader.extract_pdf_pages', side_effect=extract):
+            hung = threading.Thread(target=run, args=("hung", b"hang"))
+            hung.start()
+            time.sleep(0.1)
+            queued = threading.Thread(target=run, args=("queued", content))
+            queued.start()
+            hung.join()
+            queued.join()
+        loader.close()
+        
+        assert isinstance(outcomes["hung"], TimeoutError)
+        assert "Exit load 1%" in outcomes["queued"]
+    
     @patch('src.data_loader.requests.get')
     def test_fetch_html_content_success(self, mock_get, data_loader):
         """Test successful HTML content extraction."""
@@ -227,6 +322,171 @@ Scheme1,https://example.com,Test,2026-02-10"""
         
         assert len(docs) == 2  # 2 URLs, each returning 1 doc
         assert mock_process_url.call_count == 2
+    
+    @patch.object(DataLoader, 'fetch_raw')
+    def test_fetch_source_changed(self, mock_fetch_raw, data_loader):
+        """Test a changed source is split into chunks with deterministic IDs."""
+        mock_fetch_raw.return_value = b"<html><body>New content</body></html>"
+        row = {'url': 'https://example.com/page', 'scheme': 'S', 'description': 'D'}
+        
+        result = data_loader.fetch_source(row, known_hash="old-hash")
+        again = data_loader.fetch_source(row, known_hash="old-hash")
+        
+        assert result["content_hash"] is not None
+        assert len(result["docs"]) == 1
+        assert "New content" in result["docs"][0].page_content
+        assert result["docs"][0].id == again["docs"][0].id
+    
+    @patch.object(DataLoader, 'extract_html_text')
+    @patch.object(DataLoader, 'fetch_raw')
+    def test_fetch_source_unchanged_skips_extraction(self, mock_fetch_raw, mock_extract, data_loader):
+        """Test an unchanged source is not re-extracted or re-split."""
+        mock_fetch_raw.return_value = b"<html>same</html>"
+        row = {'url': 'https://example.com/page', 'scheme': 'S', 'description': 'D'}
+        known_hash = data_loader.content_hash(row, b"<html>same</html>")
+        
+        result = data_loader.fetch_source(row, known_hash=known_hash)
+        
+        assert result["content_hash"] == known_hash
+        assert result["docs"] is None
+        mock_extract.assert_not_called()
+    
+    @patch.object(DataLoader, 'extract_pdf_text')
+    @patch.object(DataLoader, 'fetch_raw')
+    def test_fetch_source_extraction_error_counts_as_failed(self, mock_fetch_raw, mock_extract, data_loader):
+        """Test a source whose extraction fails is reported like a failed download, not as empty."""
+        mock_fetch_raw.return_value = b"%PDF-1.4 broken"
+        mock_extract.side_effect = TimeoutError("PDF extraction exceeded 120s")
+        row = {'url': 'https://example.com/sid.pdf', 'scheme': 'S', 'description': 'D'}
+        
+        result = data_loader.fetch_source(row, known_hash="old-hash")
+        
+        assert result["content_hash"] is None
+        assert result["docs"] is None
+    
+    def test_content_hash_depends_on_chunking(self, data_loader):
+        """Test that changing chunk parameters changes the content hash."""
+        row = {'url': 'u', 'scheme': 'S', 'description': 'D'}
+        before = data_loader.content_hash(row, b"raw")
+        data_loader.chunk_size = 500
+        
+        assert data_loader.content_hash(row, b"raw") != before
+    
+    def test_fetch_uses_cache_when_configured(self):
+        """Test that downloads go through the HTTP cache if one is set."""
+        mock_cache = Mock()
+        mock_cache.get.return_value = Mock(content=b"<html><body>Cached page</body></html>")
+        loader = DataLoader(cache=mock_cache)
+        
+        with patch('src.data_loader.requests.get') as mock_get:
+            content = loader.fetch_html_content("https://example.com/page")
+        
+        assert "Cached page" in content
+        mock_cache.get.assert_called_once()
+        mock_get.assert_not_called()
+    
+    @patch.object(DataLoader, 'load_urls')
+    def test_load_and_process_all_preserves_order(self, mock_load_urls, data_loader):
+        """Test concurrent processing returns chunks in CSV order."""
+        import time
+        import pandas as pd
+        from langchain_core.documents import Document
+        
+        mock_load_urls.return_value = pd.DataFrame([
+            {'url': f'https://example.com/{i}', 'scheme': f'S{i}', 'description': 'D'}
+            for i in range(6)
+        ])
+        
+        def slow_first(row):
+            # Earlier rows finish last
+            time.sleep(0.01 * (6 - int(row['url'].rsplit('/', 1)[1])))
+            return [Document(page_content=row['url'], metadata={"source": row['url']})]
+        
+        with patch.object(DataLoader, 'process_url', side_effect=slow_first):
+            docs = data_loader.load_and_process_all(max_workers=6)
+        
+        assert [d.page_content for d in docs] == [f'https://example.com/{i}' for i in range(6)]
+        assert [t['url'] for t in data_loader.timings] == [d.page_content for d in docs]
+        assert all(t['total_seconds'] >= 0 and t['chunks'] == 1 for t in data_loader.timings)
+    
+    @patch.object(DataLoader, 'load_urls')
+    def test_iter_sources_bounds_prefetch(self, mock_load_urls, data_loader):
+        """Test streaming stays at most `prefetch` sources ahead of the consumer."""
+        import threading
+        import time
+        import pandas as pd
+        
+        mock_load_urls.return_value = pd.DataFrame([
+            {'url': f'https://example.com/{i}', 'scheme': 'S', 'description': 'D'}
+            for i in range(10)
+        ])
+        started = []
+        lock = threading.Lock()
+        
+        def fake_fetch_source(row, known_hash=None):
+            with lock:
+                started.append(row['url'])
+            return {"url": row['url'], "content_hash": "h", "docs": []}
+        
+        with patch.object(DataLoader, 'fetch_source', side_effect=fake_fetch_source):
+            stream = data_loader.iter_sources(max_workers=4, prefetch=3)
+            first = next(stream)
+            time.sleep(0.05)
+            started_after_first = len(started)
+            rest = list(stream)
+        
+        assert first["url"] == 'https://example.com/0'
+        assert started_after_first <= 4  # 3 in the window + 1 refill
+        assert [r["url"] for r in rest] == [f'https://example.com/{i}' for i in range(1, 10)]
+    
+    @patch.object(DataLoader, 'load_urls')
+    def test_iter_sources_flushes_cache_once(self, mock_load_urls):
+        """Test the HTTP cache index is written once, after the last source."""
+        import pandas as pd
+        
+        mock_load_urls.return_value = pd.DataFrame([
+            {'url': f'https://example.com/{i}', 'scheme': 'S', 'description': 'D'}
+            for i in range(5)
+        ])
+        cache = Mock()
+        loader = DataLoader(cache=cache)
+        
+        with patch.object(DataLoader, 'fetch_source',
+                          side_effect=lambda row, known_hash=None: {"url": row['url'], "content_hash": "h", "docs": []}):
+            stream = loader.iter_sources(max_workers=2)
+            next(stream)
+            cache.flush.assert_not_called()
+            list(stream)
+        
+        cache.flush.assert_called_once()
+    
+    @patch('src.data_loader.requests.get')
+    def test_per_host_concurrency_limit(self, mock_get):
+        """Test that requests to one host never exceed max_per_host."""
+        import threading
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        
+        loader = DataLoader(max_per_host=2)
+        active = {"now": 0, "peak": 0}
+        lock = threading.Lock()
+        
+        def fake_get(url, **kwargs):
+            with lock:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+            time.sleep(0.02)
+            with lock:
+                active["now"] -= 1
+            return Mock()
+        
+        mock_get.side_effect = fake_get
+        
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            list(executor.map(loader._get, [f"https://example.com/{i}" for i in range(6)]))
+        
+        assert active["peak"] <= 2
+        assert mock_get.call_count == 6
 
 
 if __name__ == "__main__":
@@ -0,0 +1,206 @@
+"""
+Unit tests for embedding_cache.py module.
+Tests cache lookups, eviction and the cached embeddings wrapper.
+"""
+import os
+import sys
+import pytest
+from unittest.mock import Mock
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+from src.embedding_cache import EmbeddingCache, CachedEmbeddings, QueryEmbeddingCache, normalize_text, text_hash
+
+
+class TestEmbeddingCache:
+    """Test suite for EmbeddingCache class."""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Create a cache in a temporary directory."""
+        cache = EmbeddingCache(path=str(tmp_path / "emb.sqlite3"), max_entries=3)
+        yield cache
+        cache.close()
+
+    def test_normalize_text(self):
+        """Test whitespace differences normalize to the same text."""
+        assert normalize_text("  Exit load\n is   1% ") == "Exit load is 1%"
+        assert text_hash("Exit load\nis 1%") == text_hash("Exit load is 1%")
+
+    def test_put_and_get_many(self, cache):
+        """Test batch storage and lookup."""
+        cache.put_many("model", {"h1": [0.5, 0.25], "h2": [1.0, 0.0]})
+
+        found = cache.get_many("model", ["h1", "h2", "h3"])
+
+        assert found == {"h1": [0.5, 0.25], "h2": [1.0, 0.0]}
+        assert cache.stats["hits"] == 2
+        assert cache.stats["misses"] == 1
+
+    def test_model_is_part_of_key(self, cache):
+        """Test vectors from different models don't collide."""
+        cache.put_many("model-a", {"h1": [1.0]})
+
+        assert cache.get_many("model-b", ["h1"]) == {}
+
+    def test_default_path_isolated_in_tests(self, tmp_path):
+        """Test the default cache (as VectorStore creates it) lives in the test's temp dir."""
+        from src.embedding_cache import EMBEDDING_CACHE_PATH
+
+        path = EmbeddingCache().path
+
+        assert path.startswith(str(tmp_path))
+        assert path != EMBEDDING_CACHE_PATH
+
+    def test_persists_across_instances(self, cache):
+        """Test vectors survive reopening the database."""
+        cache.put_many("model", {"h1": [0.5]})
+        cache.close()
+
+        reopened = EmbeddingCache(path=cache.path)
+        assert reopened.get_many("model", ["h1"]) == {"h1": [0.5]}
+        reopened.close()
+
+    def test_evicts_least_recently_used(self, cache):
+        """Test the cache stays within max_entries, dropping the oldest entries."""
+        cache.put_many("model", {"h1": [1.0], "h2": [2.0], "h3": [3.0]})
+        cache.get_many("model", ["h1"])  # h1 becomes most recently used
+        cache.put_many("model", {"h4": [4.0]})
+
+        assert len(cache) == 3
+        assert cache.get_many("model", ["h1", "h4"]).keys() == {"h1", "h4"}
+        assert cache.stats["evicted"] == 1
+
+
+class TestQueryEmbeddingCache:
+    """Test suite for QueryEmbeddingCache class."""
+
+    def test_hit_and_miss(self):
+        """Test a normalized repeat of a query is a hit."""
+        cache = QueryEmbeddingCache(max_bytes=10_000)
+        assert cache.get("model", "Exit load?") is None
+        cache.put("model", "Exit load?", [0.1, 0.2])
+
+        assert cache.get("model", "  Exit   load? ") == [0.1, 0.2]
+        assert cache.get("other-model", "Exit load?") is None
+        assert cache.stats == {"hits": 1, "misses": 2, "evicted": 0}
+        assert cache.hit_rate() == pytest.approx(1 / 3)
+
+    def test_evicts_least_recently_used_by_bytes(self):
+        """Test the cache stays within max_bytes, dropping the oldest queries."""
+        vector = [0.0] * 100  # 800 bytes as float64
+        cache = QueryEmbeddingCache(max_bytes=2000)
+        cache.put("m", "q1", vector)
+        cache.put("m", "q2", vector)
+        cache.get("m", "q1")  # q1 becomes most recently used
+        cache.put("m", "q3", vector)
+
+        assert len(cache) == 2
+        assert cache.bytes <= 2000
+        assert cache.get("m", "q2") is None
+        assert cache.get("m", "q1") is not None
+        assert cache.stats["evicted"] == 1
+
+    def test_oversized_vector_not_cached(self):
+        """Test a vector larger than the whole budget is skipped."""
+        cache = QueryEmbeddingCache(max_bytes=100)
+        cache.put("m", "q", [0.0] * 100)
+
+        assert len(cache) == 0
+
+    def test_thread_safe(self):
+        """Test concurrent puts and gets keep the byte count consistent."""
+        cache = QueryEmbeddingCache(max_bytes=50_000)
+
+        def worker(n):
+            for i in range(200):
+                cache.put("m", f"q{(n * 7 + i) % 150}", [float(i)] * 16)
+                cache.get("m", f"q{i % 150}")
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        expected = sum(cache._size(key, vector) for key, vector in cache._entries.items())
+        assert cache.bytes == expected <= 50_000
+
+
+class TestCachedEmbeddings:
+    """Test suite for CachedEmbeddings wrapper."""
+
+    @pytest.fixture
+    def model(self):
+        """Create a mock embedding model returning one vector per text."""
+        model = Mock()
+        model.model_name = "test-model"
+        model.embed_documents.side_effect = lambda texts: [[float(len(t))] for t in texts]
+        return model
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Create a cache in a temporary directory."""
+        cache = EmbeddingCache(path=str(tmp_path / "emb.sqlite3"))
+        yield cache
+        cache.close()
+
+    def test_only_misses_are_embedded(self, model, cache):
+        """Test cached texts skip the model and misses go in one batch."""
+        embeddings = CachedEmbeddings(model, cache)
+        embeddings.embed_documents(["disclaimer", "kim section"])
+        model.embed_documents.reset_mock()
+
+        vectors = embeddings.embed_documents(["disclaimer", "new text", "kim section"])
+
+        model.embed_documents.assert_called_once_with(["new text"])
+        assert vectors == [[10.0], [8.0], [11.0]]
+
+    def test_duplicates_in_batch_embedded_once(self, model, cache):
+        """Test repeated chunk text within one call is embedded once."""
+        embeddings = CachedEmbeddings(model, cache)
+
+        vectors = embeddings.embed_documents(["same", "same\n", "other"])
+
+        model.embed_documents.assert_called_once_with(["same", "other"])
+        assert vectors[0] == vectors[1]
+
+    def test_uses_model_name_namespace(self, model, cache):
+        """Test the wrapped model's name is the cache namespace."""
+        assert CachedEmbeddings(model, cache).model_name == "test-model"
+
+    def test_embed_query_passthrough(self, model, cache):
+        """Test new queries go to the model."""
+        model.embed_query.return_value = [0.1]
+
+        assert CachedEmbeddings(model, cache, query_cache=QueryEmbeddingCache()).embed_query("q") == [0.1]
+
+    def test_repeated_query_skips_model(self, model, cache):
+        """Test a repeated question is served from the query cache."""
+        model.embed_query.return_value = [0.1, 0.2]
+        embeddings = CachedEmbeddings(model, cache, query_cache=QueryEmbeddingCache())
+
+        first = embeddings.embed_query("What is the exit load?")
+        second = embeddings.embed_query("What is the  exit load?")
+
+        model.embed_query.assert_called_once()
+        assert first == second == [0.1, 0.2]
+
+    def test_embed_queries_batches_misses(self, model, cache):
+        """Test uncached queries are embedded in one call and then served from the query cache."""
+        model.embed_query.return_value = [7.0]
+        embeddings = CachedEmbeddings(model, cache, query_cache=QueryEmbeddingCache())
+        embeddings.embed_query("cached?")
+
+        vectors = embeddings.embed_queries(["exit load?", "cached?", "min sip?", "exit  load?"])
+
+        model.embed_documents.assert_called_once_with(["exit load?", "min sip?"])
+        assert vectors == [[10.0], [7.0], [8.0], [10.0]]
+        assert embeddings.embed_query("min sip?") == [8.0]
+        assert model.embed_query.call_count == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
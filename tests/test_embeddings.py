@@ -4,13 +4,15 @@ Tests embedding function initialization and generation.
 """
 import os
 import sys
+import threading
 import pytest
 import numpy as np
+from unittest.mock import Mock, patch
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.embeddings import get_embedding_function
+from src.embeddings import get_embedding_function, EmbeddingModelRegistry
 
 
 class TestEmbeddings:
@@ -130,5 +132,80 @@ class TestEmbeddings:
         assert len(embedding) > 0
 
 
+class TestEmbeddingModelRegistry:
+    """Test suite for the shared embedding model registry."""
+    
+    @pytest.fixture
+    def mock_embeddings_class(self):
+        """Patch the model class so no weights are downloaded."""
+        with patch('src.embeddings.SentenceTransformerEmbeddings') as mock_class:
+            mock_class.side_effect = lambda **kwargs: Mock(**{'embed_query.return_value': [0.1]})
+            yield mock_class
+    
+    def test_lazy_load(self, mock_embeddings_class):
+        """Test that nothing is loaded until a model is requested."""
+        registry = EmbeddingModelRegistry()
+        
+        assert not registry.is_loaded("model-a", "cpu")
+        mock_embeddings_class.assert_not_called()
+        
+        registry.get("model-a", "cpu")
+        
+        assert registry.is_loaded("model-a", "cpu")
+    
+    def test_same_key_returns_same_instance(self, mock_embeddings_class):
+        """Test that repeated requests share one loaded model."""
+        registry = EmbeddingModelRegistry()
+        
+        model1 = registry.get("model-a", "cpu")
+        model2 = registry.get("model-a", "cpu")
+        
+        assert model1 is model2
+        assert mock_embeddings_class.call_count == 1
+    
+    def test_different_keys_load_separately(self, mock_embeddings_class):
+        """Test that model name and device are both part of the key."""
+        registry = EmbeddingModelRegistry()
+        
+        model_cpu = registry.get("model-a", "cpu")
+        model_cuda = registry.get("model-a", "cuda")
+        model_b = registry.get("model-b", "cpu")
+        
+        assert model_cpu is not model_cuda
+        assert model_cpu is not model_b
+        assert mock_embeddings_class.call_count == 3
+    
+    def test_concurrent_get_loads_once(self, mock_embeddings_class):
+        """Test that concurrent first requests load the model only once."""
+        registry = EmbeddingModelRegistry()
+        results = []
+        
+        threads = [
+            threading.Thread(target=lambda: results.append(registry.get("model-a", "cpu")))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        assert mock_embeddings_class.call_count == 1
+        assert all(r is results[0] for r in results)
+    
+    def test_warmup_records_metrics(self, mock_embeddings_class):
+        """Test that warmup loads the model and reports load metrics."""
+        registry = EmbeddingModelRegistry()
+        
+        stats = registry.warmup("model-a", "cpu")
+        
+        assert stats['model_name'] == "model-a"
+        assert stats['device'] == "cpu"
+        assert stats['load_seconds'] >= 0
+        assert stats['warmup_seconds'] >= 0
+        assert 'rss_delta_bytes' in stats
+        assert 'weights_bytes' in stats
+        assert len(registry.stats()) == 1
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
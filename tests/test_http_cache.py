@@ -0,0 +1,163 @@
+"""
+Unit tests for http_cache.py module.
+Tests conditional revalidation, offline mode and stale fallback.
+"""
+import os
+import sys
+import pytest
+import requests
+from unittest.mock import Mock, patch
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.http_cache import HttpCache
+
+
+def make_response(content=b"body", status_code=200, headers=None):
+    """Create a mock requests.Response."""
+    response = Mock()
+    response.content = content
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+
+class TestHttpCache:
+    """Test suite for HttpCache class."""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Create an online cache in a temporary directory."""
+        return HttpCache(cache_dir=str(tmp_path / "cache"), offline=False)
+
+    @patch('src.http_cache.requests.get')
+    def test_miss_stores_content(self, mock_get, cache):
+        """Test that a first fetch downloads and stores the body."""
+        mock_get.return_value = make_response(b"pdf bytes", headers={"ETag": '"v1"'})
+
+        response = cache.get("https://example.com/a.pdf")
+
+        assert response.content == b"pdf bytes"
+        assert not response.from_cache
+        entry = cache.entry("https://example.com/a.pdf")
+        assert entry["etag"] == '"v1"'
+        assert os.path.exists(os.path.join(cache.blob_dir, entry["sha256"]))
+        assert cache.stats["misses"] == 1
+
+    @patch('src.http_cache.requests.get')
+    def test_revalidation_sends_validators(self, mock_get, cache):
+        """Test that cached URLs are revalidated with conditional headers."""
+        mock_get.return_value = make_response(b"page", headers={
+            "ETag": '"v1"', "Last-Modified": "Tue, 10 Feb 2026 00:00:00 GMT"
+        })
+        cache.get("https://example.com/page")
+
+        mock_get.return_value = make_response(b"", status_code=304)
+        response = cache.get("https://example.com/page")
+
+        sent_headers = mock_get.call_args[1]["headers"]
+        assert sent_headers["If-None-Match"] == '"v1"'
+        assert sent_headers["If-Modified-Since"] == "Tue, 10 Feb 2026 00:00:00 GMT"
+        assert response.from_cache
+        assert response.content == b"page"
+        assert cache.stats["revalidated"] == 1
+
+    @patch('src.http_cache.requests.get')
+    def test_changed_content_replaces_entry(self, mock_get, cache):
+        """Test that a 200 on revalidation stores the new body."""
+        mock_get.return_value = make_response(b"old", headers={"ETag": '"v1"'})
+        cache.get("https://example.com/page")
+        old_digest = cache.entry("https://example.com/page")["sha256"]
+
+        mock_get.return_value = make_response(b"new", headers={"ETag": '"v2"'})
+        response = cache.get("https://example.com/page")
+
+        assert response.content == b"new"
+        assert cache.entry("https://example.com/page")["sha256"] != old_digest
+        # The replaced body is deleted
+        assert not os.path.exists(os.path.join(cache.blob_dir, old_digest))
+
+    @patch('src.http_cache.requests.get')
+    def test_replaced_blob_kept_while_shared(self, mock_get, cache):
+        """Test a replaced body another URL still uses stays on disk."""
+        mock_get.return_value = make_response(b"same kim")
+        cache.get("https://example.com/a.pdf")
+        cache.get("https://example.com/b.pdf")
+        shared_digest = cache.entry("https://example.com/a.pdf")["sha256"]
+
+        mock_get.return_value = make_response(b"new kim")
+        cache.get("https://example.com/a.pdf")
+
+        cache.flush()
+        offline = HttpCache(cache_dir=cache.cache_dir, offline=True)
+        assert offline.get("https://example.com/b.pdf").content == b"same kim"
+
+    @patch('src.http_cache.requests.get')
+    def test_index_written_once_on_flush(self, mock_get, cache):
+        """Test fetches only change the in-memory index until flush()."""
+        mock_get.return_value = make_response(b"page", headers={"ETag": '"v1"'})
+        with cache:
+            for i in range(3):
+                cache.get(f"https://example.com/{i}")
+            assert not os.path.exists(cache.index_path)
+
+        reloaded = HttpCache(cache_dir=cache.cache_dir, offline=True)
+        assert reloaded.entry("https://example.com/2")["etag"] == '"v1"'
+
+    @patch('src.http_cache.requests.get')
+    def test_identical_content_shares_blob(self, mock_get, cache):
+        """Test that identical bodies from different URLs are stored once."""
+        mock_get.return_value = make_response(b"same kim")
+        cache.get("https://example.com/a.pdf")
+        cache.get("https://example.com/b.pdf")
+
+        assert len(os.listdir(cache.blob_dir)) == 1
+
+    @patch('src.http_cache.requests.get')
+    def test_offline_serves_from_disk(self, mock_get, cache):
+        """Test offline mode uses the cache without network access."""
+        mock_get.return_value = make_response(b"cached")
+        cache.get("https://example.com/page")
+        cache.flush()
+        mock_get.reset_mock()
+
+        offline = HttpCache(cache_dir=cache.cache_dir, offline=True)
+        response = offline.get("https://example.com/page")
+
+        assert response.content == b"cached"
+        mock_get.assert_not_called()
+
+    def test_offline_missing_entry_raises(self, tmp_path):
+        """Test offline mode fails for URLs never cached."""
+        offline = HttpCache(cache_dir=str(tmp_path / "cache"), offline=True)
+
+        with pytest.raises(requests.ConnectionError):
+            offline.get("https://example.com/missing")
+
+    @patch('src.http_cache.requests.get')
+    def test_network_error_serves_stale(self, mock_get, cache):
+        """Test a failed request falls back to the cached copy."""
+        mock_get.return_value = make_response(b"cached")
+        cache.get("https://example.com/page")
+
+        mock_get.side_effect = requests.ConnectionError("down")
+        response = cache.get("https://example.com/page")
+
+        assert response.content == b"cached"
+        assert cache.stats["stale"] == 1
+
+    @patch('src.http_cache.requests.get')
+    def test_client_error_not_cached(self, mock_get, cache):
+        """Test that 4xx responses are returned but not stored."""
+        mock_get.return_value = make_response(b"forbidden", status_code=403)
+
+        response = cache.get("https://example.com/sid.pdf")
+
+        with pytest.raises(requests.HTTPError):
+            response.raise_for_status()
+        assert cache.entry("https://example.com/sid.pdf") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,256 @@
+"""
+Unit tests for ingestion.py module.
+Tests the manifest and incremental re-ingestion decisions.
+"""
+import os
+import sys
+import pytest
+from unittest.mock import MagicMock, Mock, patch
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ingestion import IngestionManifest, IncrementalIngestor
+from src.vector_store import VectorStore
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+
+def make_docs(url, ids):
+    """Create chunk documents with IDs for one source."""
+    return [
+        Document(id=chunk_id, page_content=f"{url} {chunk_id}", metadata={"source": url, "scheme": "S"})
+        for chunk_id in ids
+    ]
+
+
+class TestIngestionManifest:
+    """Test suite for IngestionManifest class."""
+
+    def test_roundtrip(self, tmp_path):
+        """Test manifest entries survive save and reload."""
+        path = str(tmp_path / "manifest.json")
+        manifest = IngestionManifest(path)
+        assert not manifest.exists
+
+        manifest.update("https://example.com/a", "hash-a", ["a-1", "a-2"], "S")
+        manifest.save()
+
+        reloaded = IngestionManifest(path)
+        assert reloaded.exists
+        assert reloaded.content_hashes() == {"https://example.com/a": "hash-a"}
+        assert reloaded.chunk_ids("https://example.com/a") == ["a-1", "a-2"]
+
+    def test_remove(self, tmp_path):
+        """Test removing a source."""
+        manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+        manifest.update("https://example.com/a", "hash-a", ["a-1"])
+        manifest.remove("https://example.com/a")
+
+        assert manifest.chunk_ids("https://example.com/a") == []
+
+
+class TestIncrementalIngestor:
+    """Test suite for IncrementalIngestor class."""
+
+    @pytest.fixture
+    def vector_store(self, tmp_path):
+        """Create a mock vector store backed by a temp directory."""
+        vs = Mock()
+        vs.faiss_path = str(tmp_path / "faiss")
+        vs.get_db.return_value = None
+        vs.delete_documents.side_effect = lambda ids, save=True: len(ids)
+        vs.add_documents.side_effect = lambda docs, save=True: len(docs)
+        return vs
+
+    def seed_manifest(self, vector_store, sources):
+        """Write a manifest as if a previous run had ingested these sources."""
+        manifest = IngestionManifest(os.path.join(vector_store.faiss_path, "manifest.json"))
+        for url, (content_hash, ids) in sources.items():
+            manifest.update(url, content_hash, ids)
+        manifest.save()
+
+    def test_first_run_adds_everything(self, vector_store):
+        """Test an empty store ingests all sources."""
+        loader = Mock()
+        loader.iter_sources.return_value = iter([
+            {"url": "u1", "content_hash": "h1", "docs": make_docs("u1", ["u1-0", "u1-1"])},
+            {"url": "u2", "content_hash": "h2", "docs": make_docs("u2", ["u2-0"])},
+        ])
+
+        summary = IncrementalIngestor(loader, vector_store).run()
+
+        assert summary["new"] == ["u1", "u2"]
+        assert summary["chunks_added"] == 3
+        loader.iter_sources.assert_called_once_with({})
+        manifest = IngestionManifest(os.path.join(vector_store.faiss_path, "manifest.json"))
+        assert manifest.chunk_ids("u1") == ["u1-0", "u1-1"]
+
+    def test_only_changed_sources_are_reembedded(self, vector_store):
+        """Test unchanged sources are left alone and changed ones replace their chunks."""
+        self.seed_manifest(vector_store, {"u1": ("h1", ["u1-old"]), "u2": ("h2", ["u2-0"])})
+        vector_store.get_db.return_value = MagicMock()
+        loader = Mock()
+        loader.iter_sources.return_value = iter([
+            {"url": "u1", "content_hash": "h1-new", "docs": make_docs("u1", ["u1-new"])},
+            {"url": "u2", "content_hash": "h2", "docs": None},
+        ])
+
+        summary = IncrementalIngestor(loader, vector_store).run()
+
+        loader.iter_sources.assert_called_once_with({"u1": "h1", "u2": "h2"})
+        assert summary["changed"] == ["u1"]
+        assert summary["unchanged"] == ["u2"]
+        vector_store.delete_documents.assert_called_once_with(["u1-old", "u1-new"], save=False)
+        added = vector_store.add_documents.call_args[0][0]
+        assert [d.id for d in added] == ["u1-new"]
+        vector_store.clear.assert_not_called()
+
+    def test_removed_and_failed_sources(self, vector_store):
+        """Test dropped sources are deleted while failed downloads keep their chunks."""
+        self.seed_manifest(vector_store, {"u1": ("h1", ["u1-0"]), "u2": ("h2", ["u2-0"])})
+        vector_store.get_db.return_value = MagicMock()
+        loader = Mock()
+        loader.iter_sources.return_value = iter([
+            {"url": "u1", "content_hash": None, "docs": None},
+        ])
+
+        summary = IncrementalIngestor(loader, vector_store).run()
+
+        assert summary["failed"] == ["u1"]
+        assert summary["removed"] == ["u2"]
+        vector_store.delete_documents.assert_called_once_with(["u2-0"], save=False)
+        vector_store.save.assert_called_once()
+        manifest = IngestionManifest(os.path.join(vector_store.faiss_path, "manifest.json"))
+        assert manifest.chunk_ids("u1") == ["u1-0"]
+
+    def test_streams_in_batches(self, vector_store):
+        """Test chunks are indexed and recorded batch by batch while sources stream in."""
+        flushed_before_last_source = []
+
+        def sources():
+            yield {"url": "u1", "content_hash": "h1", "docs": make_docs("u1", ["u1-0", "u1-1"])}
+            yield {"url": "u2", "content_hash": "h2", "docs": make_docs("u2", ["u2-0", "u2-1"])}
+            # The first batch is already indexed before the last source is fetched
+            flushed_before_last_source.append(vector_store.add_documents.call_count)
+            yield {"url": "u3", "content_hash": "h3", "docs": make_docs("u3", ["u3-0"])}
+
+        loader = Mock()
+        loader.iter_sources.return_value = sources()
+
+        summary = IncrementalIngestor(loader, vector_store, batch_size=2).run()
+
+        assert flushed_before_last_source == [2]
+        batches = [[d.id for d in c[0][0]] for c in vector_store.add_documents.call_args_list]
+        assert batches == [["u1-0", "u1-1"], ["u2-0", "u2-1"], ["u3-0"]]
+        assert all(len(batch) <= 2 for batch in batches)
+        assert summary["chunks_added"] == 5
+
+    def test_saves_only_at_checkpoints(self, vector_store):
+        """Test batches are appended in memory and the index is saved at checkpoints and at the end."""
+        manifest_path = os.path.join(vector_store.faiss_path, "manifest.json")
+        vector_store.delete_documents.side_effect = lambda ids, save=True: 0
+        saved_manifests = []
+        vector_store.save.side_effect = lambda: saved_manifests.append(
+            sorted(IngestionManifest(manifest_path).sources)
+        )
+        loader = Mock()
+        loader.iter_sources.return_value = iter([
+            {"url": f"u{i}", "content_hash": f"h{i}", "docs": make_docs(f"u{i}", [f"u{i}-0"])}
+            for i in range(5)
+        ])
+
+        IncrementalIngestor(loader, vector_store, batch_size=1, checkpoint_chunks=2).run()
+
+        assert vector_store.add_documents.call_count == 5
+        assert vector_store.save.call_count == 3
+        # The manifest on disk is written after the index it describes
+        assert saved_manifests == [[], ["u0", "u1"], ["u0", "u1", "u2", "u3"]]
+        assert sorted(IngestionManifest(manifest_path).sources) == ["u0", "u1", "u2", "u3", "u4"]
+
+    def test_index_without_manifest_is_rebuilt(self, vector_store):
+        """Test a legacy index with untracked chunks is rebuilt once."""
+        vector_store.get_db.return_value = MagicMock()
+        loader = Mock()
+        loader.iter_sources.return_value = iter([])
+
+        IncrementalIngestor(loader, vector_store).run()
+
+        vector_store.reset.assert_called_once()
+        vector_store.clear.assert_not_called()
+
+
+class TestFullRebuild:
+    """Test full rebuilds against a real VectorStore (with a fake embedding model)."""
+
+    SOURCES = {"u1": ["u1-0", "u1-1"], "u2": ["u2-0", "u2-1"], "u3": ["u3-0"]}
+
+    @pytest.fixture
+    def faiss_path(self, tmp_path):
+        """Index directory, with VectorStore embedding through a small fake model."""
+        path = str(tmp_path / "faiss")
+        with patch("src.vector_store.FAISS_PATH", path), \
+                patch("src.vector_store.get_embedding_function", lambda *a, **k: DeterministicFakeEmbedding(size=16)):
+            yield path
+
+    def loader(self, content_hash, on_fetch=lambda: None):
+        """Loader that skips sources whose hash is already known, like DataLoader.iter_sources."""
+        def iter_sources(known_hashes):
+            for url, ids in self.SOURCES.items():
+                on_fetch()
+                if known_hashes.get(url) == content_hash:
+                    yield {"url": url, "content_hash": content_hash, "docs": None}
+                else:
+                    yield {"url": url, "content_hash": content_hash, "docs": make_docs(url, ids)}
+
+        loader = Mock()
+        loader.iter_sources.side_effect = iter_sources
+        return loader
+
+    def test_early_batches_published_while_later_sources_download(self, faiss_path):
+        """Test the first batch is searchable before the last source is fetched, with saves spaced out."""
+        seen_by_reader = []
+
+        def observe():
+            reader = VectorStore()
+            db = reader.get_db()
+            seen_by_reader.append(len(db.index_to_docstore_id) if db is not None else 0)
+
+        IncrementalIngestor(self.loader("h", observe), VectorStore(), batch_size=2).run()
+
+        # u1 (2 chunks) is published after the first batch, u2 once as much changed again
+        assert seen_by_reader == [0, 2, 4]
+        assert len(VectorStore().get_db().index_to_docstore_id) == 5
+
+    def test_full_rebuild_reindexes_everything_and_publishes_once(self, faiss_path):
+        """Test run(full_rebuild=True) re-ingests every source and readers never see a partial index."""
+        writer = VectorStore()
+        IncrementalIngestor(self.loader("h"), writer).run()
+        old_version = writer.current_version()
+
+        seen_by_reader = []
+
+        def observe():
+            reader = VectorStore()
+            seen_by_reader.append((reader.current_version(), len(reader.get_db().index_to_docstore_id)))
+
+        writer = VectorStore()
+        ingestor = IncrementalIngestor(self.loader("h", observe), writer, batch_size=1, checkpoint_chunks=1)
+        summary = ingestor.run(full_rebuild=True)
+
+        assert summary["new"] == ["u1", "u2", "u3"]
+        assert summary["chunks_added"] == 5
+        # Every mid-rebuild read still got the complete previously published index
+        assert seen_by_reader == [(old_version, 5)] * 3
+
+        reader = VectorStore()
+        assert reader.current_version() not in (None, old_version)
+        assert sorted(reader.get_db().index_to_docstore_id.values()) == sorted(
+            chunk_id for ids in self.SOURCES.values() for chunk_id in ids
+        )
+        manifest = IngestionManifest(os.path.join(faiss_path, "manifest.json"))
+        assert sorted(manifest.sources) == ["u1", "u2", "u3"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
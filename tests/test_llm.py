@@ -4,13 +4,21 @@ Tests LLM wrapper, providers, and prompt generation.
 """
 import os
 import sys
+import asyncio
+import time
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import ANY, AsyncMock, Mock, patch, MagicMock
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.llm import LLM, GeminiProvider, GrokProvider, get_llm
+from src.llm import (
+    LLM, LLMProvider, GeminiProvider, GrokProvider, OpenAICompatibleProvider, FailoverLLM, LatencyHistory,
+    get_llm, retry_after_seconds, is_transient, http_status,
+    CircuitOpenError, DeadlineExceededError, RateLimitError, RetryableError
+)
+from src.rate_limiter import AdaptiveRateLimiter
+from src.circuit_breaker import CircuitBreaker
 
 
 class TestGeminiProvider:
@@ -58,6 +66,21 @@ class TestGeminiProvider:
         
         with pytest.raises(RuntimeError, match="Gemini API error"):
             provider.generate("Test prompt")
+    
+    @patch('google.generativeai.configure')
+    @patch('google.generativeai.GenerativeModel')
+    def test_generate_stream(self, mock_model_class, mock_configure):
+        """Test streamed generation yields each chunk's text and skips empty chunks."""
+        chunks = [Mock(parts=[1], text="Exit load "), Mock(parts=[1], text="is 1%."), Mock(parts=[])]
+        mock_model = Mock()
+        mock_model.generate_content.return_value = iter(chunks)
+        mock_model_class.return_value = mock_model
+        
+        provider = GeminiProvider("test_key")
+        result = list(provider.generate_stream("Test prompt"))
+        
+        assert result == ["Exit load ", "is 1%."]
+        assert mock_model.generate_content.call_args[1]['stream'] is True
 
 
 class TestGrokProvider:
@@ -111,6 +134,123 @@ class TestGrokProvider:
         
         with pytest.raises(RuntimeError, match="Grok API error"):
             provider.generate("Test prompt")
+    
+    @patch('openai.OpenAI')
+    def test_generate_stream(self, mock_openai_class):
+        """Test streamed generation yields the content deltas."""
+        def chunk(content):
+            return Mock(choices=[Mock(delta=Mock(content=content))])
+        
+        mock_client = Mock()
+        mock_client.chat.completions.create.return_value = iter([chunk("Min SIP "), chunk(None), chunk("is Rs. 100.")])
+        mock_openai_class.return_value = mock_client
+        
+        provider = GrokProvider("test_key")
+        result = list(provider.generate_stream("Test prompt"))
+        
+        assert result == ["Min SIP ", "is Rs. 100."]
+        assert mock_client.chat.completions.create.call_args[1]['stream'] is True
+    
+    @patch('openai.OpenAI')
+    def test_generate_stream_error(self, mock_openai_class):
+        """Test streaming errors get the same translation as generate()."""
+        mock_client = Mock()
+        mock_client.chat.completions.create.side_effect = Exception("API Error")
+        mock_openai_class.return_value = mock_client
+        
+        provider = GrokProvider("test_key")
+        
+        with pytest.raises(RuntimeError, match="Grok API error"):
+            list(provider.generate_stream("Test prompt"))
+    
+    @patch('openai.OpenAI')
+    def test_server_error_is_retryable(self, mock_openai_class):
+        """Test a 5xx becomes a RetryableError with the usual message."""
+        mock_client = Mock()
+        mock_client.chat.completions.create.side_effect = Exception("Error code: 503 - unavailable")
+        mock_openai_class.return_value = mock_client
+        
+        provider = GrokProvider("test_key")
+        
+        with pytest.raises(RetryableError, match="Grok API error"):
+            provider.generate("Test prompt", timeout=5)
+        assert mock_client.chat.completions.create.call_args[1]['timeout'] == 5
+    
+    @patch('openai.OpenAI')
+    def test_rate_limit_error_translated(self, mock_openai_class):
+        """Test a 429 becomes a RateLimitError carrying the retry-after hint."""
+        error = Exception("Error code: 429 - rate limit")
+        error.response = Mock(headers={"retry-after": "3"})
+        mock_client = Mock()
+        mock_client.chat.completions.create.side_effect = error
+        mock_openai_class.return_value = mock_client
+        
+        provider = GrokProvider("test_key")
+        
+        with pytest.raises(RateLimitError, match="QUOTA EXCEEDED") as excinfo:
+            provider.generate("Test prompt")
+        assert excinfo.value.retry_after == 3.0
+    
+    @patch('openai.AsyncOpenAI')
+    @patch('openai.OpenAI')
+    def test_agenerate_uses_async_client(self, mock_openai_class, mock_async_openai_class):
+        """Test async generation awaits the async client, not the sync one."""
+        mock_response = Mock()
+        mock_response.choices = [Mock(message=Mock(content="Async response"))]
+        mock_async_client = Mock()
+        mock_async_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        mock_async_openai_class.return_value = mock_async_client
+        
+        provider = GrokProvider("test_key")
+        result = asyncio.run(provider.agenerate("Test prompt", temperature=0.5, max_tokens=500))
+        
+        assert result == "Async response"
+        mock_async_client.chat.completions.create.assert_awaited_once()
+        mock_openai_class.return_value.chat.completions.create.assert_not_called()
+    
+    @patch('openai.AsyncOpenAI')
+    @patch('openai.OpenAI')
+    def test_agenerate_error(self, mock_openai_class, mock_async_openai_class):
+        """Test async errors get the same translation as sync ones."""
+        mock_async_client = Mock()
+        mock_async_client.chat.completions.create = AsyncMock(side_effect=Exception("429 Too Many Requests"))
+        mock_async_openai_class.return_value = mock_async_client
+        
+        provider = GrokProvider("test_key")
+        
+        with pytest.raises(RuntimeError, match="QUOTA EXCEEDED"):
+            asyncio.run(provider.agenerate("Test prompt"))
+
+
+class TestOpenAICompatibleProvider:
+    """Test suite for OpenAICompatibleProvider class."""
+    
+    @patch('openai.AsyncOpenAI')
+    @patch('openai.OpenAI')
+    def test_init_with_base_url(self, mock_openai_class, mock_async_openai_class):
+        """Test the clients point at the configured endpoint."""
+        provider = OpenAICompatibleProvider("test_key", "llama-3", base_url="http://localhost:8000/v1")
+        
+        assert provider.model == "llama-3"
+        mock_openai_class.assert_called_once_with(api_key="test_key", base_url="http://localhost:8000/v1")
+        mock_async_openai_class.assert_called_once_with(api_key="test_key", base_url="http://localhost:8000/v1")
+    
+    @patch('openai.OpenAI')
+    def test_errors_translated(self, mock_openai_class):
+        """Test throttling, server errors and other errors map to the usual error types."""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        provider = OpenAICompatibleProvider("test_key", "gpt-4o-mini")
+        
+        mock_client.chat.completions.create.side_effect = Exception("Error code: 429 - rate limit")
+        with pytest.raises(RateLimitError):
+            provider.generate("Test prompt")
+        mock_client.chat.completions.create.side_effect = Exception("Error code: 502 - bad gateway")
+        with pytest.raises(RetryableError, match="OpenAI-compatible API error"):
+            provider.generate("Test prompt")
+        mock_client.chat.completions.create.side_effect = Exception("Error code: 400 - bad request")
+        with pytest.raises(RuntimeError, match="OpenAI-compatible API error"):
+            provider.generate("Test prompt")
 
 
 class TestLLM:
@@ -201,6 +341,221 @@ class TestLLM:
         assert call_args[1]['temperature'] == 0.8
         assert call_args[1]['max_tokens'] == 1500
     
+    @patch('src.llm.GeminiProvider')
+    def test_agenerate(self, mock_gemini_provider):
+        """Test agenerate awaits the provider with the default settings."""
+        mock_provider_instance = Mock()
+        mock_provider_instance.agenerate = AsyncMock(return_value="Generated text")
+        mock_gemini_provider.return_value = mock_provider_instance
+        
+        llm = LLM(provider='gemini', api_key='test_key')
+        result = asyncio.run(llm.agenerate("Test prompt", temperature=0.8))
+        
+        assert result == "Generated text"
+        mock_provider_instance.agenerate.assert_awaited_once_with(
+            "Test prompt", temperature=0.8, max_tokens=llm.max_tokens, timeout=ANY
+        )
+    
+    @patch('src.llm.GeminiProvider')
+    def test_generate_stream(self, mock_gemini_provider):
+        """Test generate_stream passes the provider's pieces through."""
+        mock_provider_instance = Mock()
+        mock_provider_instance.generate_stream.return_value = iter(["a", "b"])
+        mock_gemini_provider.return_value = mock_provider_instance
+        
+        llm = LLM(provider='gemini', api_key='test_key')
+        
+        assert list(llm.generate_stream("Test prompt", max_tokens=50)) == ["a", "b"]
+        assert mock_provider_instance.generate_stream.call_args[1]['max_tokens'] == 50
+    
+    def test_provider_default_stream_yields_whole_response(self):
+        """Test providers without a streaming API stream their full response."""
+        class OneShotProvider(LLMProvider):
+            def generate(self, prompt, **kwargs):
+                return "whole answer"
+        
+        assert list(OneShotProvider().generate_stream("Test prompt")) == ["whole answer"]
+    
+    @patch('src.llm.GeminiProvider')
+    def test_generate_retries_when_throttled(self, mock_gemini_provider):
+        """Test a throttled call waits for the retry-after hint and is retried, not failed."""
+        mock_provider_instance = Mock()
+        mock_provider_instance.generate.side_effect = [RateLimitError("429", retry_after=0.05), "Generated text"]
+        mock_gemini_provider.return_value = mock_provider_instance
+        limiter = AdaptiveRateLimiter(max_concurrency=4)
+        
+        llm = LLM(provider='gemini', api_key='test_key', rate_limiter=limiter)
+        result = llm.generate("Test prompt")
+        
+        assert result == "Generated text"
+        assert mock_provider_instance.generate.call_count == 2
+        metrics = llm.rate_limit_metrics()
+        assert metrics["throttled"] == 1
+        assert metrics["max_wait_seconds"] >= 0.04
+        assert metrics["in_flight"] == 0
+    
+    @patch('src.llm.GeminiProvider')
+    def test_generate_gives_up_after_retries(self, mock_gemini_provider):
+        """Test throttling that outlasts the retries surfaces the error."""
+        mock_provider_instance = Mock()
+        mock_provider_instance.generate.side_effect = RateLimitError("429", retry_after=0)
+        mock_gemini_provider.return_value = mock_provider_instance
+        
+        llm = LLM(provider='gemini', api_key='test_key', rate_limiter=AdaptiveRateLimiter())
+        llm.max_retries = 2
+        
+        with pytest.raises(RateLimitError):
+            llm.generate("Test prompt")
+        assert mock_provider_instance.generate.call_count == 3
+        assert llm.rate_limit_metrics()["in_flight"] == 0
+    
+    @patch('src.llm.GeminiProvider')
+    def test_other_errors_not_retried(self, mock_gemini_provider):
+        """Test non-rate-limit errors fail immediately and free their slot."""
+        mock_provider_instance = Mock()
+        mock_provider_instance.generate.side_effect = RuntimeError("Gemini API error: boom")
+        mock_gemini_provider.return_value = mock_provider_instance
+        
+        llm = LLM(provider='gemini', api_key='test_key', rate_limiter=AdaptiveRateLimiter())
+        
+        with pytest.raises(RuntimeError, match="boom"):
+            llm.generate("Test prompt")
+        assert mock_provider_instance.generate.call_count == 1
+        assert llm.rate_limit_metrics()["in_flight"] == 0
+    
+    @pytest.fixture
+    def resilient_llm(self):
+        """Create an LLM over a mock provider with its own limiter and breaker and fast backoff."""
+        with patch('src.llm.GeminiProvider') as mock_gemini_provider:
+            mock_gemini_provider.return_value = Mock()
+            llm = LLM(
+                provider='gemini', api_key='test_key',
+                rate_limiter=AdaptiveRateLimiter(),
+                circuit_breaker=CircuitBreaker(failure_threshold=3, reset_seconds=60)
+            )
+        llm.backoff_base = 0.001
+        return llm
+    
+    def test_transient_errors_retried_with_backoff(self, resilient_llm):
+        """Test transient failures are retried and the provider gets the remaining time as timeout."""
+        resilient_llm.provider.generate.side_effect = [RetryableError("503"), RetryableError("503"), "Generated text"]
+        
+        assert resilient_llm.generate("Test prompt", deadline=time.monotonic() + 5) == "Generated text"
+        assert resilient_llm.provider.generate.call_count == 3
+        assert 4 < resilient_llm.provider.generate.call_args[1]['timeout'] <= 5
+        assert resilient_llm.circuit_breaker.state == CircuitBreaker.CLOSED
+    
+    def test_backoff_is_jittered_and_capped(self, resilient_llm):
+        """Test backoff delays are random within an exponential window up to the cap."""
+        resilient_llm.backoff_base, resilient_llm.backoff_max = 1.0, 4.0
+        
+        delays = [resilient_llm._backoff(attempt) for attempt in (0, 1, 5) for _ in range(50)]
+        
+        assert all(0 <= d <= 1.0 for d in delays[:50])
+        assert all(0 <= d <= 4.0 for d in delays[100:])
+        assert len(set(delays)) > 100
+    
+    def test_circuit_opens_and_fails_fast(self, resilient_llm):
+        """Test a failing provider trips the breaker and later calls skip the provider."""
+        resilient_llm.provider.generate.side_effect = RetryableError("Gemini API error: 503")
+        resilient_llm.max_retries = 5
+        
+        # The third failure opens the circuit, so the fourth attempt is short-circuited
+        with pytest.raises(CircuitOpenError):
+            resilient_llm.generate("Test prompt")
+        assert resilient_llm.provider.generate.call_count == 3
+        
+        with pytest.raises(CircuitOpenError):
+            resilient_llm.generate("Test prompt")
+        assert resilient_llm.provider.generate.call_count == 3
+        assert resilient_llm.rate_limit_metrics()["circuit"] == "open"
+    
+    def test_deadline_bounds_retries(self, resilient_llm):
+        """Test no retry is started that would end after the deadline."""
+        resilient_llm.provider.generate.side_effect = RetryableError("timed out")
+        resilient_llm.backoff_base = resilient_llm.backoff_max = 10.0
+        
+        start = time.monotonic()
+        with pytest.raises(RetryableError):
+            resilient_llm.generate("Test prompt", deadline=time.monotonic() + 0.05)
+        
+        assert time.monotonic() - start < 0.05
+    
+    def test_passed_deadline_raises_without_calling(self, resilient_llm):
+        """Test a request whose deadline already passed never reaches the provider."""
+        with pytest.raises(DeadlineExceededError):
+            resilient_llm.generate("Test prompt", deadline=time.monotonic() - 1)
+        resilient_llm.provider.generate.assert_not_called()
+    
+    def test_agenerate_enforces_deadline(self, resilient_llm):
+        """Test an async call that hangs past its deadline is cancelled."""
+        async def hang(*args, **kwargs):
+            await asyncio.sleep(10)
+        
+        resilient_llm.provider.agenerate = hang
+        
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceededError):
+            asyncio.run(resilient_llm.agenerate("Test prompt", deadline=time.monotonic() + 0.05))
+        assert time.monotonic() - start < 1
+        assert resilient_llm.rate_limit_metrics()["in_flight"] == 0
+    
+    def test_agenerate_cancelled_while_queued_frees_slot(self):
+        """Test cancelling an async call queued on the rate limiter leaks no slot."""
+        with patch('src.llm.GeminiProvider') as mock_gemini_provider:
+            mock_gemini_provider.return_value = Mock()
+            llm = LLM(provider='gemini', api_key='test_key',
+                      rate_limiter=AdaptiveRateLimiter(max_concurrency=1), circuit_breaker=CircuitBreaker())
+        llm.provider.agenerate = AsyncMock(return_value="Generated text")
+        
+        async def run():
+            llm.rate_limiter.acquire()
+            queued = asyncio.create_task(llm.agenerate("Test prompt"))
+            await asyncio.sleep(0.01)
+            queued.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await queued
+            llm.rate_limiter.release()
+            return await llm.agenerate("Test prompt")
+        
+        assert asyncio.run(run()) == "Generated text"
+        metrics = llm.rate_limit_metrics()
+        assert metrics["in_flight"] == 0
+        assert metrics["queue_depth"] == 0
+    
+    def test_is_transient(self):
+        """Test timeouts, connection errors and 5xx are retryable; client errors aren't."""
+        assert is_transient(TimeoutError())
+        assert is_transient(type("APITimeoutError", (Exception,), {})("Request timed out."))
+        assert is_transient(Exception("503 Service Unavailable"))
+        assert not is_transient(Exception("400 Bad Request"))
+        assert not is_transient(Exception("401 invalid api key"))
+    
+    def test_is_transient_ignores_status_digits_in_message_text(self):
+        """Test a client error that merely mentions a 5xx number isn't retried."""
+        assert not is_transient(Exception("max_tokens must be <= 1500"))
+        assert not is_transient(Exception("Error code: 400 - prompt mentions error 503 and 429"))
+        assert not is_transient(type("BadRequestError", (Exception,), {"status_code": 400})("upstream returned 502"))
+    
+    def test_is_transient_reads_status_attributes(self):
+        """Test a 5xx status on the exception or its response is retryable whatever the message says."""
+        assert is_transient(type("APIStatusError", (Exception,), {"status_code": 503})("overloaded"))
+        assert is_transient(type("ServerErr", (Exception,), {"code": 500})("oops"))
+        response = Mock(status_code=502)
+        assert is_transient(type("HTTPError", (Exception,), {"response": response})("bad gateway"))
+        assert http_status(Exception("Error code: 429 - rate limit")) == 429
+        assert http_status(Exception("quota 429 used up")) is None
+    
+    def test_retry_after_seconds(self):
+        """Test retry-after hints are read from headers and Gemini messages."""
+        error = Exception("429")
+        error.response = Mock(headers={"retry-after": "7"})
+        
+        assert retry_after_seconds(error) == 7.0
+        assert retry_after_seconds(Exception("429 Quota exceeded. Please retry in 12.5s.")) == 12.5
+        assert retry_after_seconds(Exception("retry_delay { seconds: 30 }")) == 30.0
+        assert retry_after_seconds(Exception("API Error")) is None
+    
     @patch('src.llm.GeminiProvider')
     def test_create_prompt(self, mock_gemini_provider):
         """Test prompt creation for Q&A."""
@@ -232,6 +587,31 @@ class TestLLM:
         
         assert "Last updated:" in prompt or "updated" in prompt.lower()
     
+    @patch.dict(os.environ, {
+        'LLM_PROVIDER': 'openai',
+        'OPENAI_API_KEY': 'test_openai_key',
+        'OPENAI_MODEL': 'llama-3',
+        'OPENAI_BASE_URL': 'http://localhost:8000/v1'
+    })
+    @patch('src.llm.OpenAICompatibleProvider')
+    def test_init_openai_compatible_from_env(self, mock_openai_provider):
+        """Test LLM initialization with an OpenAI-compatible endpoint from environment."""
+        llm = LLM()
+        
+        assert llm.provider_name == 'openai'
+        mock_openai_provider.assert_called_once_with('test_openai_key', 'llama-3', 'http://localhost:8000/v1')
+    
+    @patch.dict(os.environ, {'LLM_PROVIDER': 'gemini, grok', 'GEMINI_API_KEY': 'test_key', 'GROK_API_KEY': 'test_key'})
+    @patch('src.llm.GrokProvider')
+    @patch('src.llm.GeminiProvider')
+    def test_get_llm_failover_pool(self, mock_gemini_provider, mock_grok_provider):
+        """Test a list of providers gives a FailoverLLM in that order."""
+        llm = get_llm()
+        
+        assert isinstance(llm, FailoverLLM)
+        assert [member.provider_name for member in llm.llms] == ['gemini', 'grok']
+        assert llm.provider_name == 'gemini,grok'
+    
     @patch.dict(os.environ, {'LLM_PROVIDER': 'gemini', 'GEMINI_API_KEY': 'test_key'})
     @patch('src.llm.GeminiProvider')
     def test_get_llm(self, mock_gemini_provider):
@@ -245,5 +625,160 @@ class TestLLM:
         assert llm.provider_name == 'gemini'
 
 
+
+class TestFailoverLLM:
+    """Test suite for FailoverLLM class."""
+    
+    def make_llm(self, name):
+        """LLM over a mock provider with its own limiter, breaker and latency history."""
+        with patch('src.llm.GeminiProvider') as mock_gemini_provider:
+            mock_gemini_provider.return_value = Mock()
+            llm = LLM(provider='gemini', api_key='test_key', rate_limiter=AdaptiveRateLimiter(),
+                      circuit_breaker=CircuitBreaker(), latency_history=LatencyHistory())
+        llm.provider_name = name
+        llm.backoff_base = 0.001
+        return llm
+    
+    @pytest.fixture
+    def primary(self):
+        return self.make_llm('primary')
+    
+    @pytest.fixture
+    def secondary(self):
+        llm = self.make_llm('secondary')
+        llm.provider.generate.return_value = "Secondary answer"
+        return llm
+    
+    def test_fails_over_on_error(self, primary, secondary):
+        """Test an error from the primary is answered by the next provider without retrying."""
+        primary.provider.generate.side_effect = RetryableError("503")
+        pool = FailoverLLM([primary, secondary], hedge=False)
+        
+        assert pool.generate("Test prompt") == "Secondary answer"
+        assert primary.provider.generate.call_count == 1
+        assert pool.rate_limit_metrics()["failovers"] == 1
+    
+    def test_primary_answer_used_when_healthy(self, primary, secondary):
+        """Test the next provider isn't called while the primary answers."""
+        primary.provider.generate.return_value = "Primary answer"
+        pool = FailoverLLM([primary, secondary], hedge=False)
+        
+        assert pool.generate("Test prompt") == "Primary answer"
+        secondary.provider.generate.assert_not_called()
+        assert len(pool.latencies[0]) == 1
+    
+    def test_raises_last_error_when_all_fail(self, primary, secondary):
+        """Test the last provider's error is raised once every provider failed."""
+        primary.provider.generate.side_effect = CircuitOpenError("primary is failing")
+        secondary.provider.generate.side_effect = RuntimeError("Grok API error: bad request")
+        pool = FailoverLLM([primary, secondary], hedge=False)
+        
+        with pytest.raises(RuntimeError, match="bad request"):
+            pool.generate("Test prompt")
+    
+    def test_passed_deadline_not_failed_over(self, primary, secondary):
+        """Test a request out of time isn't sent to another provider."""
+        pool = FailoverLLM([primary, secondary], hedge=False)
+        
+        with pytest.raises(DeadlineExceededError):
+            pool.generate("Test prompt", deadline=time.monotonic() - 1)
+        secondary.provider.generate.assert_not_called()
+    
+    def test_hedges_slow_primary(self, primary, secondary):
+        """Test a call slower than the primary's p95 is hedged and the faster answer wins."""
+        def slow(*args, **kwargs):
+            time.sleep(0.5)
+            return "Primary answer"
+        
+        primary.provider.generate.side_effect = slow
+        pool = FailoverLLM([primary, secondary], hedge=True, hedge_min_samples=5)
+        for _ in range(5):
+            pool.latencies[0].record(0.01)
+        
+        start = time.monotonic()
+        assert pool.generate("Test prompt") == "Secondary answer"
+        assert time.monotonic() - start < 0.3
+        assert pool.rate_limit_metrics()["hedged"] == 1
+        assert pool.rate_limit_metrics()["hedge_wins"] == 1
+    
+    def test_no_hedging_without_latency_history(self, primary, secondary):
+        """Test calls aren't hedged until the provider's p95 is known."""
+        def slow(*args, **kwargs):
+            time.sleep(0.05)
+            return "Primary answer"
+        
+        primary.provider.generate.side_effect = slow
+        pool = FailoverLLM([primary, secondary], hedge=True, hedge_min_samples=20)
+        
+        assert pool.generate("Test prompt") == "Primary answer"
+        secondary.provider.generate.assert_not_called()
+    
+    def test_hedged_call_fails_over_on_error(self, primary, secondary):
+        """Test the hedging path also fails over when the primary errors."""
+        primary.provider.generate.side_effect = RetryableError("503")
+        pool = FailoverLLM([primary, secondary], hedge=True)
+        
+        assert pool.generate("Test prompt") == "Secondary answer"
+        assert pool.rate_limit_metrics()["failovers"] == 1
+    
+    def test_agenerate_hedge_cancels_loser(self, primary, secondary):
+        """Test an async hedge returns the faster answer and cancels the slow request."""
+        cancelled = []
+        
+        async def hang(*args, **kwargs):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+        
+        primary.provider.agenerate = hang
+        secondary.provider.agenerate = AsyncMock(return_value="Secondary answer")
+        pool = FailoverLLM([primary, secondary], hedge=True, hedge_min_samples=1)
+        pool.latencies[0].record(0.01)
+        
+        async def run():
+            result = await pool.agenerate("Test prompt")
+            await asyncio.sleep(0)
+            return result
+        
+        assert asyncio.run(run()) == "Secondary answer"
+        assert cancelled == [True]
+        assert primary.rate_limit_metrics()["in_flight"] == 0
+    
+    def test_stream_fails_over_before_first_token(self, primary, secondary):
+        """Test a stream that fails before producing text comes from the next provider."""
+        primary.provider.generate_stream.side_effect = RetryableError("503")
+        secondary.provider.generate_stream.return_value = iter(["Secondary ", "answer"])
+        pool = FailoverLLM([primary, secondary])
+        
+        assert list(pool.generate_stream("Test prompt")) == ["Secondary ", "answer"]
+    
+    def test_latency_percentile(self, primary, secondary):
+        """Test the nearest-rank percentile of recorded latencies."""
+        pool = FailoverLLM([primary, secondary])
+        assert pool.latency_percentile(0, 95) is None
+        
+        for i in range(1, 101):
+            pool.latencies[0].record(i / 100)
+        
+        assert pool.latency_percentile(0, 95) == 0.95
+        assert pool.latency_percentile(0, 50) == 0.5
+    
+    @patch('src.llm.GeminiProvider')
+    def test_latency_history_shared_across_pools(self, mock_gemini_provider):
+        """Test every pool (one per session) hedges on the same per-provider latency history."""
+        mock_gemini_provider.return_value = Mock()
+        first = FailoverLLM([LLM(provider='gemini', api_key='test_key', model='latency-test-model')])
+        second = FailoverLLM([LLM(provider='gemini', api_key='test_key', model='latency-test-model')])
+        other = LLM(provider='gemini', api_key='test_key', model='latency-test-other')
+        
+        first.latencies[0].record(0.5)
+        
+        assert second.latencies[0] is first.latencies[0]
+        assert second.latency_percentile(0, 95) == 0.5
+        assert other.latency_history is not first.latencies[0]
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,208 @@
+"""
+Unit tests for local_llm.py module.
+Tests the deterministic local LLM stand-in and its OpenAI-compatible server.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import threading
+import urllib.error
+import urllib.request
+import pytest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# local_llm imports its siblings by bare name, so match its exception classes
+from llm import LLM, RateLimitError, RetryableError
+from circuit_breaker import CircuitBreaker
+from src.local_llm import LocalProvider, NO_INFORMATION, extractive_answer, serve
+
+CONTEXT = (
+    "[Source 1]\nThe expense ratio of the regular plan is 1.2%. The fund was launched in 1995.\n"
+    "\n---\n"
+    "[Source 2]\nThe exit load is 1% if units are redeemed within one year.\n"
+)
+
+
+def make_prompt(question, context=CONTEXT):
+    """Prompt in the shape LLM.create_prompt() builds."""
+    return f"CONTEXT:\n{context}\n\nAVAILABLE SOURCES:\n[Source 1]: https://a\n[Source 2]: https://b\n\nQUESTION: {question}\n"
+
+
+class TestExtractiveAnswer:
+    """Test suite for extractive_answer function."""
+
+    def test_quotes_best_matching_sentence_with_citation(self):
+        """Test the sentence sharing most words with the question is quoted and cited."""
+        answer = extractive_answer(make_prompt("What is the exit load?"))
+
+        assert answer.startswith("The exit load is 1% if units are redeemed within one year.")
+        assert "[Source 2]" in answer
+
+    def test_keeps_context_order(self):
+        """Test several matching sentences are quoted in the order they appear."""
+        answer = extractive_answer(make_prompt("What is the expense ratio and exit load?"))
+
+        assert answer.index("[Source 1]") < answer.index("[Source 2]")
+
+    def test_no_information(self):
+        """Test questions the context doesn't cover, and foreign prompts, get the no-information answer."""
+        assert extractive_answer(make_prompt("Who manages the portfolio?")) == NO_INFORMATION
+        assert extractive_answer("Say hello") == NO_INFORMATION
+
+
+class TestLocalProvider:
+    """Test suite for LocalProvider class."""
+
+    def make_provider(self, **kwargs):
+        settings = dict(latency_ms=0, latency_sigma=0, tokens_per_second=0)
+        settings.update(kwargs)
+        return LocalProvider(**settings)
+
+    def test_generate(self):
+        """Test a call returns the extractive answer."""
+        provider = self.make_provider()
+
+        assert provider.generate(make_prompt("What is the exit load?")) == extractive_answer(make_prompt("What is the exit load?"))
+        assert provider.stats["calls"] == 1
+
+    def test_stream_and_max_tokens(self):
+        """Test streaming yields one word at a time, truncated at max_tokens."""
+        provider = self.make_provider()
+
+        pieces = list(provider.generate_stream(make_prompt("What is the exit load?"), max_tokens=3))
+
+        assert pieces == ["The ", "exit ", "load "]
+
+    def test_latency_and_token_rate(self):
+        """Test the first token waits for the latency and the rest follow at the token rate."""
+        provider = self.make_provider(latency_ms=50, tokens_per_second=100)
+
+        start = time.monotonic()
+        provider.generate(make_prompt("What is the exit load?"), max_tokens=6)
+
+        assert 0.09 <= time.monotonic() - start < 0.5
+
+    def test_outcomes_deterministic_for_seed(self):
+        """Test the same seed gives the same sequence of failures."""
+        def outcomes(seed):
+            provider = self.make_provider(rate_limit_rate=0.3, server_error_rate=0.3, seed=seed)
+            result = []
+            for _ in range(20):
+                try:
+                    provider.generate(make_prompt("What is the exit load?"))
+                    result.append("ok")
+                except RetryableError as e:
+                    result.append(type(e).__name__)
+            return result
+
+        assert outcomes(7) == outcomes(7)
+        assert set(outcomes(7)) == {"ok", "RateLimitError", "RetryableError"}
+
+    def test_injected_rate_limit(self):
+        """Test an injected 429 raises RateLimitError with its retry-after."""
+        provider = self.make_provider(rate_limit_rate=1.0, retry_after=2.5)
+
+        with pytest.raises(RateLimitError) as excinfo:
+            provider.generate(make_prompt("What is the exit load?"))
+        assert excinfo.value.retry_after == 2.5
+
+    def test_injected_timeout_hangs_until_timeout(self):
+        """Test an injected timeout holds the call for its timeout, then fails as retryable."""
+        provider = self.make_provider(timeout_rate=1.0)
+
+        start = time.monotonic()
+        with pytest.raises(RetryableError, match="timed out"):
+            provider.generate(make_prompt("What is the exit load?"), timeout=0.05)
+        assert time.monotonic() - start >= 0.05
+
+    def test_slow_stream_cut_off_by_timeout(self):
+        """Test a response slower than the timeout stops streaming and times out."""
+        provider = self.make_provider(tokens_per_second=20)
+        pieces = []
+
+        with pytest.raises(RetryableError, match="timed out"):
+            for piece in provider.generate_stream(make_prompt("What is the exit load?"), timeout=0.12):
+                pieces.append(piece)
+        assert 1 <= len(pieces) < 5
+
+    def test_agenerate(self):
+        """Test the async path returns the same answer."""
+        provider = self.make_provider(latency_ms=10)
+
+        result = asyncio.run(provider.agenerate(make_prompt("What is the exit load?")))
+
+        assert result == extractive_answer(make_prompt("What is the exit load?"))
+
+    def test_selectable_via_llm_provider(self):
+        """Test LLM(provider='local') needs no API key and retries injected failures."""
+        llm = LLM(provider='local', circuit_breaker=CircuitBreaker(failure_threshold=20))
+        llm.provider = self.make_provider(server_error_rate=0.5, seed=1)
+        llm.backoff_base = 0.001
+        llm.max_retries = 10
+
+        assert "exit load" in llm.generate(make_prompt("What is the exit load?"))
+        assert llm.provider.stats["server_error"] >= 1
+
+
+class TestServe:
+    """Test suite for the OpenAI-compatible server."""
+
+    @pytest.fixture
+    def start_server(self):
+        servers = []
+
+        def start(**kwargs):
+            server = serve(LocalProvider(latency_ms=0, latency_sigma=0, tokens_per_second=0, **kwargs), port=0)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            servers.append(server)
+            return f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+
+        yield start
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+    def post(self, url, body):
+        request = urllib.request.Request(url, data=json.dumps(body).encode(),
+                                         headers={"Content-Type": "application/json"})
+        return urllib.request.urlopen(request, timeout=5)
+
+    def test_chat_completion(self, start_server):
+        """Test a chat completion request gets the answer in the OpenAI response shape."""
+        url = start_server()
+
+        with self.post(url, {"model": "local", "messages": [{"role": "user", "content": make_prompt("What is the exit load?")}]}) as response:
+            data = json.loads(response.read())
+
+        assert data["object"] == "chat.completion"
+        assert data["choices"][0]["message"]["content"].startswith("The exit load is 1%")
+
+    def test_streamed_chat_completion(self, start_server):
+        """Test a streamed request gets server-sent chunks ending with [DONE]."""
+        url = start_server()
+
+        with self.post(url, {"stream": True, "max_tokens": 3,
+                             "messages": [{"role": "user", "content": make_prompt("What is the exit load?")}]}) as response:
+            events = [line[len(b"data: "):] for line in response.read().splitlines() if line.startswith(b"data: ")]
+
+        assert events[-1] == b"[DONE]"
+        chunks = [json.loads(event) for event in events[:-1]]
+        assert "".join(chunk["choices"][0]["delta"].get("content", "") for chunk in chunks) == "The exit load "
+        assert chunks[-1]["choices"][0]["finish_reason"] == "stop"
+
+    def test_injected_rate_limit_status(self, start_server):
+        """Test an injected 429 is returned with a Retry-After header."""
+        url = start_server(rate_limit_rate=1.0, retry_after=3)
+
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            self.post(url, {"messages": [{"role": "user", "content": "hi"}]})
+        assert excinfo.value.code == 429
+        assert excinfo.value.headers["Retry-After"] == "3"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
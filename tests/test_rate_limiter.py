@@ -0,0 +1,257 @@
+"""
+Unit tests for rate_limiter.py module.
+Tests token bucket pacing.
+"""
+import asyncio
+import os
+import sys
+import time
+import threading
+import pytest
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.rate_limiter import AdaptiveRateLimiter, TokenBucket, get_rate_limiter
+
+
+class TestTokenBucket:
+    """Test suite for TokenBucket class."""
+
+    def test_burst_up_to_capacity_is_immediate(self):
+        """Test a full bucket serves a burst without waiting."""
+        bucket = TokenBucket(rate=1.0, capacity=3)
+
+        assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+
+    def test_waits_once_empty(self):
+        """Test callers past the burst wait for the refill."""
+        bucket = TokenBucket(rate=50.0, capacity=1)
+        bucket.acquire()
+
+        start = time.monotonic()
+        waited = bucket.acquire()
+
+        assert waited == pytest.approx(0.02, abs=0.01)
+        assert time.monotonic() - start >= 0.015
+
+    def test_concurrent_callers_are_paced(self):
+        """Test waiting callers each get their own slot instead of all waking at once."""
+        bucket = TokenBucket(rate=100.0, capacity=1)
+        waits = []
+
+        threads = [threading.Thread(target=lambda: waits.append(bucket.acquire())) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(waits)[-1] == pytest.approx(0.04, abs=0.01)
+
+    def test_per_minute(self):
+        """Test the per-minute constructor converts to a per-second rate."""
+        assert TokenBucket.per_minute(60).rate == 1.0
+
+    def test_rejects_non_positive_rate(self):
+        """Test a zero rate is refused rather than blocking forever."""
+        with pytest.raises(ValueError):
+            TokenBucket(rate=0)
+
+    def test_timeout_takes_nothing(self):
+        """Test a wait longer than the timeout fails at once and leaves the bucket as it was."""
+        bucket = TokenBucket(rate=1, capacity=1)
+        bucket.acquire()
+
+        with pytest.raises(TimeoutError):
+            bucket.acquire(timeout=0.1)
+        assert bucket.acquire(timeout=1.5) == pytest.approx(1.0, abs=0.1)
+
+
+
+class TestAdaptiveRateLimiter:
+    """Test suite for AdaptiveRateLimiter class."""
+
+    def test_concurrency_cap_queues_callers(self):
+        """Test callers past the concurrency limit wait for a release."""
+        limiter = AdaptiveRateLimiter(max_concurrency=1)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+        thread.start()
+        time.sleep(0.05)
+
+        assert not acquired.is_set()
+        assert limiter.metrics()["queue_depth"] == 1
+        limiter.release()
+        thread.join()
+        assert acquired.is_set()
+        assert limiter.metrics()["queue_depth"] == 0
+        assert limiter.metrics()["max_wait_seconds"] >= 0.04
+
+    def test_throttling_halves_limit_and_success_regrows_it(self):
+        """Test AIMD: a throttle halves the concurrency limit, successes add back slowly."""
+        limiter = AdaptiveRateLimiter(max_concurrency=8)
+        limiter.acquire()
+        limiter.release(throttled=True)
+
+        assert limiter.metrics()["concurrency_limit"] == 4
+        assert limiter.metrics()["throttled"] == 1
+        for _ in range(8):
+            limiter.acquire()
+            limiter.release()
+        assert 5 <= limiter.metrics()["concurrency_limit"] <= 6
+
+    def test_limit_never_below_minimum(self):
+        """Test repeated throttling keeps at least one call going."""
+        limiter = AdaptiveRateLimiter(max_concurrency=4)
+        for _ in range(5):
+            limiter.acquire()
+            limiter.release(throttled=True)
+
+        assert limiter.metrics()["concurrency_limit"] == 1
+
+    def test_retry_after_holds_back_next_call(self):
+        """Test a retry-after hint delays the following acquisitions."""
+        limiter = AdaptiveRateLimiter(max_concurrency=2)
+        limiter.acquire()
+        limiter.release(throttled=True, retry_after=0.05)
+
+        assert limiter.acquire() >= 0.04
+
+    def test_acquire_timeout_frees_the_slot(self):
+        """Test a caller that gives up waiting holds no slot and leaves the queue."""
+        limiter = AdaptiveRateLimiter(max_concurrency=1)
+        limiter.acquire()
+
+        with pytest.raises(TimeoutError):
+            limiter.acquire(timeout=0.02)
+        limiter.release()
+
+        assert limiter.metrics()["queue_depth"] == 0
+        assert limiter.metrics()["in_flight"] == 0
+
+    def test_async_callers_queue_without_threads(self):
+        """Test async callers past the limit wait on the event loop and get slots in turn."""
+        limiter = AdaptiveRateLimiter(max_concurrency=2)
+        threads_before = threading.active_count()
+
+        async def call(order):
+            await limiter.aacquire()
+            await asyncio.sleep(0.01)
+            order.append(limiter.metrics()["in_flight"])
+            limiter.release()
+
+        async def run():
+            order = []
+            calls = asyncio.gather(*(call(order) for _ in range(20)))
+            await asyncio.sleep(0.005)
+            queued = limiter.metrics()["queue_depth"]
+            await calls
+            return queued, order
+
+        queued, order = asyncio.run(run())
+
+        assert queued == 18
+        assert len(order) == 20 and max(order) <= 2
+        assert threading.active_count() == threads_before
+        assert limiter.metrics()["queue_depth"] == 0
+        assert limiter.metrics()["in_flight"] == 0
+
+    def test_async_wakes_on_release_from_thread(self):
+        """Test an async caller gets a slot released by a plain thread."""
+        limiter = AdaptiveRateLimiter(max_concurrency=1)
+        limiter.acquire()
+        threading.Timer(0.02, limiter.release).start()
+
+        waited = asyncio.run(limiter.aacquire(timeout=5))
+        limiter.release()
+
+        assert waited >= 0.015
+        assert limiter.metrics()["in_flight"] == 0
+
+    def test_cancelled_async_caller_holds_no_slot(self):
+        """Test cancelling a queued (or pausing) async caller leaves the queue and frees its slot."""
+        limiter = AdaptiveRateLimiter(max_concurrency=1)
+
+        async def run():
+            await limiter.aacquire()
+            queued = asyncio.create_task(limiter.aacquire())
+            await asyncio.sleep(0.01)
+            queued.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await queued
+            limiter.release(throttled=True, retry_after=5)
+            # Takes the slot, then is cancelled during the retry-after pause
+            pausing = asyncio.create_task(limiter.aacquire())
+            await asyncio.sleep(0.01)
+            pausing.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await pausing
+
+        asyncio.run(run())
+
+        assert limiter.metrics()["queue_depth"] == 0
+        assert limiter.metrics()["in_flight"] == 0
+
+    def test_async_acquire_timeout(self):
+        """Test an async caller that gives up waiting holds no slot."""
+        limiter = AdaptiveRateLimiter(max_concurrency=1)
+        limiter.acquire()
+
+        with pytest.raises(TimeoutError):
+            asyncio.run(limiter.aacquire(timeout=0.02))
+        limiter.release()
+
+        assert limiter.metrics()["queue_depth"] == 0
+        assert limiter.metrics()["in_flight"] == 0
+
+    def test_paces_requests_per_minute(self):
+        """Test calls past the burst are paced to the requests-per-minute rate."""
+        limiter = AdaptiveRateLimiter(requests_per_minute=3000, max_concurrency=2)
+        waits = []
+        for _ in range(4):
+            waits.append(limiter.acquire())
+            limiter.release()
+
+        assert waits[:2] == pytest.approx([0.0, 0.0], abs=0.005)
+        assert waits[3] == pytest.approx(0.02, abs=0.01)
+
+    def test_shared_per_provider_and_model(self):
+        """Test one limiter is shared by every caller of a provider/model."""
+        first = get_rate_limiter("test-provider", "model-a", requests_per_minute=60, max_concurrency=2)
+
+        assert get_rate_limiter("test-provider", "model-a") is first
+        assert get_rate_limiter("test-provider", "model-b") is not first
+        assert first.max_concurrency == 2
+
+    def test_limits_configurable_per_provider_and_model(self):
+        """Test env limits apply per model, then per provider, then globally."""
+        env = {
+            "LLM_REQUESTS_PER_MINUTE": "30",
+            "LLM_MAX_CONCURRENCY": "3",
+            "ENV_PROVIDER_REQUESTS_PER_MINUTE": "600",
+            "ENV_PROVIDER_BIG_MODEL_1_5_MAX_CONCURRENCY": "16",
+        }
+        with patch.dict(os.environ, env):
+            model_limiter = get_rate_limiter("env-provider", "big-model-1.5")
+            provider_limiter = get_rate_limiter("env-provider", "small-model")
+            other_limiter = get_rate_limiter("other-env-provider", "small-model")
+
+        assert (model_limiter.bucket.rate * 60, model_limiter.max_concurrency) == (600, 16)
+        assert (provider_limiter.bucket.rate * 60, provider_limiter.max_concurrency) == (600, 3)
+        assert (other_limiter.bucket.rate * 60, other_limiter.max_concurrency) == (30, 3)
+
+    def test_provider_default_when_unconfigured(self):
+        """Test the provider's free-tier pace applies when no env limit is set."""
+        with patch.dict(os.environ, {"LLM_REQUESTS_PER_MINUTE": "", "GEMINI_REQUESTS_PER_MINUTE": "",
+                                     "LLM_MAX_CONCURRENCY": "", "GEMINI_MAX_CONCURRENCY": ""}):
+            limiter = get_rate_limiter("gemini", "unconfigured-test-model")
+
+        assert limiter.bucket.rate * 60 == pytest.approx(60)
+        assert limiter.max_concurrency == 8
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,114 @@
+"""
+Unit tests for reranker.py module.
+Tests cross-encoder reordering and the latency budget fallback.
+"""
+import os
+import sys
+import threading
+import pytest
+from unittest.mock import Mock
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.reranker import CrossEncoderReranker
+from langchain_core.documents import Document
+
+
+def make_results(*texts):
+    """Create (document, score) results in retrieval order."""
+    return [(Document(page_content=text), 0.9 - i * 0.1) for i, text in enumerate(texts)]
+
+
+class TestCrossEncoderReranker:
+    """Test suite for CrossEncoderReranker class."""
+
+    @pytest.fixture
+    def model(self):
+        """Create a mock cross-encoder that prefers texts mentioning 'exit load'."""
+        model = Mock()
+        model.predict.side_effect = lambda pairs, **kwargs: [
+            0.95 if "exit load" in text else 0.1 for _, text in pairs
+        ]
+        return model
+
+    def test_reorders_by_cross_encoder_score(self, model):
+        """Test the best-scored candidate moves to the top and k is applied."""
+        reranker = CrossEncoderReranker(model=model, budget_seconds=5)
+        results = make_results("NAV history", "Riskometer", "The exit load is 1%")
+
+        reranked = reranker.rerank("exit load?", results, k=2)
+
+        assert [doc.page_content for doc, _ in reranked] == ["The exit load is 1%", "NAV history"]
+        assert reranked[0][1] == 0.95
+        assert reranker.stats["reranked"] == 1
+
+    def test_scores_all_pairs_in_one_batch(self, model):
+        """Test every candidate is scored in a single predict call."""
+        reranker = CrossEncoderReranker(model=model, budget_seconds=5)
+
+        reranker.rerank("q", make_results("a", "b", "c", "d"), k=2)
+
+        model.predict.assert_called_once()
+        pairs = model.predict.call_args[0][0]
+        assert pairs == [("q", "a"), ("q", "b"), ("q", "c"), ("q", "d")]
+        assert model.predict.call_args[1]["batch_size"] == 4
+
+    def test_over_budget_keeps_original_order(self):
+        """Test a slow model falls back to the retrieval order."""
+        release = threading.Event()
+        model = Mock()
+        model.predict.side_effect = lambda pairs, **kwargs: release.wait(5) and [1.0] * len(pairs)
+        reranker = CrossEncoderReranker(model=model, budget_seconds=0.01)
+        results = make_results("first", "second", "third")
+
+        reranked = reranker.rerank("q", results, k=2)
+        # The slow rerank is still running, so the next call doesn't wait for it
+        busy = reranker.rerank("q", results, k=2)
+        release.set()
+
+        assert reranked == results[:2]
+        assert busy == results[:2]
+        assert reranker.stats["over_budget"] == 1
+        assert reranker.stats["busy"] == 1
+
+    def test_concurrent_reranks_within_budget_all_rerank(self):
+        """Test a rerank still within its budget doesn't make concurrent calls skip reranking."""
+        started, release = threading.Event(), threading.Event()
+
+        def predict(pairs, **kwargs):
+            started.set()
+            release.wait(5)
+            return [0.95 if "exit load" in text else 0.1 for _, text in pairs]
+
+        model = Mock()
+        model.predict.side_effect = predict
+        reranker = CrossEncoderReranker(model=model, budget_seconds=5)
+        results = make_results("NAV history", "The exit load is 1%")
+        outputs = []
+        first = threading.Thread(target=lambda: outputs.append(reranker.rerank("q", results, k=1)))
+        first.start()
+        started.wait(5)
+        second = threading.Thread(target=lambda: outputs.append(reranker.rerank("q", results, k=1)))
+        second.start()
+        release.set()
+        first.join(5)
+        second.join(5)
+
+        assert [[doc.page_content for doc, _ in out] for out in outputs] == [["The exit load is 1%"]] * 2
+        assert reranker.stats["reranked"] == 2
+        assert reranker.stats["busy"] == 0
+
+    def test_model_error_keeps_original_order(self):
+        """Test a failing model doesn't break retrieval."""
+        model = Mock()
+        model.predict.side_effect = RuntimeError("no model")
+        reranker = CrossEncoderReranker(model=model, budget_seconds=5)
+        results = make_results("first", "second")
+
+        assert reranker.rerank("q", results, k=1) == results[:1]
+        assert reranker.stats["errors"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
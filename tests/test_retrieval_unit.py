@@ -96,6 +96,85 @@ class TestRetriever:
         
         mock_vs_instance.query.assert_called_once_with("test query", k=3)
     
+    def test_retrieve_filters_named_scheme(self, retriever):
+        """Test a question naming a scheme searches that scheme plus general resources."""
+        retriever.vector_store = Mock()
+        retriever.vector_store.query.return_value = [Mock()]
+        
+        retriever.retrieve("exit load of HDFC Top 100", k=2)
+        
+        retriever.vector_store.query.assert_called_once_with(
+            "exit load of HDFC Top 100", k=2, schemes=["HDFC Large Cap Fund", "General Resources"]
+        )
+    
+    def test_retrieve_falls_back_to_unfiltered(self, retriever):
+        """Test an empty filtered search is retried over the whole index."""
+        retriever.vector_store = Mock()
+        retriever.vector_store.query.side_effect = [[], ["unfiltered"]]
+        
+        results = retriever.retrieve("ELSS lock-in", k=2)
+        
+        assert results == ["unfiltered"]
+        assert retriever.vector_store.query.call_args_list[-1] == (("ELSS lock-in",), {"k": 2})
+    
+    def test_retrieve_batch_groups_by_scheme(self, retriever):
+        """Test a batch embeds once, shares a search per scheme filter and falls back per query."""
+        retriever.vector_store = Mock()
+        retriever.vector_store.query_batch.side_effect = [
+            [["top100 a"], []],
+            [["general"], ["unfiltered"]],
+        ]
+        queries = ["exit load of HDFC Top 100", "What is a mutual fund?", "HDFC Top 100 benchmark"]
+        
+        results = retriever.retrieve_batch(queries, k=2)
+        
+        retriever.vector_store.embedding_function.embed_queries.assert_called_once_with(queries)
+        assert retriever.vector_store.query_batch.call_args_list == [
+            ((["exit load of HDFC Top 100", "HDFC Top 100 benchmark"],),
+             {"k": 2, "schemes": ["HDFC Large Cap Fund", "General Resources"]}),
+            ((["What is a mutual fund?", "HDFC Top 100 benchmark"],), {"k": 2}),
+        ]
+        assert results == [["top100 a"], ["general"], ["unfiltered"]]
+    
+    def test_hybrid_fuses_dense_and_lexical(self, retriever, sample_results):
+        """Test hybrid mode ranks documents found by both searches first."""
+        flexi, kim, general = [doc for doc, _ in sample_results]
+        retriever.mode = "hybrid"
+        retriever.vector_store = Mock()
+        retriever.vector_store.query.return_value = [(flexi, 0.9), (kim, 0.8)]
+        retriever.vector_store.lexical_query.return_value = [(general, 7.0), (kim, 5.0)]
+        
+        results = retriever.retrieve("test query", k=2)
+        
+        retriever.vector_store.query.assert_called_once_with("test query", k=8)
+        retriever.vector_store.lexical_query.assert_called_once_with("test query", k=8)
+        assert [doc for doc, _ in results] == [kim, flexi]
+    
+    def test_fuse_weights_and_scale(self, retriever, sample_results):
+        """Test fusion weights shift the ranking and top agreement scores 1.0."""
+        flexi, kim, general = [doc for doc, _ in sample_results]
+        
+        retriever.lexical_weight = 3.0
+        lexical_first = retriever.fuse([(flexi, 0.9)], [(general, 1.0)], k=2)
+        assert [doc for doc, _ in lexical_first] == [general, flexi]
+        
+        retriever.lexical_weight = 1.0
+        agreed = retriever.fuse([(kim, 0.9)], [(kim, 4.0)], k=1)
+        assert agreed[0][1] == pytest.approx(1.0)
+    
+    def test_rerank_overfetches_and_trims(self, retriever, sample_results):
+        """Test reranking searches extra candidates and returns the reranker's top k."""
+        retriever.vector_store = Mock()
+        retriever.vector_store.query.return_value = sample_results
+        retriever.reranker = Mock()
+        retriever.reranker.rerank.return_value = sample_results[2:]
+        
+        results = retriever.retrieve("test query", k=1)
+        
+        retriever.vector_store.query.assert_called_once_with("test query", k=4)
+        retriever.reranker.rerank.assert_called_once_with("test query", sample_results, 1)
+        assert results == sample_results[2:]
+    
     def test_format_context_empty_results(self, retriever):
         """Test format_context with empty results."""
         context, sources = retriever.format_context([])
@@ -0,0 +1,69 @@
+"""
+Unit tests for scheme_matcher.py module.
+Tests scheme name and alias recognition in questions.
+"""
+import os
+import sys
+import pytest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scheme_matcher import SchemeMatcher, scheme_aliases
+
+
+class TestSchemeMatcher:
+    """Test suite for SchemeMatcher class."""
+
+    @pytest.fixture
+    def matcher(self):
+        """Build a matcher from the project's official-urls.csv."""
+        return SchemeMatcher()
+
+    def test_scheme_aliases(self):
+        """Test short names are derived from the full scheme name."""
+        assert scheme_aliases("HDFC Small Cap Fund") == [
+            "HDFC Small Cap", "HDFC Small Cap Fund", "Small Cap", "Small Cap Fund"
+        ]
+
+    def test_general_resources_not_a_scheme(self, matcher):
+        """Test the general resources rows aren't matchable."""
+        assert "General Resources" not in matcher.schemes
+        assert matcher.match("general resources") == []
+
+    @pytest.mark.parametrize("question,expected", [
+        ("What is the exit load of HDFC Top 100?", ["HDFC Large Cap Fund"]),
+        ("ELSS lock-in period", ["HDFC ELSS Tax Saver Fund"]),
+        ("Is the HDFC TaxSaver fund good?", ["HDFC ELSS Tax Saver Fund"]),
+        ("expense ratio of hdfc small cap fund", ["HDFC Small Cap Fund"]),
+        ("minimum SIP for flexi-cap", ["HDFC Flexi Cap Fund"]),
+    ])
+    def test_matches_names_and_aliases(self, matcher, question, expected):
+        """Test full names, short names, former names and spelling variants."""
+        assert matcher.match(question) == expected
+
+    def test_multiple_schemes_in_mention_order(self, matcher):
+        """Test every mentioned scheme is returned once, in order."""
+        question = "Compare Small Cap vs Large Cap, and small-cap risk"
+
+        assert matcher.match(question) == ["HDFC Small Cap Fund", "HDFC Large Cap Fund"]
+
+    def test_no_match(self, matcher):
+        """Test generic questions produce no filter."""
+        assert matcher.match("What is an expense ratio?") == []
+
+    def test_former_names_from_csv(self, tmp_path):
+        """Test "(formerly ...)" in a CSV description becomes an alias."""
+        csv_path = tmp_path / "urls.csv"
+        csv_path.write_text(
+            "scheme,url,description,date_accessed\n"
+            'HDFC Mid Cap Fund,https://example.com,"Scheme page (formerly HDFC Mid-Cap Opportunities Fund)",2026-02-10\n'
+        )
+
+        matcher = SchemeMatcher(str(csv_path), aliases={})
+
+        assert matcher.match("HDFC Mid-Cap Opportunities returns") == ["HDFC Mid Cap Fund"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
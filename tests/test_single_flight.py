@@ -0,0 +1,151 @@
+"""
+Unit tests for single_flight.py module.
+Tests coalescing of concurrent identical calls.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import pytest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test suite for SingleFlight class."""
+
+    def run_concurrently(self, n, target):
+        """Start n threads on target at once and return their results in thread order."""
+        results = [None] * n
+        barrier = threading.Barrier(n)
+
+        def run(i):
+            barrier.wait()
+            results[i] = target()
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_calls_run_once(self):
+        """Test identical concurrent calls share one computation."""
+        flights = SingleFlight()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return "result"
+
+        results = self.run_concurrently(5, lambda: flights.do("key", compute))
+
+        assert len(calls) == 1
+        assert [result for result, _ in results] == ["result"] * 5
+        assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+        assert flights.stats == {"leaders": 1, "coalesced": 4}
+        assert flights.in_flight() == 0
+
+    def test_different_keys_not_coalesced(self):
+        """Test calls with different keys run separately."""
+        flights = SingleFlight()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+
+        self.run_concurrently(2, lambda: flights.do(threading.get_ident(), compute))
+
+        assert len(calls) == 2
+
+    def test_sequential_calls_not_coalesced(self):
+        """Test a finished flight isn't reused: only calls in flight are shared."""
+        flights = SingleFlight()
+
+        assert flights.do("key", lambda: 1) == (1, False)
+        assert flights.do("key", lambda: 2) == (2, False)
+
+    def test_follower_computes_itself_when_leader_fails(self):
+        """Test followers of a failed leader run the call themselves."""
+        flights = SingleFlight()
+        flight, leader = flights.begin("key")
+        assert leader
+
+        results = []
+        follower = threading.Thread(target=lambda: results.append(flights.do("key", lambda: "own result")))
+        follower.start()
+        time.sleep(0.02)
+        flights.finish("key", flight, error=RuntimeError("leader failed"))
+        follower.join()
+
+        assert results == [("own result", False)]
+        with pytest.raises(RuntimeError, match="leader failed"):
+            flight.wait()
+
+    def test_wait_timeout(self):
+        """Test waiting on a flight that doesn't land in time raises TimeoutError."""
+        flights = SingleFlight()
+        flight, _ = flights.begin("key")
+
+        with pytest.raises(TimeoutError):
+            flight.wait(timeout=0.01)
+        assert flights.do("key", lambda: "own result", timeout=0.01) == ("own result", False)
+
+
+    def test_await_result_woken_from_thread(self):
+        """Test async followers wait on the event loop and get the result a thread lands."""
+        flights = SingleFlight()
+        flight, _ = flights.begin("key")
+        threading.Timer(0.02, flights.finish, args=("key", flight, "shared")).start()
+        threads_before = threading.active_count()
+
+        async def follow():
+            return await asyncio.gather(*(flight.await_result(timeout=5) for _ in range(50)))
+
+        results = asyncio.run(follow())
+
+        assert results == ["shared"] * 50
+        assert threading.active_count() <= threads_before
+
+    def test_await_result_timeout(self):
+        """Test an async follower gives up with TimeoutError."""
+        flight, _ = SingleFlight().begin("key")
+
+        with pytest.raises(TimeoutError):
+            asyncio.run(flight.await_result(timeout=0.01))
+
+    def test_events_relayed_as_published(self):
+        """Test followers see every published step, including ones from before they joined."""
+        flights = SingleFlight()
+        flight, _ = flights.begin("key")
+        flight.publish("first")
+
+        def lead():
+            time.sleep(0.02)
+            flight.publish("second")
+            flights.finish("key", flight, "result")
+
+        threading.Thread(target=lead).start()
+
+        assert list(flight.events(timeout=5)) == ["first", "second"]
+        assert flight.wait(0) == "result"
+
+    def test_abandoned_leader_raises_plain_error(self):
+        """Test a leader closed with GeneratorExit gives followers a RuntimeError they can handle."""
+        flights = SingleFlight()
+        flight, _ = flights.begin("key")
+        flights.finish("key", flight, error=GeneratorExit())
+
+        with pytest.raises(RuntimeError, match="abandoned"):
+            flight.wait()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
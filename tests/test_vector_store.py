@@ -11,7 +11,7 @@ from unittest.mock import Mock, patch, MagicMock
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.vector_store import VectorStore
+from src.vector_store import VectorStore, source_type
 from langchain_core.documents import Document
 
 
@@ -186,6 +186,188 @@ class TestVectorStore:
         results = vector_store.query("SIP", k=5)
         assert len(results) > 0
     
+    def test_delete_documents_by_id(self, vector_store, sample_documents):
+        """Test deleting chunks by ID removes only those chunks."""
+        for i, doc in enumerate(sample_documents):
+            doc.id = f"chunk-{i}"
+        vector_store.add_documents(sample_documents)
+        
+        deleted = vector_store.delete_documents(["chunk-0", "missing-id"])
+        
+        assert deleted == 1
+        remaining = set(vector_store.get_db().index_to_docstore_id.values())
+        assert remaining == {"chunk-1", "chunk-2"}
+    
+    def test_save_publishes_new_version(self, vector_store, sample_documents):
+        """Test each save writes a new version directory and repoints CURRENT."""
+        vector_store.add_documents(sample_documents[:1])
+        first = vector_store.current_version()
+        vector_store.add_documents(sample_documents[1:])
+        second = vector_store.current_version()
+        
+        assert first is not None and second != first
+        assert vector_store.version == second
+        assert os.path.exists(os.path.join(vector_store.faiss_path, "versions", second, "index.faiss"))
+    
+    def test_saved_without_pickle(self, vector_store, sample_documents):
+        """Test chunks are saved to the mapped chunk store rather than index.pkl."""
+        vector_store.add_documents(sample_documents)
+        version_path = os.path.join(vector_store.faiss_path, "versions", vector_store.version)
+        
+        assert os.path.exists(os.path.join(version_path, "chunks.offsets.npy"))
+        assert not os.path.exists(os.path.join(version_path, "index.pkl"))
+        
+        reader = VectorStore()
+        reader.faiss_path = vector_store.faiss_path
+        doc, _ = reader.query("Minimum SIP amount", k=3)[0]
+        assert doc.metadata["scheme"] == "HDFC Flexi Cap"
+    
+    def test_prunes_old_versions(self, vector_store, sample_documents):
+        """Test only the newest keep_versions versions stay on disk."""
+        vector_store.keep_versions = 2
+        for doc in sample_documents:
+            vector_store.add_documents([doc])
+        
+        versions = os.listdir(os.path.join(vector_store.faiss_path, "versions"))
+        assert len(versions) == 2
+        assert vector_store.current_version() in versions
+    
+    def test_hot_reload_picks_up_new_version(self, vector_store, sample_documents):
+        """Test a reader swaps to a version published by another instance."""
+        vector_store.add_documents(sample_documents[:1])
+        reader = VectorStore(reload_interval=0)
+        reader.faiss_path = vector_store.faiss_path
+        assert len(reader.query("SIP", k=5)) == 1
+        swaps = []
+        reader.add_reload_listener(lambda old, new: swaps.append((old, new)))
+        old_version = reader.version
+        
+        vector_store.add_documents(sample_documents[1:])
+        
+        assert len(reader.query("SIP", k=5)) == 3
+        assert swaps == [(old_version, vector_store.version)]
+    
+    def test_reset_keeps_published_index(self, vector_store, sample_documents):
+        """Test reset builds a fresh index while the published one stays on disk."""
+        vector_store.add_documents(sample_documents)
+        published = vector_store.current_version()
+        
+        vector_store.reset()
+        
+        assert vector_store.get_db() is None
+        assert vector_store.current_version() == published
+        vector_store.add_documents(sample_documents[:1])
+        assert len(vector_store.query("SIP", k=5)) == 1
+    
+    def test_query_filtered_by_scheme(self, vector_store, sample_documents):
+        """Test a scheme filter only returns chunks of that scheme."""
+        sample_documents.append(Document(
+            page_content="HDFC Small Cap Fund expense ratio is 0.67%",
+            metadata={"source": "https://example.com/4", "scheme": "HDFC Small Cap"}
+        ))
+        vector_store.add_documents(sample_documents)
+        
+        results = vector_store.query("expense ratio", k=3, schemes="HDFC Small Cap")
+        
+        assert [doc.metadata["scheme"] for doc, _ in results] == ["HDFC Small Cap"]
+    
+    def test_query_filtered_scores_match_unfiltered(self, vector_store, sample_documents):
+        """Test filtered search scores chunks the same way as a full search."""
+        vector_store.add_documents(sample_documents)
+        
+        unfiltered = vector_store.query("exit load", k=3)
+        filtered = vector_store.query("exit load", k=3, schemes=["HDFC Flexi Cap"])
+        
+        assert [d.page_content for d, _ in filtered] == [d.page_content for d, _ in unfiltered]
+        assert [s for _, s in filtered] == pytest.approx([s for _, s in unfiltered], abs=1e-5)
+    
+    def test_query_filter_without_matches(self, vector_store, sample_documents):
+        """Test an unknown scheme or source type returns nothing."""
+        vector_store.add_documents(sample_documents)
+        
+        assert vector_store.query("exit load", schemes="Unknown Fund") == []
+        assert vector_store.query("exit load", source_types="SEBI") == []
+    
+    def test_filter_groups_refresh_after_add(self, vector_store, sample_documents):
+        """Test chunks added after a filtered query are found by the next one."""
+        vector_store.add_documents(sample_documents[:1])
+        vector_store.query("expense ratio", schemes="HDFC Flexi Cap")
+        vector_store.add_documents(sample_documents[1:])
+        
+        assert len(vector_store.query("expense ratio", k=5, schemes="HDFC Flexi Cap")) == 3
+    
+    def test_filter_groups_load_with_version(self, vector_store, sample_documents):
+        """Test a freshly loaded index filters from the saved groups without decoding metadata."""
+        vector_store.add_documents(sample_documents)
+        expected = vector_store.filter_rows(schemes="HDFC Flexi Cap")
+        
+        reader = VectorStore()
+        reader.faiss_path = vector_store.faiss_path
+        with patch("chunk_store.ChunkStore.metadata", side_effect=AssertionError("metadata decoded")):
+            rows = reader.filter_rows(schemes="HDFC Flexi Cap")
+            results = reader.query("exit load", k=3, schemes="HDFC Flexi Cap")
+        
+        assert list(rows) == list(expected)
+        assert {doc.metadata["scheme"] for doc, _ in results} == {"HDFC Flexi Cap"}
+    
+    def test_query_batch_matches_query(self, vector_store, sample_documents):
+        """Test a batched search returns what each single query returns."""
+        vector_store.add_documents(sample_documents)
+        questions = ["expense ratio", "exit load", "SIP amount"]
+        
+        batched = vector_store.query_batch(questions, k=2)
+        
+        for question, results in zip(questions, batched):
+            single = vector_store.query(question, k=2)
+            assert [d.page_content for d, _ in results] == [d.page_content for d, _ in single]
+            assert [s for _, s in results] == pytest.approx([s for _, s in single], abs=1e-5)
+    
+    def test_query_batch_embeds_once(self, vector_store, sample_documents):
+        """Test the batch makes one embedding call for all questions."""
+        vector_store.add_documents(sample_documents)
+        vector_store.embedding_function.query_cache.clear()
+        model = Mock(wraps=vector_store.embedding_function.embeddings)
+        vector_store.embedding_function.embeddings = model
+        
+        vector_store.query_batch(["expense ratio", "exit load"], k=1, schemes="HDFC Flexi Cap")
+        
+        model.embed_documents.assert_called_once_with(["expense ratio", "exit load"])
+        model.embed_query.assert_not_called()
+    
+    def test_query_batch_filtered_and_empty(self, vector_store, sample_documents):
+        """Test batched filtered search and the empty cases."""
+        sample_documents.append(Document(
+            page_content="HDFC Small Cap Fund expense ratio is 0.67%",
+            metadata={"source": "https://example.com/4", "scheme": "HDFC Small Cap"}
+        ))
+        vector_store.add_documents(sample_documents)
+        
+        results = vector_store.query_batch(["expense ratio", "exit load"], k=3, schemes="HDFC Small Cap")
+        
+        assert [[d.metadata["scheme"] for d, _ in r] for r in results] == [["HDFC Small Cap"]] * 2
+        assert vector_store.query_batch(["exit load"], schemes="Unknown Fund") == [[]]
+        assert vector_store.query_batch([]) == []
+    
+    def test_lexical_query(self, vector_store, sample_documents):
+        """Test BM25 search finds exact tokens and respects filters."""
+        vector_store.add_documents(sample_documents)
+        
+        doc, score = vector_store.lexical_query("exit load 1%", k=1)[0]
+        
+        assert doc.page_content.startswith("Exit load")
+        assert score > 0
+        assert vector_store.lexical_query("exit load", schemes="Other Fund") == []
+    
+    def test_lexical_index_saved_with_version(self, vector_store, sample_documents):
+        """Test the BM25 index is published with each version and loaded with it."""
+        vector_store.add_documents(sample_documents)
+        version_path = os.path.join(vector_store.faiss_path, "versions", vector_store.version)
+        
+        assert os.path.exists(os.path.join(version_path, "bm25.npz"))
+        reader = VectorStore()
+        reader.faiss_path = vector_store.faiss_path
+        assert reader.lexical_query("SIP", k=1)[0][0].page_content == "Minimum SIP amount is Rs. 100"
+    
     def test_multiple_queries_same_db(self, vector_store, sample_documents):
         """Test multiple queries on the same database."""
         vector_store.add_documents(sample_documents)
@@ -202,5 +384,29 @@ class TestVectorStore:
         assert results1[0][0].page_content != results2[0][0].page_content
 
 
+class TestSourceType:
+    """Test suite for source_type classification."""
+    
+    def test_kim_and_sid_pdfs(self):
+        """Test scheme documents are classified by their KIM/SID paths."""
+        kim = "https://files.hdfcfund.com/s3fs-public/KIM/2025-11/KIM%20-%20HDFC%20Flexi%20Cap%20Fund.pdf"
+        sid = "https://files.hdfcfund.com/s3fs-public/SID/2025-11/SID-HDFC%20Flexi%20Cap%20Fund.pdf"
+        
+        assert source_type({"source": kim}) == "KIM"
+        assert source_type({"source": sid}) == "SID"
+    
+    def test_regulator_hosts(self):
+        """Test regulator and industry sites are classified by host."""
+        assert source_type({"source": "https://investor.sebi.gov.in/exit_load.html"}) == "SEBI"
+        assert source_type({"source": "https://www.amfiindia.com/"}) == "AMFI"
+    
+    def test_other_pages_and_explicit_type(self):
+        """Test other pages are WEB and stored source types win."""
+        page = "https://www.hdfcfund.com/explore/mutual-funds/hdfc-flexi-cap-fund/direct"
+        
+        assert source_type({"source": page}) == "WEB"
+        assert source_type({"source": page, "source_type": "KIM"}) == "KIM"
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])